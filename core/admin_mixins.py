@@ -0,0 +1,131 @@
+import json
+import logging
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+logger = logging.getLogger('django')
+
+
+def estimate_count(queryset):
+    """PostgreSQL 查询计划中的估算行数，其他数据库返回 None"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Failed to estimate count for {queryset.model._meta.label}: {str(e)}")
+        return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """大表分页器：估算行数超过阈值时直接使用估算值，避免 COUNT(*) 全表扫描"""
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        estimated = estimate_count(self.object_list)
+        if estimated is not None and estimated > self.ESTIMATE_THRESHOLD:
+            return estimated
+        return super().count
+
+
+class LargeTableAdminMixin:
+    """大表后台列表通用优化
+
+    - 分页使用估算行数，不再统计未过滤的总数；
+    - 根据 list_display 中的外键字段（以及方法列的 admin_order_field 关联路径）
+      自动设置 list_select_related，列表查询次数与每页条数无关；
+    - 关联表行数较多的外键改为自动补全（关联模型后台配置了 search_fields）或原始ID输入框，
+      不再把整张表渲染成下拉框。
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    large_fk_threshold = 1000
+
+    def get_list_select_related(self, request):
+        if self.list_select_related is not False:
+            return self.list_select_related
+
+        related = []
+        for name in self.get_list_display(request):
+            if callable(name):
+                path = getattr(name, 'admin_order_field', None)
+            else:
+                path = getattr(getattr(self, name, None), 'admin_order_field', None) or name
+            relation = self.resolve_relation(path)
+            if relation and relation not in related:
+                related.append(relation)
+        return related
+
+    def resolve_relation(self, path):
+        """取字段路径中最长的外键/一对一前缀，如 order__user__username -> order__user"""
+        if not isinstance(path, str):
+            return None
+        opts = self.model._meta
+        relation = []
+        for part in path.lstrip('-').split('__'):
+            try:
+                field = opts.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                break
+            relation.append(part)
+            opts = field.related_model._meta
+        return '__'.join(relation) or None
+
+    def is_large_relation(self, db_field, request=None):
+        """关联表估算行数是否超过阈值，同一请求内每个关联模型只估算一次"""
+        model = db_field.remote_field.model
+        cached = getattr(request, '_large_relations', None) if request is not None else None
+        if cached is not None and model in cached:
+            return cached[model]
+
+        estimated = estimate_count(model._default_manager.all())
+        is_large = estimated is not None and estimated > self.large_fk_threshold
+        if request is not None:
+            if cached is None:
+                cached = request._large_relations = {}
+            cached[model] = is_large
+        return is_large
+
+    def get_autocomplete_fields(self, request):
+        # 表单的每个外键字段都会调用，结果按请求缓存
+        cache_key = (type(self), self.model)
+        cached = getattr(request, '_autocomplete_fields', None)
+        if cached is not None and cache_key in cached:
+            return list(cached[cache_key])
+
+        fields = list(super().get_autocomplete_fields(request))
+        for db_field in self.model._meta.concrete_fields:
+            if not db_field.many_to_one or db_field.name in fields or db_field.name in self.raw_id_fields:
+                continue
+            related_admin = self.admin_site._registry.get(db_field.remote_field.model)
+            if related_admin and related_admin.search_fields and self.is_large_relation(db_field, request):
+                fields.append(db_field.name)
+
+        if request is not None:
+            if cached is None:
+                cached = request._autocomplete_fields = {}
+            cached[cache_key] = tuple(fields)
+        return fields
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if (
+            'widget' not in kwargs
+            and db_field.name not in self.get_autocomplete_fields(request)
+            and db_field.name not in self.radio_fields
+            and self.is_large_relation(db_field, request)
+        ):
+            kwargs['widget'] = ForeignKeyRawIdWidget(db_field.remote_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
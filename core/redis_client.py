@@ -0,0 +1,12 @@
+import redis
+from django.conf import settings
+
+_pool = None
+
+
+def get_redis():
+    """获取共享连接池的Redis客户端（用于计数器、排行榜等数据结构）"""
+    global _pool
+    if _pool is None:
+        _pool = redis.ConnectionPool.from_url(settings.REDIS_URL, decode_responses=True)
+    return redis.Redis(connection_pool=_pool)
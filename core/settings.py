@@ -110,6 +110,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# 商品搜索索引快照
+GOODS_SEARCH_INDEX_PATH = os.path.join(BASE_DIR, 'data', 'goods_search.idx')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -187,6 +190,34 @@ CELERY_BEAT_SCHEDULE.update({
         'task': 'distributor.tasks.check_distributor_upgrades',
         'schedule': crontab(hour=1, minute=0),  # 每天凌晨1点执行
     },
+    'rebuild-similar-goods': {
+        'task': 'goods.tasks.rebuild_similar_goods',
+        'schedule': crontab(hour=3, minute=0),  # 每天凌晨3点执行
+    },
+    'flush-goods-sales': {
+        'task': 'goods.tasks.flush_goods_sales',
+        'schedule': 5.0,  # 每5秒把缓冲的销量写入数据库
+    },
+    'persist-carts': {
+        'task': 'trade.tasks.persist_carts',
+        'schedule': 10.0,  # 每10秒把Redis购物车写回数据库
+    },
+    'check-order-timeout': {
+        'task': 'trade.tasks.check_order_timeout',
+        'schedule': 5.0,  # 每5秒处理到期的待支付订单
+    },
+    'release-cancelled-reservations': {
+        'task': 'trade.tasks.release_cancelled_reservations',
+        'schedule': crontab(minute='*/10'),  # 每10分钟补偿释放已取消订单的库存预留
+    },
+    'rearm-order-expiry': {
+        'task': 'trade.tasks.rearm_order_expiry',
+        'schedule': crontab(minute=30),  # 每小时重新登记待支付订单的超时定时器
+    },
+    'maintain-order-partitions': {
+        'task': 'trade.tasks.maintain_order_partitions',
+        'schedule': crontab(hour=4, minute=0),  # 每天凌晨4点执行
+    },
 })
 
 # Cache settings
@@ -197,6 +228,22 @@ CACHES = {
     }
 }
 
+# Redis数据结构（计数器、排行榜等），与缓存分库存放
+REDIS_URL = 'redis://127.0.0.1:6379/2'
+
+# 购物车存储：database 直接读写 Cart 表；redis 存在Redis哈希中并定时写回 Cart 表
+CART_STORE = 'database'
+
+# 订单分区：提前创建的月份数；超过期限且订单全部关闭的月份分区移入归档schema和归档表空间
+# （未配置表空间时不归档，仍有未关闭订单的分区留在热存储）
+ORDER_PARTITION_MONTHS_AHEAD = 3
+ORDER_ARCHIVE_AFTER_DAYS = 90
+ORDER_ARCHIVE_SCHEMA = 'order_archive'
+ORDER_ARCHIVE_TABLESPACE = None
+
+# 超时订单对账时并发查询微信支付的线程数
+PAYMENT_QUERY_WORKERS = 16
+
 # Session settings
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
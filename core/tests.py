@@ -0,0 +1,74 @@
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from goods.models import Category, Goods
+from trade.models import Order, OrderItem
+
+User = get_user_model()
+
+PROJECT_APPS = ('users', 'goods', 'trade', 'distributor')
+
+
+@override_settings(ORDER_WORKER_ID=1)
+class AdminChangeListQueryCountTests(TestCase):
+    """后台列表查询次数不随每页条数变化"""
+    ROWS = 12
+    PAGE_SIZES = (2, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username='admin', password='admin', phone='13800000000')
+
+        parent = None
+        for i in range(cls.ROWS):
+            parent = User.objects.create_user(
+                username=f'user{i}', password='test', phone=f'1390000{i:04d}', parent=parent, role=2
+            )
+
+        root = Category.objects.create(name='根分类')
+        categories = [Category.objects.create(name=f'分类{i}', parent=root) for i in range(cls.ROWS)]
+        goods_list = [
+            Goods.objects.create(
+                name=f'商品{i}', category=category, price=Decimal('10.00'),
+                original_price=Decimal('12.00'), stock=100, image='goods/test.jpg', description='-'
+            )
+            for i, category in enumerate(categories)
+        ]
+
+        for i, goods in enumerate(goods_list):
+            order = Order.objects.create(
+                user=parent, distributor=parent,
+                total_amount=goods.price, actual_amount=goods.price,
+                receiver_name='测试', receiver_phone='13900000000', receiver_address='测试地址'
+            )
+            OrderItem.objects.create(
+                order=order, goods=goods, goods_name=goods.name, goods_image='goods/test.jpg',
+                price=goods.price, quantity=1, total_amount=goods.price
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def count_changelist_queries(self, model, model_admin, per_page):
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        with patch.object(model_admin, 'list_per_page', per_page):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_query_count_is_constant_in_page_size(self):
+        for model, model_admin in admin.site._registry.items():
+            if model._meta.app_label not in PROJECT_APPS:
+                continue
+            with self.subTest(model=model._meta.label):
+                counts = [
+                    self.count_changelist_queries(model, model_admin, per_page)
+                    for per_page in self.PAGE_SIZES
+                ]
+                self.assertEqual(counts[0], counts[1])
@@ -3,6 +3,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.utils.html import format_html
 from django.db import models
+from core.admin_mixins import LargeTableAdminMixin
 from .models import (
     DistributionRule,
     Commission,
@@ -26,7 +27,7 @@ class DistributionRuleAdmin(admin.ModelAdmin):
     commission_rate_display.short_description = _('佣金比例')
 
 @admin.register(Commission)
-class CommissionAdmin(admin.ModelAdmin):
+class CommissionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'distributor',
         'order_link',
@@ -60,10 +61,11 @@ class CommissionAdmin(admin.ModelAdmin):
     def order_link(self, obj):
         return format_html(
             '<a href="{}">{}</a>',
-            f'/admin/trade/order/{obj.order.id}/change/',
+            f'/admin/trade/order/{obj.order_id}/change/',
             obj.order.order_number
         )
     order_link.short_description = _('订单')
+    order_link.admin_order_field = 'order__order_number'
 
     def save_model(self, request, obj, form, change):
         if change and 'status' in form.changed_data:
@@ -81,7 +83,7 @@ class WithdrawalAuditInline(admin.TabularInline):
         return False
 
 @admin.register(Withdrawal)
-class WithdrawalAdmin(admin.ModelAdmin):
+class WithdrawalAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'distributor',
         'amount',
@@ -182,7 +184,7 @@ class WithdrawalAdmin(admin.ModelAdmin):
     complete_withdrawals.short_description = _('批量完成打款')
 
 @admin.register(DistributorStats)
-class DistributorStatsAdmin(admin.ModelAdmin):
+class DistributorStatsAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'distributor',
         'total_sales_display',
@@ -217,7 +219,7 @@ class DistributorStatsAdmin(admin.ModelAdmin):
         return False
 
 @admin.register(DistributorReport)
-class DistributorReportAdmin(admin.ModelAdmin):
+class DistributorReportAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'period',
         'date',
@@ -264,7 +266,7 @@ class UpgradeRuleAdmin(admin.ModelAdmin):
     min_sales_display.short_description = _('最低销售额')
 
 @admin.register(UpgradeRecord)
-class UpgradeRecordAdmin(admin.ModelAdmin):
+class UpgradeRecordAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'distributor',
         'from_level',
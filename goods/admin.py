@@ -1,28 +1,52 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import path
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
+from django.db.models import Count
 from .models import Category, Goods
+from .images import GoodsImageService
+from .catalog_io import GoodsExporter, GoodsImporter
+from .tasks import import_goods_catalog
+from core.admin_mixins import LargeTableAdminMixin
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'parent', 'order', 'is_active', 'goods_count', 'created_at']
+class CategoryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['name', 'parent_name', 'order', 'is_active', 'goods_count', 'created_at']
     list_filter = ['is_active', 'parent']
     search_fields = ['name']
     ordering = ['order', 'id']
     list_editable = ['order', 'is_active']
 
+    def get_queryset(self, request):
+        # 商品数量在列表查询中一次分组统计
+        return super().get_queryset(request).annotate(goods_total=Count('goods'))
+
+    def parent_name(self, obj):
+        # 列表中只显示直接父类别
+        return obj.parent.name if obj.parent else '-'
+    parent_name.short_description = _('父类别')
+    parent_name.admin_order_field = 'parent__name'
+
     def goods_count(self, obj):
-        return obj.goods.count()
+        return obj.goods_total
     goods_count.short_description = _('商品数量')
+    goods_count.admin_order_field = 'goods_total'
 
 @admin.register(Goods)
-class GoodsAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price', 'stock', 'sales', 
+class GoodsAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['name', 'category_name', 'price', 'stock', 'sales', 
                    'show_image', 'is_active', 'created_at']
     list_filter = ['is_active', 'category']
     search_fields = ['name', 'description']
     list_editable = ['price', 'stock', 'is_active']
     readonly_fields = ['sales', 'created_at', 'updated_at', 'show_image']
+    change_list_template = 'admin/goods/goods/change_list.html'
     
     fieldsets = [
         (_('基本信息'), {
@@ -38,8 +62,57 @@ class GoodsAdmin(admin.ModelAdmin):
 
     def show_image(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="50" height="50" />', obj.image.url)
+            return format_html('<img src="{}" width="50" height="50" />', GoodsImageService.get_url(obj, 'thumb'))
         return _('暂无图片')
     show_image.short_description = _('商品图片')
 
+    def category_name(self, obj):
+        return obj.category.name
+    category_name.short_description = _('商品分类')
+    category_name.admin_order_field = 'category__name'
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='goods_goods_import'),
+            path('export/', self.admin_site.admin_view(self.export_view), name='goods_goods_export'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """批量导入商品（CSV/JSONL）"""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:goods_goods_changelist')
+
+        if request.method == 'POST' and request.FILES.get('file'):
+            upload = request.FILES['file']
+            fmt = 'jsonl' if upload.name.lower().endswith(('.jsonl', '.json')) else 'csv'
+            # 大文件导入耗时较长，保存后交给后台任务处理
+            path = default_storage.save(f"imports/goods/{timezone.now():%Y%m%d%H%M%S}_{upload.name}", upload)
+            import_goods_catalog.delay(path, fmt)
+            self.message_user(request, '文件已上传，正在后台导入，完成后可在导入页面查看结果', messages.SUCCESS)
+            return redirect('admin:goods_goods_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': '导入商品',
+            'last_result': cache.get(GoodsImporter.RESULT_KEY),
+        }
+        return render(request, 'admin/goods_import.html', context)
+
+    def export_view(self, request):
+        """流式导出全部商品"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        fmt = request.GET.get('format', 'csv')
+        filename = f"goods_{timezone.now():%Y%m%d%H%M%S}"
+        if fmt == 'jsonl':
+            response = StreamingHttpResponse(GoodsExporter.stream_jsonl(), content_type='application/x-ndjson')
+            filename += '.jsonl'
+        else:
+            response = StreamingHttpResponse(GoodsExporter.stream_csv(), content_type='text/csv; charset=utf-8')
+            filename += '.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 # Register your models here.
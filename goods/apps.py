@@ -5,3 +5,6 @@ class GoodsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'goods'
     verbose_name = _('商品管理')
+
+    def ready(self):
+        from . import signals  # noqa: F401
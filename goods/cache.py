@@ -0,0 +1,127 @@
+import hashlib
+import json
+import uuid
+import logging
+from django.core.cache import cache
+
+logger = logging.getLogger('goods')
+
+
+class CatalogCache:
+    """商品目录响应缓存
+
+    缓存条目记录写入时各标签的版本号，读取时与当前版本比对，
+    任一标签被清除（版本变化）即视为失效，无需逐个查找删除缓存键。
+    """
+    KEY_PREFIX = 'goods:catalog'
+    TAG_PREFIX = 'goods:tag'
+    TIMEOUT = 60 * 10  # 缓存10分钟
+    TAG_TIMEOUT = 60 * 60 * 24  # 标签版本保留1天
+
+    # 参与缓存键计算的查询参数
+    CACHE_PARAMS = (
+        'category', 'category_subtree', 'is_on_sale', 'min_price', 'max_price',
+        'search', 'ordering', 'page', 'cursor', 'window', 'price_buckets',
+    )
+
+    # 全量目录标签：未按分类过滤的列表依赖整个目录
+    TAG_CATALOG = 'catalog'
+    # 分类列表标签
+    TAG_CATEGORY_LIST = 'category_list'
+
+    @staticmethod
+    def category_tag(category_id):
+        return f'category:{category_id}'
+
+    @staticmethod
+    def goods_tag(goods_id):
+        return f'goods:{goods_id}'
+
+    @staticmethod
+    def get_role(request):
+        """佣金只区分分销商等级，匿名用户与普通用户共用缓存"""
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 1
+        return user.role if user.role in (2, 3) else 1
+
+    @classmethod
+    def normalize_params(cls, query_params):
+        """规范化查询参数"""
+        params = {}
+        for name in cls.CACHE_PARAMS:
+            value = query_params.get(name)
+            if value is None:
+                continue
+            value = value.strip()
+            if value:
+                params[name] = value
+        return params
+
+    @classmethod
+    def make_key(cls, scope, request):
+        """根据作用域、规范化参数、用户角色和图片格式生成缓存键"""
+        payload = json.dumps({
+            'params': cls.normalize_params(request.query_params),
+            'role': cls.get_role(request),
+            # 图片地址按客户端是否支持WebP返回不同格式
+            'webp': 'image/webp' in request.META.get('HTTP_ACCEPT', ''),
+        }, sort_keys=True)
+        digest = hashlib.md5(payload.encode()).hexdigest()
+        return f'{cls.KEY_PREFIX}:{scope}:{digest}'
+
+    @classmethod
+    def _tag_key(cls, tag):
+        return f'{cls.TAG_PREFIX}:{tag}'
+
+    @classmethod
+    def _tag_versions(cls, tags):
+        """获取标签当前版本，不存在的标签初始化新版本"""
+        keys = {cls._tag_key(tag): tag for tag in tags}
+        versions = cache.get_many(list(keys))
+        for key in keys:
+            if key not in versions:
+                cache.add(key, uuid.uuid4().hex, timeout=cls.TAG_TIMEOUT)
+                versions[key] = cache.get(key)
+        return {keys[key]: version for key, version in versions.items()}
+
+    @classmethod
+    def get(cls, key):
+        """读取缓存，标签版本不一致时返回None"""
+        entry = cache.get(key)
+        if entry is None:
+            return None
+
+        tags = entry['tags']
+        current = cache.get_many([cls._tag_key(tag) for tag in tags])
+        for tag, version in tags.items():
+            if current.get(cls._tag_key(tag)) != version:
+                return None
+        return entry['data']
+
+    @classmethod
+    def set(cls, key, data, tags):
+        """写入缓存并记录标签版本"""
+        entry = {
+            'data': data,
+            'tags': cls._tag_versions(set(tags)),
+        }
+        cache.set(key, entry, timeout=cls.TIMEOUT)
+
+    @classmethod
+    def purge(cls, *tags):
+        """清除标签，所有关联缓存随之失效"""
+        cache.delete_many([cls._tag_key(tag) for tag in tags])
+        logger.info(f"Catalog cache purged for tags: {', '.join(tags)}")
+
+    @classmethod
+    def purge_goods(cls, goods_id, *category_ids):
+        """商品变更时清除商品、所属分类及全量目录标签"""
+        tags = [cls.goods_tag(goods_id), cls.TAG_CATALOG]
+        tags.extend(cls.category_tag(category_id) for category_id in category_ids if category_id)
+        cls.purge(*tags)
+
+    @classmethod
+    def purge_category(cls, category_id):
+        """分类变更时清除分类、分类列表及全量目录标签"""
+        cls.purge(cls.category_tag(category_id), cls.TAG_CATEGORY_LIST, cls.TAG_CATALOG)
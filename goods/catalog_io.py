@@ -0,0 +1,271 @@
+import csv
+import io
+import json
+import logging
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger('goods')
+
+EXPORT_FIELDS = [
+    'id', 'name', 'category', 'price', 'original_price',
+    'stock', 'sales', 'is_active', 'image', 'description',
+]
+
+
+class _Echo:
+    """csv.writer 写入时直接返回该行，配合 StreamingHttpResponse 逐行输出"""
+
+    def write(self, value):
+        return value
+
+
+class GoodsExporter:
+    """商品目录流式导出"""
+    CHUNK_SIZE = 2000
+
+    @classmethod
+    def rows(cls):
+        from .models import Goods
+
+        queryset = Goods.objects.order_by('id').values(
+            'id', 'name', 'category__name', 'price', 'original_price',
+            'stock', 'sales', 'is_active', 'image', 'description'
+        )
+        for row in queryset.iterator(chunk_size=cls.CHUNK_SIZE):
+            row['category'] = row.pop('category__name')
+            yield row
+
+    @classmethod
+    def stream_csv(cls):
+        writer = csv.writer(_Echo())
+        # BOM 让 Excel 正确识别 UTF-8
+        yield '﻿' + writer.writerow(EXPORT_FIELDS)
+        for row in cls.rows():
+            yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+    @classmethod
+    def stream_jsonl(cls):
+        for row in cls.rows():
+            row['price'] = str(row['price'])
+            row['original_price'] = str(row['original_price'])
+            yield json.dumps({field: row[field] for field in EXPORT_FIELDS}, ensure_ascii=False) + '\n'
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+class GoodsImporter:
+    """商品目录流式导入
+
+    逐行读取CSV或JSONL，每 CHUNK_SIZE 行校验一次，有 id 且存在的商品批量更新，
+    其余批量创建。分类按名称解析，名称到ID的映射只查询一次。
+
+    更新时只写入文件中提供了值的列（空单元格视为未提供），销量由订单累计，
+    从不导入。导入文件较大，由 import_goods_catalog 任务在后台执行。
+    """
+    CHUNK_SIZE = 2000
+    BATCH_SIZE = 1000
+    MAX_ERRORS = 100
+    RESULT_KEY = 'goods:import:last_result'
+    RESULT_TIMEOUT = 60 * 60 * 24 * 7
+    # 可导入的列，sales 不在其中
+    IMPORT_FIELDS = [
+        'name', 'category', 'price', 'original_price', 'stock',
+        'is_active', 'image', 'description',
+    ]
+    # 新建商品的必填列
+    REQUIRED_FIELDS = ['name', 'category', 'price']
+
+    def __init__(self):
+        from .models import Category
+
+        self.category_map = {}
+        for category_id, name in Category.objects.order_by('-id').values_list('id', 'name'):
+            # 重名分类取最早创建的
+            self.category_map[name] = category_id
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.touched_ids = []
+        self.image_changed_ids = []
+
+    @staticmethod
+    def read_rows(file, fmt):
+        """从上传文件逐行读取，返回 (行号, 字典) 迭代器"""
+        text = io.TextIOWrapper(file, encoding='utf-8-sig')
+        if fmt == 'jsonl':
+            for line_no, line in enumerate(text, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_no, None
+        else:
+            reader = csv.DictReader(text)
+            for line_no, row in enumerate(reader, start=2):
+                yield line_no, row
+
+    def clean_row(self, row):
+        """校验并转换一行数据，返回 (商品ID, 行中提供了值的字段)"""
+        if not isinstance(row, dict):
+            raise ImportRowError('格式错误')
+
+        provided = {
+            name: row[name] for name in self.IMPORT_FIELDS
+            if row.get(name) is not None and row.get(name) != ''
+        }
+
+        goods_id = row.get('id')
+        try:
+            goods_id = int(goods_id) if goods_id not in (None, '') else None
+        except (ValueError, TypeError):
+            raise ImportRowError('商品ID格式错误')
+
+        fields = {}
+        if 'name' in provided:
+            name = str(provided['name']).strip()
+            if not name:
+                raise ImportRowError('商品名称不能为空')
+            fields['name'] = name[:100]
+
+        if 'category' in provided:
+            category_id = self.category_map.get(str(provided['category']).strip())
+            if category_id is None:
+                raise ImportRowError(f"分类不存在: {provided['category']}")
+            fields['category_id'] = category_id
+
+        try:
+            for name in ('price', 'original_price'):
+                if name in provided:
+                    fields[name] = Decimal(str(provided[name])).quantize(Decimal('0.01'))
+            if 'stock' in provided:
+                fields['stock'] = int(provided['stock'])
+        except (InvalidOperation, ValueError, TypeError):
+            raise ImportRowError('价格或库存格式错误')
+        if any(fields.get(name, 0) < 0 for name in ('price', 'original_price', 'stock')):
+            raise ImportRowError('价格和库存不能为负数')
+
+        if 'is_active' in provided:
+            is_active = provided['is_active']
+            if isinstance(is_active, str):
+                is_active = is_active.strip().lower() in ('1', 'true', 'yes', '是')
+            fields['is_active'] = bool(is_active)
+
+        for name in ('image', 'description'):
+            if name in provided:
+                fields[name] = str(provided[name])
+
+        return goods_id, fields
+
+    def build_new(self, fields):
+        """按行数据构造新商品，缺少必填列时抛出 ImportRowError"""
+        from .models import Goods
+
+        missing = [name for name in self.REQUIRED_FIELDS
+                   if name not in fields and f'{name}_id' not in fields]
+        if missing:
+            raise ImportRowError(f"新增商品缺少字段: {', '.join(missing)}")
+        fields.setdefault('original_price', fields['price'])
+        fields.setdefault('description', '')
+        return Goods(**fields)
+
+    def add_error(self, line_no, message):
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append((line_no, message))
+
+    def import_chunk(self, chunk):
+        """校验并写入一批数据"""
+        from .models import Goods
+
+        cleaned = []
+        for line_no, row in chunk:
+            try:
+                cleaned.append((line_no,) + self.clean_row(row))
+            except ImportRowError as e:
+                self.add_error(line_no, str(e))
+
+        ids = [goods_id for _line_no, goods_id, _fields in cleaned if goods_id]
+        existing = Goods.objects.in_bulk(ids) if ids else {}
+        now = timezone.now()
+
+        # 各行提供的列可能不同，按列组合分组批量更新
+        to_update = defaultdict(list)
+        to_create = []
+        image_changed = set()
+        for line_no, goods_id, fields in cleaned:
+            goods = existing.get(goods_id)
+            if goods is None:
+                try:
+                    to_create.append(self.build_new(fields))
+                except ImportRowError as e:
+                    self.add_error(line_no, str(e))
+                continue
+            if not fields:
+                continue
+            if 'image' in fields and fields['image'] != goods.image.name:
+                image_changed.add(goods.pk)
+            for name, field_value in fields.items():
+                setattr(goods, name, field_value)
+            goods.updated_at = now
+            to_update[tuple(sorted(fields))].append(goods)
+
+        with transaction.atomic():
+            for update_fields, goods_list in to_update.items():
+                Goods.objects.bulk_update(goods_list, [*update_fields, 'updated_at'], batch_size=self.BATCH_SIZE)
+            if to_create:
+                Goods.objects.bulk_create(to_create, batch_size=self.BATCH_SIZE)
+
+        updated = [goods for goods_list in to_update.values() for goods in goods_list]
+        self.updated += len(updated)
+        self.created += len(to_create)
+        self.touched_ids.extend(goods.pk for goods in updated + to_create if goods.pk)
+        self.image_changed_ids.extend(image_changed)
+        self.image_changed_ids.extend(goods.pk for goods in to_create if goods.pk and goods.image)
+
+    def run(self, file, fmt='csv'):
+        chunk = []
+        for line_no, row in self.read_rows(file, fmt):
+            chunk.append((line_no, row))
+            if len(chunk) >= self.CHUNK_SIZE:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+
+        self.refresh_derived_data()
+        logger.info(f"Goods import finished: {self.created} created, {self.updated} updated, {len(self.errors)} errors")
+        return self
+
+    def refresh_derived_data(self):
+        """批量写入不触发信号，导入完成后统一刷新缓存、推荐、搜索索引、详情文档和衍生图"""
+        from .cache import CatalogCache
+        from .recommend import GoodsRecommender
+        from .search import GoodsSearchEngine
+        from .tasks import generate_goods_image_derivatives, rebuild_goods_documents
+
+        CatalogCache.purge(CatalogCache.TAG_CATALOG, CatalogCache.TAG_CATEGORY_LIST,
+                           *[CatalogCache.category_tag(category_id) for category_id in set(self.category_map.values())])
+        GoodsRecommender.invalidate()
+        if self.touched_ids:
+            # 重建快照后各进程重新加载，不依赖按 updated_at 的增量同步
+            GoodsSearchEngine.rebuild()
+        for i in range(0, len(self.touched_ids), self.CHUNK_SIZE):
+            ids = self.touched_ids[i:i + self.CHUNK_SIZE]
+            transaction.on_commit(lambda ids=ids: rebuild_goods_documents.delay(ids))
+        for i in range(0, len(self.image_changed_ids), self.BATCH_SIZE):
+            ids = self.image_changed_ids[i:i + self.BATCH_SIZE]
+            transaction.on_commit(lambda ids=ids: generate_goods_image_derivatives.delay(ids))
+
+    def get_result(self):
+        return {
+            'finished_at': timezone.now(),
+            'created': self.created,
+            'updated': self.updated,
+            'errors': self.errors,
+        }
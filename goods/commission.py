@@ -0,0 +1,67 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+
+CENT = Decimal('0.01')
+
+
+def round_money(value):
+    """金额保留两位小数，银行家舍入（Decimal.quantize 的默认方式，所有佣金计算统一使用）"""
+    return value.quantize(CENT, rounding=ROUND_HALF_EVEN)
+
+
+def _to_units(values):
+    """把Decimal序列转为同一倍率的整数，返回 (整数列表, 小数位数)"""
+    scale = max((-value.as_tuple().exponent for value in values), default=0)
+    scale = max(scale, 0)
+    return [int(value.scaleb(scale)) for value in values], scale
+
+
+def _round_half_even(numerators, divisor):
+    """整数除法并按银行家舍入（与 round_money 一致）"""
+    import numpy as np
+
+    quotient, remainder = np.divmod(numerators, divisor)
+    twice = remainder * 2
+    round_up = (twice > divisor) | ((twice == divisor) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _fen_to_yuan(fen):
+    return Decimal(int(fen)).scaleb(-2)
+
+
+def compute_commissions(goods_list, role):
+    """批量计算一页商品的佣金
+
+    与逐行的 ``round_money(price * rate / 100)`` 结果完全一致：
+    售价转为分、佣金比例转为整数后相乘，按 10^(比例小数位+2) 整除并做银行家舍入，
+    得到以分为单位的佣金。返回 {商品ID: 佣金信息}，普通用户返回空字典。
+    """
+    import numpy as np
+
+    if role not in (2, 3) or not goods_list:
+        return {}
+
+    prices = np.array([int(goods.price.scaleb(2)) for goods in goods_list], dtype=np.int64)
+    rates_1, scale_1 = _to_units([goods.commission_rate_1 for goods in goods_list])
+    amounts_1 = _round_half_even(prices * np.array(rates_1, dtype=np.int64), 10 ** (scale_1 + 2))
+
+    if role == 2:
+        return {
+            goods.pk: {
+                'rate': goods.commission_rate_1,
+                'amount': _fen_to_yuan(amount_1),
+            }
+            for goods, amount_1 in zip(goods_list, amounts_1)
+        }
+
+    rates_2, scale_2 = _to_units([goods.commission_rate_2 for goods in goods_list])
+    amounts_2 = _round_half_even(prices * np.array(rates_2, dtype=np.int64), 10 ** (scale_2 + 2))
+    return {
+        goods.pk: {
+            'rate': goods.commission_rate_1,
+            'amount': _fen_to_yuan(amount_1),
+            'second_rate': goods.commission_rate_2,
+            'second_amount': _fen_to_yuan(amount_2),
+        }
+        for goods, amount_1, amount_2 in zip(goods_list, amounts_1, amounts_2)
+    }
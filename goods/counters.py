@@ -0,0 +1,116 @@
+import logging
+from django.db import transaction
+from django.db.models import F
+from redis.exceptions import ResponseError
+from core.redis_client import get_redis
+
+logger = logging.getLogger('goods')
+
+
+class GoodsSalesCounter:
+    """商品销量缓冲计数器
+
+    支付成功时只在Redis哈希中累加增量（HINCRBY），由定时任务每隔几秒
+    把累积的增量一次 bulk_update 到 Goods.sales，避免促销期间热销商品行的更新争用。
+
+    落库过程：
+    1. 把待落库哈希原子 RENAME 为带序号的批次，新的增量继续写入新哈希；
+    2. 在同一事务中更新销量并把 CounterCheckpoint 推进到该批次序号；
+    3. 事务提交后删除批次。
+    任一步骤中断，下次落库时会先处理遗留批次，已提交的批次根据检查点跳过，
+    因此增量既不会丢失也不会重复计入。
+    """
+    NAME = 'goods_sales'
+    PENDING_KEY = 'goods:sales:pending'
+    BATCH_KEY = 'goods:sales:batch:{}'
+    BATCH_PATTERN = 'goods:sales:batch:*'
+    SEQ_KEY = 'goods:sales:batch_seq'
+    LOCK_KEY = 'goods:sales:flush_lock'
+    LOCK_TIMEOUT = 60
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def incr(cls, items):
+        """累加销量，items 为 (商品ID, 数量) 序列"""
+        pipe = get_redis().pipeline(transaction=False)
+        for goods_id, quantity in items:
+            if goods_id and quantity:
+                pipe.hincrby(cls.PENDING_KEY, goods_id, quantity)
+        pipe.execute()
+
+    @classmethod
+    def record_order(cls, order):
+        """记录已支付订单的商品销量"""
+        cls.incr(order.items.values_list('goods_id', 'quantity'))
+
+    @classmethod
+    def get_pending(cls, goods_ids):
+        """尚未落库的销量增量，返回 {商品ID: 增量}"""
+        goods_ids = list(goods_ids)
+        if not goods_ids:
+            return {}
+        values = get_redis().hmget(cls.PENDING_KEY, goods_ids)
+        return {goods_id: int(value) for goods_id, value in zip(goods_ids, values) if value}
+
+    @classmethod
+    def get_sales(cls, goods):
+        """已落库销量加上未落库增量"""
+        return goods.sales + cls.get_pending([goods.pk]).get(goods.pk, 0)
+
+    @classmethod
+    def apply_batch(cls, seq):
+        """把一个批次的增量写入数据库"""
+        from .models import CounterCheckpoint, Goods
+
+        client = get_redis()
+        batch_key = cls.BATCH_KEY.format(seq)
+        deltas = {int(goods_id): int(delta) for goods_id, delta in client.hgetall(batch_key).items()}
+
+        with transaction.atomic():
+            checkpoint, _created = CounterCheckpoint.objects.select_for_update().get_or_create(name=cls.NAME)
+            if checkpoint.last_batch >= seq:
+                # 上次落库已提交，只是批次没来得及删除
+                deltas = {}
+            elif deltas:
+                existing_ids = set(Goods.objects.filter(pk__in=list(deltas)).values_list('pk', flat=True))
+                objs = []
+                for goods_id in sorted(existing_ids):
+                    goods = Goods(pk=goods_id)
+                    goods.sales = F('sales') + deltas[goods_id]
+                    objs.append(goods)
+                Goods.objects.bulk_update(objs, ['sales'], batch_size=cls.BATCH_SIZE)
+            if checkpoint.last_batch < seq:
+                checkpoint.last_batch = seq
+                checkpoint.save(update_fields=['last_batch', 'updated_at'])
+
+        client.delete(batch_key)
+        return len(deltas)
+
+    @classmethod
+    def flush(cls):
+        """把缓冲的销量增量落库，返回更新的商品数"""
+        client = get_redis()
+        lock = client.lock(cls.LOCK_KEY, timeout=cls.LOCK_TIMEOUT, blocking=False)
+        if not lock.acquire():
+            return 0
+
+        try:
+            flushed = 0
+            # 先处理上次中断遗留的批次
+            pending_batches = sorted(int(key.rsplit(':', 1)[1]) for key in client.scan_iter(cls.BATCH_PATTERN))
+            for seq in pending_batches:
+                flushed += cls.apply_batch(seq)
+
+            if client.exists(cls.PENDING_KEY):
+                seq = client.incr(cls.SEQ_KEY)
+                try:
+                    client.rename(cls.PENDING_KEY, cls.BATCH_KEY.format(seq))
+                except ResponseError:
+                    # 检查与改名之间哈希已被清空
+                    return flushed
+                flushed += cls.apply_batch(seq)
+            if flushed:
+                logger.info(f"Goods sales flushed: {flushed} goods")
+            return flushed
+        finally:
+            lock.release()
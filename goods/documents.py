@@ -0,0 +1,146 @@
+import logging
+from decimal import Decimal
+from types import SimpleNamespace
+from django.core.cache import cache
+from django.utils import timezone
+from .commission import compute_commissions
+from .counters import GoodsSalesCounter
+from .images import GoodsImageService
+
+logger = logging.getLogger('goods')
+
+
+class GoodsDocumentService:
+    """商品详情文档
+
+    商品详情（含分类、图片、规格）预先序列化为JSON文档，保存在
+    GoodsDocument 表并缓存。商品、分类、图片或规格变化时由异步任务重建，
+    请求时只需合并当前用户角色对应的佣金信息。
+
+    库存、销量和上架状态会被不触发保存信号的批量更新修改（下单扣库存、
+    释放预占、销量计数落库），文档中不保存这三项，请求时按主键实时读取。
+    封面同时保存WebP和JPEG地址，按请求的 Accept 选择。
+    """
+    CACHE_KEY = 'goods:document:{}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+    CHUNK_SIZE = 500
+    # 计算佣金所需、不直接返回给客户端的字段
+    PRIVATE_KEY = '_commission_rates'
+    COVERS_KEY = '_covers'
+    LIVE_FIELDS = ['stock', 'sales', 'is_on_sale']
+
+    @classmethod
+    def get_queryset(cls):
+        from .models import Goods
+        return Goods.objects.select_related('category')
+
+    @classmethod
+    def serialize(cls, goods):
+        from .serializers import GoodsDetailSerializer
+
+        data = dict(GoodsDetailSerializer(goods).data)
+        data.pop('commission', None)
+        for field in cls.LIVE_FIELDS:
+            data.pop(field, None)
+        data['cover'] = None
+        data[cls.COVERS_KEY] = GoodsImageService.get_urls(goods, 'detail')
+        data[cls.PRIVATE_KEY] = [str(goods.commission_rate_1), str(goods.commission_rate_2)]
+        return data
+
+    @classmethod
+    def save_documents(cls, documents):
+        """批量写入文档表和缓存，documents 为 {商品ID: 文档}"""
+        from .models import GoodsDocument
+
+        now = timezone.now()
+        GoodsDocument.objects.bulk_create(
+            [GoodsDocument(goods_id=goods_id, data=data, updated_at=now) for goods_id, data in documents.items()],
+            update_conflicts=True,
+            unique_fields=['goods'],
+            update_fields=['data', 'updated_at']
+        )
+        cache.set_many(
+            {cls.CACHE_KEY.format(goods_id): data for goods_id, data in documents.items()},
+            timeout=cls.CACHE_TIMEOUT
+        )
+
+    @classmethod
+    def rebuild(cls, goods_id):
+        """重建单个商品的文档，商品不存在时删除文档"""
+        from .models import GoodsDocument
+
+        goods = cls.get_queryset().filter(pk=goods_id).first()
+        if goods is None:
+            GoodsDocument.objects.filter(goods_id=goods_id).delete()
+            cache.delete(cls.CACHE_KEY.format(goods_id))
+            return None
+
+        data = cls.serialize(goods)
+        cls.save_documents({goods.pk: data})
+        return data
+
+    @classmethod
+    def rebuild_all(cls, queryset=None):
+        """分批重建全部商品文档"""
+        from .models import Goods
+
+        if queryset is None:
+            queryset = Goods.objects.all()
+        goods_ids = list(queryset.order_by('id').values_list('id', flat=True))
+
+        for i in range(0, len(goods_ids), cls.CHUNK_SIZE):
+            chunk = cls.get_queryset().filter(id__in=goods_ids[i:i + cls.CHUNK_SIZE])
+            cls.save_documents({goods.pk: cls.serialize(goods) for goods in chunk})
+        logger.info(f"Goods documents rebuilt: {len(goods_ids)} goods")
+        return len(goods_ids)
+
+    @classmethod
+    def get(cls, goods_id):
+        """获取商品文档：缓存 -> 文档表 -> 现场构建"""
+        from .models import GoodsDocument
+
+        key = cls.CACHE_KEY.format(goods_id)
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        data = GoodsDocument.objects.filter(goods_id=goods_id).values_list('data', flat=True).first()
+        if data is not None:
+            cache.set(key, data, timeout=cls.CACHE_TIMEOUT)
+            return data
+        return cls.rebuild(goods_id)
+
+    @classmethod
+    def get_state(cls, goods_id):
+        """实时读取商品的库存、销量和上架状态，商品不存在时返回 None"""
+        from .models import Goods
+        return Goods.objects.filter(pk=goods_id).values(*cls.LIVE_FIELDS).first()
+
+    @classmethod
+    def render(cls, data, request, state):
+        """合并实时库存销量和当前用户的佣金信息，生成响应数据"""
+        data = dict(data)
+        rate_1, rate_2 = data.pop(cls.PRIVATE_KEY)
+        covers = data.pop(cls.COVERS_KEY, None) or {}
+        data.update(state)
+
+        commission = None
+        if request.user.is_authenticated:
+            goods = SimpleNamespace(
+                pk=data['id'],
+                price=Decimal(data['price']),
+                commission_rate_1=Decimal(rate_1),
+                commission_rate_2=Decimal(rate_2),
+            )
+            commission = compute_commissions([goods], request.user.role).get(goods.pk)
+        data['commission'] = commission
+        data['sales'] += GoodsSalesCounter.get_pending([data['id']]).get(data['id'], 0)
+
+        # 文档中保存的是相对地址，按当前请求补全
+        cover = covers.get(GoodsImageService.get_format(request))
+        data['cover'] = request.build_absolute_uri(cover) if cover else None
+        data['images'] = [
+            dict(image, image=request.build_absolute_uri(image['image'])) if image.get('image') else image
+            for image in data.get('images', [])
+        ]
+        return data
@@ -0,0 +1,169 @@
+import io
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger('goods')
+
+# 衍生图尺寸（最长边不超过该尺寸，保持比例）
+SIZES = {
+    'thumb': (100, 100),   # 后台列表缩略图
+    'list': (360, 360),    # 商品列表封面
+    'detail': (750, 750),  # 商品详情主图
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVE_DIR = 'goods/derivatives'
+
+
+def derivative_name(name, size, fmt):
+    """衍生图存储路径：goods/2025/01/a.png -> goods/derivatives/2025/01/a_list.webp"""
+    base, _ext = os.path.splitext(name)
+    if base.startswith('goods/'):
+        base = base[len('goods/'):]
+    return f'{DERIVATIVE_DIR}/{base}_{size}.{fmt}'
+
+
+def _flatten(image, has_alpha):
+    """转为RGB，透明背景铺白底（JPEG不支持透明通道）"""
+    from PIL import Image
+
+    if image.mode == 'RGB':
+        return image
+    if not has_alpha:
+        return image.convert('RGB')
+    rgba = image.convert('RGBA')
+    canvas = Image.new('RGB', rgba.size, (255, 255, 255))
+    canvas.paste(rgba, mask=rgba.split()[-1])
+    return canvas
+
+
+def render_derivatives(content):
+    """生成所有尺寸和格式的衍生图（CPU密集，在进程池中执行）
+
+    返回 {(尺寸, 格式): 图片字节}。
+    """
+    from PIL import Image, ImageOps
+
+    results = {}
+    with Image.open(io.BytesIO(content)) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ('RGBA', 'LA', 'PA') or 'transparency' in original.info
+        for size, box in SIZES.items():
+            image = original.copy()
+            image.thumbnail(box, Image.LANCZOS)
+            for fmt, (pil_format, options) in FORMATS.items():
+                if fmt == 'webp' and has_alpha:
+                    output = image.convert('RGBA')
+                else:
+                    output = _flatten(image, has_alpha)
+                buffer = io.BytesIO()
+                output.save(buffer, pil_format, **options)
+                results[(size, fmt)] = buffer.getvalue()
+    return results
+
+
+class GoodsImageService:
+    """商品主图衍生图"""
+    MAX_WORKERS = os.cpu_count() or 2
+
+    @staticmethod
+    def can_use_process_pool():
+        # Celery prefork 子进程是守护进程，不能再创建子进程
+        return not multiprocessing.current_process().daemon
+
+    @classmethod
+    def render_many(cls, contents):
+        """批量生成衍生图，contents 为 {商品ID: 原图字节}"""
+        if len(contents) > 1 and cls.can_use_process_pool():
+            with ProcessPoolExecutor(max_workers=min(cls.MAX_WORKERS, len(contents))) as executor:
+                futures = {goods_id: executor.submit(render_derivatives, content)
+                           for goods_id, content in contents.items()}
+                results = {}
+                for goods_id, future in futures.items():
+                    try:
+                        results[goods_id] = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to render image derivatives for goods {goods_id}: {str(e)}")
+                return results
+
+        results = {}
+        for goods_id, content in contents.items():
+            try:
+                results[goods_id] = render_derivatives(content)
+            except Exception as e:
+                logger.error(f"Failed to render image derivatives for goods {goods_id}: {str(e)}")
+        return results
+
+    @staticmethod
+    def store(name, rendered):
+        """保存衍生图，返回 {尺寸: {格式: 存储路径}}"""
+        derivatives = {}
+        for (size, fmt), content in rendered.items():
+            path = derivative_name(name, size, fmt)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            derivatives.setdefault(size, {})[fmt] = default_storage.save(path, ContentFile(content))
+        return derivatives
+
+    @classmethod
+    def generate(cls, goods_list):
+        """为商品生成衍生图并更新 image_derivatives 字段"""
+        from .models import Goods
+        from .cache import CatalogCache
+        from .documents import GoodsDocumentService
+
+        contents = {}
+        names = {}
+        for goods in goods_list:
+            if not goods.image:
+                continue
+            try:
+                with default_storage.open(goods.image.name, 'rb') as f:
+                    contents[goods.pk] = f.read()
+                names[goods.pk] = goods.image.name
+            except Exception as e:
+                logger.error(f"Failed to read image for goods {goods.pk}: {str(e)}")
+
+        rendered = cls.render_many(contents)
+        for goods in goods_list:
+            if goods.pk not in rendered:
+                continue
+            derivatives = cls.store(names[goods.pk], rendered[goods.pk])
+            # 不触发保存信号，避免重复生成
+            Goods.objects.filter(pk=goods.pk, image=names[goods.pk]).update(image_derivatives=derivatives)
+            CatalogCache.purge_goods(goods.pk, goods.category_id)
+
+        if rendered:
+            GoodsDocumentService.rebuild_all(Goods.objects.filter(pk__in=list(rendered)))
+        return len(rendered)
+
+    @staticmethod
+    def get_format(request=None):
+        """按请求的 Accept 选择图片格式，没有请求时使用兼容性最好的JPEG"""
+        if request is not None and 'image/webp' in request.META.get('HTTP_ACCEPT', ''):
+            return 'webp'
+        return 'jpeg'
+
+    @staticmethod
+    def get_urls(goods, size):
+        """指定尺寸各格式的相对地址 {格式: 地址}，衍生图未生成时为原图"""
+        derivatives = (goods.image_derivatives or {}).get(size, {})
+        fallback = goods.image.url if goods.image else None
+        return {
+            fmt: default_storage.url(derivatives[fmt]) if derivatives.get(fmt) else fallback
+            for fmt in ('webp', 'jpeg')
+        }
+
+    @classmethod
+    def get_url(cls, goods, size, request=None):
+        """获取指定尺寸的图片地址，客户端支持时优先WebP，衍生图未生成时返回原图"""
+        url = cls.get_urls(goods, size)[cls.get_format(request)]
+        if url is None:
+            return None
+        return request.build_absolute_uri(url) if request else url
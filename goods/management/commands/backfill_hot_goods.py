@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from goods.ranking import HotGoodsRanking
+
+
+class Command(BaseCommand):
+    help = '根据历史订单重建热销排行的销量桶'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='回溯天数')
+
+    def handle(self, *args, **options):
+        HotGoodsRanking.backfill(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"已重建最近 {options['days']} 天的热销排行"))
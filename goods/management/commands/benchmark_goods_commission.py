@@ -0,0 +1,59 @@
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from goods.models import Category, Goods
+from goods.serializers import GoodsListSerializer
+
+
+class Command(BaseCommand):
+    help = '对比100条商品列表页逐行计算佣金与整页批量计算佣金的序列化耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='每页商品数')
+        parser.add_argument('--repeat', type=int, default=200, help='重复次数')
+
+    def make_goods(self, rng, count):
+        category = Category(id=1, name='benchmark')
+        goods_list = []
+        for i in range(1, count + 1):
+            price = Decimal(rng.randint(100, 1000000)) / 100
+            goods = Goods(
+                id=i,
+                name=f'商品{i}',
+                category=category,
+                price=price,
+                original_price=price,
+                sales=rng.randint(0, 10000),
+                image='goods/benchmark.jpg',
+            )
+            goods.cover = goods.image
+            goods.is_on_sale = True
+            goods.commission_rate_1 = Decimal(rng.randint(0, 3000)) / 100
+            goods.commission_rate_2 = Decimal(rng.randint(0, 1500)) / 100
+            goods_list.append(goods)
+        return goods_list
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        repeat = options['repeat']
+        goods_list = self.make_goods(rng, options['page_size'])
+
+        self.stdout.write(f"{'角色':<6}{'逐行(ms)':>12}{'批量(ms)':>12}{'结果一致':>10}")
+        for role in (1, 2, 3):
+            user = SimpleNamespace(is_authenticated=True, role=role)
+            context = {'request': SimpleNamespace(user=user)}
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                per_row = [GoodsListSerializer(goods, context=context).data for goods in goods_list]
+            per_row_ms = (time.perf_counter() - started) * 1000 / repeat
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                batch = GoodsListSerializer(goods_list, many=True, context=dict(context)).data
+            batch_ms = (time.perf_counter() - started) * 1000 / repeat
+
+            same = [dict(item)['commission'] for item in per_row] == [dict(item)['commission'] for item in batch]
+            self.stdout.write(f'{role:<6}{per_row_ms:>12.2f}{batch_ms:>12.2f}{str(same):>10}')
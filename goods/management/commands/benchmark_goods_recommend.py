@@ -0,0 +1,42 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from goods.recommend import GoodsSampler
+
+
+class Command(BaseCommand):
+    help = '测试推荐抽样器在不同商品规模下的抽取耗时（应与商品数量无关）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=10, help='每次抽取数量')
+        parser.add_argument('--repeat', type=int, default=10000, help='每种规模的抽取次数')
+        parser.add_argument('--categories', type=int, default=50, help='分类数量')
+
+    def handle(self, *args, **options):
+        k = options['k']
+        repeat = options['repeat']
+        categories = options['categories']
+        rng = random.Random(42)
+
+        self.stdout.write(f"{'商品数':>10}{'均匀(us)':>12}{'分类加权(us)':>14}{'去重(us)':>12}")
+        for size in (1000, 10000, 100000, 1000000):
+            sampler = GoodsSampler((goods_id, goods_id % categories) for goods_id in range(1, size + 1))
+            weights = {0: 3, 1: 3, 2: 3}
+            exclude = set(range(1, 51))
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                sampler.sample(k, rng=rng)
+            uniform_us = (time.perf_counter() - started) * 1e6 / repeat
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                sampler.sample(k, weights, rng=rng)
+            weighted_us = (time.perf_counter() - started) * 1e6 / repeat
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                sampler.sample(k, exclude=exclude, rng=rng)
+            dedup_us = (time.perf_counter() - started) * 1e6 / repeat
+
+            self.stdout.write(f'{size:>10}{uniform_us:>12.2f}{weighted_us:>14.2f}{dedup_us:>12.2f}')
@@ -0,0 +1,80 @@
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from goods.models import Category, Goods
+from goods.search import GoodsSearchEngine
+
+WORDS = [
+    '苹果', '华为', '小米', '手机', '平板', '耳机', '数据线', '充电器', '保护壳', '钢化膜',
+    '蓝牙', '无线', '快充', '原装', '正品', '旗舰', '轻薄', '大容量', '高清', '智能',
+    '手表', '音箱', '键盘', '鼠标', '显示器', '笔记本', '电脑', '相机', '镜头', '支架',
+]
+
+QUERIES = ['手机', '蓝牙耳机', '无线充电器', '原装数据线', '智能手表', '高清显示器', 'iphone']
+
+
+class Command(BaseCommand):
+    help = '在合成数据上对比倒排索引搜索与数据库ILIKE搜索的耗时（数据在事务中回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000, help='合成商品数量')
+        parser.add_argument('--repeat', type=int, default=20, help='每个搜索词重复次数')
+
+    def make_text(self, rng, words):
+        return ''.join(rng.choice(WORDS) for _ in range(words))
+
+    def handle(self, *args, **options):
+        count = options['count']
+        repeat = options['repeat']
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            category = Category.objects.create(name='benchmark')
+            batch = []
+            for i in range(count):
+                price = Decimal(rng.randint(100, 1000000)) / 100
+                batch.append(Goods(
+                    name=self.make_text(rng, 4),
+                    category=category,
+                    price=price,
+                    original_price=price,
+                    stock=100,
+                    sales=rng.randint(0, 10000),
+                    image='goods/benchmark.jpg',
+                    description=self.make_text(rng, 60),
+                ))
+                if len(batch) >= 5000:
+                    Goods.objects.bulk_create(batch)
+                    batch = []
+            Goods.objects.bulk_create(batch)
+            self.stdout.write(f'已生成 {count} 个合成商品')
+
+            started = time.perf_counter()
+            index = GoodsSearchEngine.build(Goods.objects.filter(category=category))
+            build_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'索引构建耗时 {build_ms:.0f} ms')
+
+            self.stdout.write(f"{'搜索词':<12}{'ILIKE(ms)':>12}{'索引(ms)':>12}{'命中数':>10}")
+            for query in QUERIES:
+                queryset = Goods.objects.filter(category=category).filter(
+                    Q(name__icontains=query) | Q(description__icontains=query)
+                ).order_by('-created_at')
+
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    db_count = queryset.count()
+                    list(queryset.values_list('id', flat=True)[:10])
+                db_ms = (time.perf_counter() - started) * 1000 / repeat
+
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    result = index.search(query, limit=10)
+                index_ms = (time.perf_counter() - started) * 1000 / repeat
+
+                hits = result[0] if result else db_count
+                self.stdout.write(f'{query:<12}{db_ms:>12.2f}{index_ms:>12.2f}{hits:>10}')
+
+            transaction.set_rollback(True)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from goods.images import GoodsImageService
+from goods.models import Goods
+
+
+class Command(BaseCommand):
+    help = '为已有商品主图批量生成衍生图（列表、详情、后台缩略图，WebP和JPEG）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='每批处理的商品数')
+        parser.add_argument('--all', action='store_true', help='重新生成所有商品（默认只处理尚未生成的）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Goods.objects.exclude(image='')
+        if not options['all']:
+            queryset = queryset.filter(image_derivatives={})
+
+        goods_ids = list(queryset.order_by('id').values_list('id', flat=True))
+        done = 0
+        for i in range(0, len(goods_ids), batch_size):
+            batch = list(Goods.objects.filter(id__in=goods_ids[i:i + batch_size]))
+            done += GoodsImageService.generate(batch)
+            self.stdout.write(f'已处理 {min(i + batch_size, len(goods_ids))}/{len(goods_ids)}')
+
+        self.stdout.write(self.style.SUCCESS(f'已为 {done} 个商品生成衍生图'))
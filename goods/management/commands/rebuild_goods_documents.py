@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from goods.documents import GoodsDocumentService
+
+
+class Command(BaseCommand):
+    help = '批量重建所有商品的详情文档'
+
+    def handle(self, *args, **options):
+        count = GoodsDocumentService.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'已重建 {count} 个商品的详情文档'))
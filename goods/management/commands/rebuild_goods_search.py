@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from goods.search import GoodsSearchEngine
+
+
+class Command(BaseCommand):
+    help = '重建商品搜索索引并写入快照'
+
+    def handle(self, *args, **options):
+        index = GoodsSearchEngine.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'商品搜索索引已重建：{len(index)} 个商品，快照 {GoodsSearchEngine.snapshot_path()}'
+        ))
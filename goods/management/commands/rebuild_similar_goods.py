@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from goods.similarity import SimilarGoodsService
+
+
+class Command(BaseCommand):
+    help = '根据历史订单重新计算共同购买相似商品'
+
+    def handle(self, *args, **options):
+        count = SimilarGoodsService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'已更新 {count} 个商品的相似商品'))
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="goods",
+            index=models.Index(fields=["price", "id"], name="goods_price_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="goods",
+            index=models.Index(fields=["sales", "id"], name="goods_sales_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="goods",
+            index=models.Index(fields=["created_at", "id"], name="goods_created_id_idx"),
+        ),
+    ]
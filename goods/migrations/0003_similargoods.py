@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0002_goods_cursor_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimilarGoods",
+            fields=[
+                (
+                    "goods",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="similar",
+                        serialize=False,
+                        to="goods.goods",
+                        verbose_name="商品",
+                    ),
+                ),
+                (
+                    "neighbours",
+                    models.JSONField(default=list, verbose_name="相似商品ID"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+            ],
+            options={
+                "verbose_name": "相似商品",
+                "verbose_name_plural": "相似商品",
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+def populate_category_paths(apps, schema_editor):
+    """为已有分类逐层生成物化路径"""
+    Category = apps.get_model("goods", "Category")
+    width = 10
+
+    paths = {}
+    level = list(Category.objects.filter(parent__isnull=True).values_list("id", flat=True))
+    parent_paths = {category_id: "" for category_id in level}
+    while level:
+        for category_id in level:
+            paths[category_id] = f"{parent_paths[category_id]}{category_id:0{width}d}/"
+        children = Category.objects.filter(parent_id__in=level).values_list("id", "parent_id")
+        parent_paths = {category_id: paths[parent_id] for category_id, parent_id in children}
+        level = list(parent_paths)
+
+    for category_id, path in paths.items():
+        Category.objects.filter(pk=category_id).update(path=path, depth=path.count("/") - 1)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0003_similargoods"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, verbose_name="分类路径"
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False, verbose_name="层级"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["path"],
+                name="category_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.RunPython(populate_category_paths, migrations.RunPython.noop),
+    ]
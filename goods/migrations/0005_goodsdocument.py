@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0004_category_path"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GoodsDocument",
+            fields=[
+                (
+                    "goods",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="document",
+                        serialize=False,
+                        to="goods.goods",
+                        verbose_name="商品",
+                    ),
+                ),
+                ("data", models.JSONField(default=dict, verbose_name="详情数据")),
+                ("updated_at", models.DateTimeField(verbose_name="更新时间")),
+            ],
+            options={
+                "verbose_name": "商品详情文档",
+                "verbose_name_plural": "商品详情文档",
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0005_goodsdocument"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="goods",
+            name="image_derivatives",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="主图衍生图"
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0006_goods_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CounterCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=50, unique=True, verbose_name="计数器"),
+                ),
+                (
+                    "last_batch",
+                    models.BigIntegerField(default=0, verbose_name="已落库批次"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+            ],
+            options={
+                "verbose_name": "计数器进度",
+                "verbose_name_plural": "计数器进度",
+            },
+        ),
+    ]
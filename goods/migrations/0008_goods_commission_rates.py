@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0007_countercheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="goods",
+            name="commission_rate_1",
+            field=models.DecimalField(
+                decimal_places=2, default=0, max_digits=5, verbose_name="一级佣金比例(%)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="goods",
+            name="commission_rate_2",
+            field=models.DecimalField(
+                decimal_places=2, default=0, max_digits=5, verbose_name="二级佣金比例(%)"
+            ),
+        ),
+    ]
@@ -1,13 +1,25 @@
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.translation import gettext_lazy as _
 
 class Category(models.Model):
-    """商品分类"""
+    """商品分类
+
+    path 为物化路径，由祖先到自身的ID逐级拼接（定长补零，以/结尾），
+    子树查询只需一个 path 前缀条件，保存时自动维护。
+    """
+    PATH_WIDTH = 10
+
     name = models.CharField(_('分类名称'), max_length=50)
     parent = models.ForeignKey('self', verbose_name=_('父类别'), null=True, blank=True, 
                              on_delete=models.CASCADE, related_name='children')
     order = models.IntegerField(_('排序'), default=0)
     is_active = models.BooleanField(_('是否启用'), default=True)
+    path = models.CharField(_('分类路径'), max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(_('层级'), default=0, editable=False)
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
     updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
 
@@ -15,11 +27,81 @@ class Category(models.Model):
         verbose_name = _('商品分类')
         verbose_name_plural = _('商品分类')
         ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    NAMES_CACHE_KEY = 'goods:category:names'
+    NAMES_CACHE_TIMEOUT = 60 * 60
 
     def __str__(self):
-        if self.parent:
-            return f'{self.parent} - {self.name}'
-        return self.name
+        if not self.parent_id:
+            return self.name
+        # 优先沿已加载的父类别链拼接（select_related 时不查询）
+        names = [self.name]
+        node = self
+        while node.parent_id and Category.parent.is_cached(node):
+            node = node.parent
+            names.append(node.name)
+        if not node.parent_id:
+            return ' - '.join(reversed(names))
+        # 父类别链未加载时使用缓存的分类名称
+        category_names = Category.get_names()
+        ancestor_ids = [int(segment) for segment in self.path.split('/')[:-2]]
+        return ' - '.join([category_names.get(ancestor_id, '') for ancestor_id in ancestor_ids] + [self.name])
+
+    @classmethod
+    def get_names(cls):
+        """全部分类的 {ID: 名称}，缓存在分类保存或删除时清除"""
+        names = cache.get(cls.NAMES_CACHE_KEY)
+        if names is None:
+            names = dict(cls.objects.values_list('id', 'name'))
+            cache.set(cls.NAMES_CACHE_KEY, names, timeout=cls.NAMES_CACHE_TIMEOUT)
+        return names
+
+    @classmethod
+    def make_path(cls, parent_path, pk):
+        return f'{parent_path}{pk:0{cls.PATH_WIDTH}d}/'
+
+    def get_parent_path(self):
+        """父类别的路径，父类别为自身或在自身子树中时抛出 ValidationError"""
+        if not self.parent_id:
+            return ''
+        parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+        # 父类别路径包含自身ID说明父类别在自身子树中（或就是自身）
+        if self.pk and (self.parent_id == self.pk or str(self.pk).zfill(self.PATH_WIDTH) in parent_path.split('/')):
+            raise ValidationError({'parent': _('不能将分类移动到其自身或子分类下')})
+        return parent_path
+
+    def clean(self):
+        super().clean()
+        self.get_parent_path()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old_path, old_depth = self.path, self.depth
+            parent_path = self.get_parent_path()
+
+            if self.pk:
+                self.path = self.make_path(parent_path, self.pk)
+                self.depth = self.path.count('/') - 1
+            super().save(*args, **kwargs)
+
+            if not old_path or not self.path:
+                # 新建分类插入后才有ID
+                self.path = self.make_path(parent_path, self.pk)
+                self.depth = self.path.count('/') - 1
+                Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+            elif self.path != old_path:
+                # 移动分类时一次更新整个子树的路径
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (self.depth - old_depth)
+                )
+
+    def get_subtree(self):
+        """自身及所有子孙分类"""
+        return Category.objects.filter(path__startswith=self.path)
 
 class Goods(models.Model):
     """商品"""
@@ -30,7 +112,10 @@ class Goods(models.Model):
     original_price = models.DecimalField(_('原价'), max_digits=10, decimal_places=2)
     stock = models.IntegerField(_('库存'), default=0)
     sales = models.IntegerField(_('销量'), default=0)
+    commission_rate_1 = models.DecimalField(_('一级佣金比例(%)'), max_digits=5, decimal_places=2, default=0)
+    commission_rate_2 = models.DecimalField(_('二级佣金比例(%)'), max_digits=5, decimal_places=2, default=0)
     image = models.ImageField(_('主图'), upload_to='goods/%Y/%m')
+    image_derivatives = models.JSONField(_('主图衍生图'), default=dict, blank=True, editable=False)
     description = models.TextField(_('商品描述'))
     is_active = models.BooleanField(_('是否上架'), default=True)
     created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
@@ -40,9 +125,56 @@ class Goods(models.Model):
         verbose_name = _('商品')
         verbose_name_plural = _('商品管理')
         ordering = ['-created_at']
+        # 游标分页按 (排序字段, id) 取数，升序降序共用同一索引
+        indexes = [
+            models.Index(fields=['price', 'id'], name='goods_price_id_idx'),
+            models.Index(fields=['sales', 'id'], name='goods_sales_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='goods_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
-    
+
+class SimilarGoods(models.Model):
+    """共同购买相似商品（由定时任务批量计算）"""
+    goods = models.OneToOneField(Goods, verbose_name=_('商品'), primary_key=True,
+                                 on_delete=models.CASCADE, related_name='similar')
+    neighbours = models.JSONField(_('相似商品ID'), default=list)
+    updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('相似商品')
+        verbose_name_plural = _('相似商品')
+
+    def __str__(self):
+        return str(self.goods_id)
+
+class GoodsDocument(models.Model):
+    """预先序列化的商品详情文档"""
+    goods = models.OneToOneField(Goods, verbose_name=_('商品'), primary_key=True,
+                                 on_delete=models.CASCADE, related_name='document')
+    data = models.JSONField(_('详情数据'), default=dict)
+    updated_at = models.DateTimeField(_('更新时间'))
+
+    class Meta:
+        verbose_name = _('商品详情文档')
+        verbose_name_plural = _('商品详情文档')
+
+    def __str__(self):
+        return str(self.goods_id)
+
 
 # Create your models here.
+
+class CounterCheckpoint(models.Model):
+    """缓冲计数器的落库进度，与计数更新在同一事务中写入，保证每批增量只落库一次"""
+    name = models.CharField(_('计数器'), max_length=50, unique=True)
+    last_batch = models.BigIntegerField(_('已落库批次'), default=0)
+    updated_at = models.DateTimeField(_('更新时间'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('计数器进度')
+        verbose_name_plural = _('计数器进度')
+
+    def __str__(self):
+        return f"{self.name}: {self.last_batch}"
@@ -0,0 +1,126 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class GoodsCursorPagination(BasePagination):
+    """商品游标分页
+
+    按 (排序字段, id) 做键集分页，下一页条件为
+    ``field <= v AND (field < v OR id < last_id)``（降序时），
+    前半部分可直接定位到复合索引的起点，翻到多深都不需要 OFFSET，
+    也不需要 COUNT(*)。游标为 base64 编码的不透明字符串。
+
+    响应保留页码分页的键：count 固定为 null（不统计总数），previous 固定为 null
+    （只能向后翻页），按 next 链接翻页。旧客户端的 page 参数（第1页除外）返回400，
+    避免忽略页码后一直拿到第一页。
+    """
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    ordering_param = 'ordering'
+    page_size = api_settings.PAGE_SIZE
+    default_ordering = '-created_at'
+    invalid_cursor_message = '无效的游标'
+    page_not_supported_message = '列表已改为游标分页，不支持page参数，请按next链接翻页'
+
+    # 排序字段及其游标值的解析方式
+    ordering_fields = {
+        'price': Decimal,
+        'sales': int,
+        'created_at': datetime.fromisoformat,
+    }
+
+    def get_page_size(self, request):
+        return self.page_size
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param, '').strip()
+        if ordering.lstrip('-') in self.ordering_fields:
+            return ordering
+        return self.default_ordering
+
+    def encode_cursor(self, ordering, value, pk):
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = json.dumps({'o': ordering, 'v': str(value), 'id': pk}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, ordering):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if payload['o'] != ordering:
+                raise ValueError('ordering mismatch')
+            parse = self.ordering_fields[ordering.lstrip('-')]
+            return parse(payload['v']), int(payload['id'])
+        except (KeyError, TypeError, ValueError, InvalidOperation, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if request.query_params.get(self.page_query_param, '1') != '1':
+            raise ValidationError({self.page_query_param: self.page_not_supported_message})
+        self.ordering = self.get_ordering(request)
+        field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+
+        if descending:
+            queryset = queryset.order_by(f'-{field}', '-id')
+        else:
+            queryset = queryset.order_by(field, 'id')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor, self.ordering)
+            queryset = self.filter_after_cursor(queryset, field, descending, value, pk)
+
+        # 多取一条判断是否还有下一页
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def filter_after_cursor(self, queryset, field, descending, value, pk):
+        """游标之后的数据"""
+        if descending:
+            return queryset.filter(**{f'{field}__lte': value}).filter(
+                Q(**{f'{field}__lt': value}) | Q(id__lt=pk)
+            )
+        return queryset.filter(**{f'{field}__gte': value}).filter(
+            Q(**{f'{field}__gt': value}) | Q(id__gt=pk)
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        field = self.ordering.lstrip('-')
+        cursor = self.encode_cursor(self.ordering, getattr(last, field), last.pk)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': None,
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,137 @@
+import logging
+from datetime import timedelta
+from django.utils import timezone
+from core.redis_client import get_redis
+
+logger = logging.getLogger('goods')
+
+
+class HotGoodsRanking:
+    """按时间窗口统计的热销排行
+
+    已支付订单的商品销量按小时和按天写入Redis有序集合，
+    24小时榜合并最近24个小时桶，7天/30天榜合并对应的天桶。
+    合并结果短暂缓存，读取热销榜只是一次有序集合的范围查询。
+    """
+    HOUR_KEY = 'goods:sales:hour:{}'
+    DAY_KEY = 'goods:sales:day:{}'
+    RANK_KEY = 'goods:hot:{}'
+    HOUR_TTL = 60 * 60 * 48  # 小时桶保留2天
+    DAY_TTL = 60 * 60 * 24 * 32  # 天桶保留32天
+    RANK_TTL = 60  # 合并结果缓存1分钟
+
+    WINDOWS = {
+        '24h': ('hour', 24),
+        '7d': ('day', 7),
+        '30d': ('day', 30),
+    }
+    DEFAULT_WINDOW = '7d'
+
+    # 计入销量的订单状态
+    PAID_STATUSES = ['paid', 'shipped', 'delivered', 'completed']
+
+    @classmethod
+    def hour_key(cls, moment):
+        return cls.HOUR_KEY.format(moment.strftime('%Y%m%d%H'))
+
+    @classmethod
+    def day_key(cls, moment):
+        return cls.DAY_KEY.format(moment.strftime('%Y%m%d'))
+
+    @classmethod
+    def bucket_keys(cls, window, now=None):
+        """窗口内所有桶的键"""
+        unit, size = cls.WINDOWS[window]
+        now = now or timezone.now()
+        if unit == 'hour':
+            return [cls.hour_key(now - timedelta(hours=i)) for i in range(size)]
+        return [cls.day_key(now - timedelta(days=i)) for i in range(size)]
+
+    @classmethod
+    def record(cls, items, paid_at=None, sign=1):
+        """记录销量，items为 (商品ID, 数量) 序列；sign 为 -1 时从销量桶中扣除"""
+        paid_at = paid_at or timezone.now()
+        hour_key = cls.hour_key(paid_at)
+        day_key = cls.day_key(paid_at)
+
+        pipe = get_redis().pipeline(transaction=False)
+        for goods_id, quantity in items:
+            if not goods_id:
+                continue
+            pipe.zincrby(hour_key, sign * quantity, goods_id)
+            pipe.zincrby(day_key, sign * quantity, goods_id)
+        if sign < 0:
+            # 扣除后销量不为正的商品移出桶
+            pipe.zremrangebyscore(hour_key, '-inf', 0)
+            pipe.zremrangebyscore(day_key, '-inf', 0)
+        pipe.expire(hour_key, cls.HOUR_TTL)
+        pipe.expire(day_key, cls.DAY_TTL)
+        pipe.execute()
+
+    @classmethod
+    def record_order(cls, order):
+        """记录已支付订单的商品销量"""
+        items = order.items.values_list('goods_id', 'quantity')
+        cls.record(items, order.paid_at)
+
+    @classmethod
+    def remove_order(cls, order):
+        """订单退款后从支付时间对应的销量桶中扣除（与 backfill 不计退款订单一致）"""
+        if not order.paid_at:
+            return
+        items = order.items.values_list('goods_id', 'quantity')
+        cls.record(items, order.paid_at, sign=-1)
+
+    @classmethod
+    def top(cls, window=DEFAULT_WINDOW, limit=10):
+        """获取窗口内销量前N的商品ID"""
+        client = get_redis()
+        rank_key = cls.RANK_KEY.format(window)
+        if not client.exists(rank_key):
+            pipe = client.pipeline()
+            pipe.zunionstore(rank_key, cls.bucket_keys(window))
+            pipe.expire(rank_key, cls.RANK_TTL)
+            pipe.execute()
+        return [int(goods_id) for goods_id in client.zrevrange(rank_key, 0, limit - 1)]
+
+    @classmethod
+    def backfill(cls, days=30):
+        """根据历史订单重建销量桶"""
+        from django.db.models import Sum
+        from django.db.models.functions import TruncDate, TruncHour
+        from trade.models import OrderItem
+
+        now = timezone.now()
+        since = now - timedelta(days=days)
+        client = get_redis()
+
+        # 清除窗口内已有的桶和合并结果
+        stale_keys = [cls.day_key(now - timedelta(days=i)) for i in range(days + 1)]
+        stale_keys += [cls.hour_key(now - timedelta(hours=i)) for i in range(49)]
+        stale_keys += [cls.RANK_KEY.format(window) for window in cls.WINDOWS]
+        client.delete(*stale_keys)
+
+        items = OrderItem.objects.filter(
+            order__status__in=cls.PAID_STATUSES,
+            order__paid_at__gte=since,
+            goods__isnull=False
+        )
+
+        pipe = client.pipeline(transaction=False)
+        daily = items.annotate(day=TruncDate('order__paid_at')).values(
+            'day', 'goods_id'
+        ).annotate(quantity=Sum('quantity'))
+        for row in daily.iterator():
+            key = cls.day_key(row['day'])
+            pipe.zincrby(key, row['quantity'], row['goods_id'])
+            pipe.expire(key, cls.DAY_TTL)
+
+        hourly = items.filter(order__paid_at__gte=now - timedelta(hours=48)).annotate(
+            hour=TruncHour('order__paid_at')
+        ).values('hour', 'goods_id').annotate(quantity=Sum('quantity'))
+        for row in hourly.iterator():
+            key = cls.hour_key(row['hour'])
+            pipe.zincrby(key, row['quantity'], row['goods_id'])
+            pipe.expire(key, cls.HOUR_TTL)
+        pipe.execute()
+        logger.info(f"Hot goods ranking backfilled for the last {days} days")
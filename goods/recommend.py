@@ -0,0 +1,181 @@
+import time
+import uuid
+import random
+import bisect
+import logging
+import threading
+from array import array
+from django.core.cache import cache
+
+logger = logging.getLogger('goods')
+
+
+class GoodsSampler:
+    """在售商品随机抽样器
+
+    把可推荐的商品ID保存在紧凑数组中（整体一份，按分类各一份），
+    每次抽取只需生成随机下标，耗时只与抽取数量k有关，与商品总数无关。
+    """
+    MAX_ATTEMPTS_FACTOR = 10  # 去重重试次数上限为 k 的倍数
+
+    def __init__(self, rows):
+        """rows 为 (商品ID, 分类ID) 序列"""
+        self.ids = array('q')
+        self.categories = {}
+        for goods_id, category_id in rows:
+            self.ids.append(goods_id)
+            self.categories.setdefault(category_id, array('q')).append(goods_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _category_picker(self, category_weights, rng):
+        """按 分类商品数 x 分类权重 加权选择分类"""
+        pools = []
+        cumulative = []
+        total = 0
+        for category_id, ids in self.categories.items():
+            weight = len(ids) * category_weights.get(category_id, 1)
+            if weight <= 0:
+                continue
+            total += weight
+            pools.append(ids)
+            cumulative.append(total)
+
+        def pick():
+            return pools[bisect.bisect_right(cumulative, rng.random() * total)]
+        return pick if pools else None
+
+    def sample(self, k, category_weights=None, exclude=(), rng=random):
+        """随机抽取k个不重复的商品ID，优先跳过exclude中的商品"""
+        if not self.ids:
+            return []
+        k = min(k, len(self.ids))
+
+        pick_pool = lambda: self.ids
+        if category_weights:
+            pick_pool = self._category_picker(category_weights, rng) or pick_pool
+
+        picked = []
+        chosen = set()
+        attempts = k * self.MAX_ATTEMPTS_FACTOR
+        while len(picked) < k and attempts > 0:
+            attempts -= 1
+            pool = pick_pool()
+            goods_id = pool[int(rng.random() * len(pool))]
+            if goods_id in chosen or goods_id in exclude:
+                continue
+            chosen.add(goods_id)
+            picked.append(goods_id)
+
+        # 商品太少或大部分刚展示过时，放宽去重条件补足数量
+        attempts = k * self.MAX_ATTEMPTS_FACTOR
+        while len(picked) < k and attempts > 0:
+            attempts -= 1
+            goods_id = self.ids[int(rng.random() * len(self.ids))]
+            if goods_id not in chosen:
+                chosen.add(goods_id)
+                picked.append(goods_id)
+        return picked
+
+
+class GoodsRecommender:
+    """商品推荐
+
+    在售商品ID快照（两个紧凑数组）由异步任务从数据库生成后写入缓存，并更新版本号；
+    各进程发现版本变化后只需从缓存读取快照，不在请求中扫描商品表。
+    商品变更时 invalidate 合并短时间内的多次变更，延迟 REBUILD_DELAY 秒重建一次。
+    """
+    VERSION_KEY = 'goods:recommend:version'
+    SNAPSHOT_KEY = 'goods:recommend:snapshot'
+    REBUILD_SCHEDULED_KEY = 'goods:recommend:rebuild_scheduled'
+    REBUILD_DELAY = 30  # 商品变更后延迟重建的秒数
+    SEEN_KEY = 'goods:recommend:seen:{}'
+    SEEN_LIMIT = 50  # 每个用户记住最近展示过的50个商品
+    SEEN_TIMEOUT = 60 * 60 * 24
+    CHECK_INTERVAL = 5  # 检查版本的间隔（秒）
+    PREFERRED_CATEGORY_WEIGHT = 3  # 购物车中商品所属分类的加权倍数
+
+    _sampler = None
+    _version = None
+    _checked_at = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load_rows():
+        from .models import Goods
+        return Goods.objects.filter(is_on_sale=True).values_list('id', 'category_id').iterator(chunk_size=5000)
+
+    @classmethod
+    def rebuild(cls):
+        """从数据库生成在售商品快照写入缓存，返回商品数"""
+        # 先清除调度标记，重建期间发生的变更会再调度一次
+        cache.delete(cls.REBUILD_SCHEDULED_KEY)
+        ids = array('q')
+        category_ids = array('q')
+        for goods_id, category_id in cls.load_rows():
+            ids.append(goods_id)
+            category_ids.append(category_id)
+
+        version = uuid.uuid4().hex
+        cache.set(cls.SNAPSHOT_KEY, {'version': version, 'ids': ids, 'category_ids': category_ids}, timeout=None)
+        cache.set(cls.VERSION_KEY, version, timeout=None)
+        logger.info(f"Goods sampler snapshot rebuilt: {len(ids)} goods")
+        return len(ids)
+
+    @classmethod
+    def invalidate(cls):
+        """商品变更后延迟重建快照，REBUILD_DELAY 内的多次变更只重建一次"""
+        from .tasks import rebuild_recommend_sampler
+
+        if cache.add(cls.REBUILD_SCHEDULED_KEY, 1, timeout=cls.REBUILD_DELAY * 10):
+            rebuild_recommend_sampler.apply_async(countdown=cls.REBUILD_DELAY)
+
+    @classmethod
+    def load_snapshot(cls):
+        """读取缓存中的快照，返回 (版本, 抽样器)；没有快照时从数据库生成一次"""
+        snapshot = cache.get(cls.SNAPSHOT_KEY)
+        if snapshot is None:
+            cls.rebuild()
+            snapshot = cache.get(cls.SNAPSHOT_KEY)
+        if snapshot is None:
+            # 缓存不可用时直接使用数据库数据
+            return None, GoodsSampler(cls.load_rows())
+        return snapshot['version'], GoodsSampler(zip(snapshot['ids'], snapshot['category_ids']))
+
+    @classmethod
+    def get_sampler(cls):
+        with cls._lock:
+            now = time.monotonic()
+            if cls._sampler is not None and now - cls._checked_at < cls.CHECK_INTERVAL:
+                return cls._sampler
+            cls._checked_at = now
+
+            version = cache.get(cls.VERSION_KEY)
+            if cls._sampler is None or version != cls._version:
+                cls._version, cls._sampler = cls.load_snapshot()
+                logger.info(f"Goods sampler reloaded: {len(cls._sampler)} goods")
+            return cls._sampler
+
+    @classmethod
+    def get_seen(cls, user_id):
+        return cache.get(cls.SEEN_KEY.format(user_id)) or []
+
+    @classmethod
+    def mark_seen(cls, user_id, seen, goods_ids):
+        seen = (list(goods_ids) + [goods_id for goods_id in seen if goods_id not in goods_ids])
+        cache.set(cls.SEEN_KEY.format(user_id), seen[:cls.SEEN_LIMIT], timeout=cls.SEEN_TIMEOUT)
+
+    @classmethod
+    def recommend(cls, k=10, user=None, preferred_categories=()):
+        """为用户抽取k个推荐商品ID，跳过最近展示过的商品"""
+        category_weights = {
+            category_id: cls.PREFERRED_CATEGORY_WEIGHT for category_id in preferred_categories
+        }
+        if user is None or not user.is_authenticated:
+            return cls.get_sampler().sample(k, category_weights)
+
+        seen = cls.get_seen(user.id)
+        goods_ids = cls.get_sampler().sample(k, category_weights, exclude=set(seen))
+        cls.mark_seen(user.id, seen, goods_ids)
+        return goods_ids
@@ -0,0 +1,361 @@
+import math
+import os
+import re
+import time
+import pickle
+import logging
+import threading
+from array import array
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from core.redis_client import get_redis
+
+logger = logging.getLogger('goods')
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """将文本切分为字符二元组
+
+    中文没有空格分词，按连续字符（含中文、字母、数字）切分后
+    取相邻两个字符作为索引词，单个字符的片段保留为单字。
+    """
+    tokens = set()
+    for run in _WORD_RE.findall(text.lower()):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def to_cents(price, rounding=ROUND_FLOOR):
+    """金额转为整数分（索引和价格过滤都按分比较，避免浮点误差）"""
+    return int((Decimal(str(price)) * 100).to_integral_value(rounding=rounding))
+
+
+def tokenize_query(query):
+    """切分搜索词，含单字片段时返回None（单字查询交给数据库处理）"""
+    runs = _WORD_RE.findall(query.lower())
+    if not runs or any(len(run) < 2 for run in runs):
+        return None
+    return tokenize(query)
+
+
+class GoodsSearchIndex:
+    """商品倒排索引
+
+    每次写入文档分配递增的文档号，倒排表为按文档号升序的数组，
+    追加即可保持有序。修改或删除商品时旧文档号标记为已删除，
+    已删除比例过高时由调用方重建索引。
+    """
+    NAME_WEIGHT = 3.0
+    DESCRIPTION_WEIGHT = 1.0
+    DESCRIPTION_LIMIT = 500  # 描述只索引前500个字符
+    SALES_WEIGHT = 0.1
+    RECENCY_WEIGHT = 0.5
+    RECENCY_DAYS = 30  # 新品加权的衰减周期
+    ORDERING_FIELDS = ('price', 'sales', 'created_at')
+
+    def __init__(self):
+        self.postings = {'name': {}, 'description': {}}
+        self.goods_ids = array('q')
+        self.category_ids = array('q')
+        self.prices = array('q')  # 售价（分）
+        self.sales = array('q')
+        self.created = array('d')
+        self.docnos = {}  # 商品ID -> 当前文档号
+        self.deleted = set()
+
+    def __len__(self):
+        return len(self.docnos)
+
+    @property
+    def deleted_ratio(self):
+        if not self.goods_ids:
+            return 0
+        return len(self.deleted) / len(self.goods_ids)
+
+    def add(self, goods_id, name, description, category_id, price, sales, created_at):
+        """索引商品，已存在时替换旧文档"""
+        self.remove(goods_id)
+
+        docno = len(self.goods_ids)
+        self.goods_ids.append(goods_id)
+        self.category_ids.append(category_id or 0)
+        self.prices.append(to_cents(price))
+        self.sales.append(sales or 0)
+        self.created.append(created_at.timestamp() if created_at else 0)
+        self.docnos[goods_id] = docno
+
+        fields = (
+            ('name', name or ''),
+            ('description', (description or '')[:self.DESCRIPTION_LIMIT]),
+        )
+        for field, text in fields:
+            postings = self.postings[field]
+            for token in tokenize(text):
+                postings.setdefault(token, array('q')).append(docno)
+
+    def remove(self, goods_id):
+        docno = self.docnos.pop(goods_id, None)
+        if docno is not None:
+            self.deleted.add(docno)
+
+    def _score(self, docno, text_score, now):
+        popularity = 1 + self.SALES_WEIGHT * math.log1p(self.sales[docno])
+        age_days = max(now - self.created[docno], 0) / 86400
+        recency = 1 + self.RECENCY_WEIGHT * math.exp(-age_days / self.RECENCY_DAYS)
+        return text_score * popularity * recency
+
+    def search(self, query, category=None, min_price=None, max_price=None,
+               ordering=None, offset=0, limit=10):
+        """搜索商品
+
+        min_price/max_price 为 Decimal，返回 (总数, 当前页商品ID列表)，
+        搜索词无法使用索引时返回None。
+        """
+        tokens = tokenize_query(query)
+        if not tokens:
+            return None
+        if min_price is not None:
+            min_price = to_cents(min_price, ROUND_CEILING)
+        if max_price is not None:
+            max_price = to_cents(max_price, ROUND_FLOOR)
+
+        # 每个词在名称或描述中出现即命中，所有词都需命中
+        hits = []
+        for token in tokens:
+            name_docs = set(self.postings['name'].get(token, ()))
+            desc_docs = set(self.postings['description'].get(token, ()))
+            if not name_docs and not desc_docs:
+                return 0, []
+            hits.append((name_docs, desc_docs))
+
+        hits.sort(key=lambda pair: len(pair[0]) + len(pair[1]))
+        candidates = hits[0][0] | hits[0][1]
+        for name_docs, desc_docs in hits[1:]:
+            candidates = {docno for docno in candidates
+                          if docno in name_docs or docno in desc_docs}
+            if not candidates:
+                return 0, []
+
+        matched = []
+        for docno in candidates:
+            if docno in self.deleted:
+                continue
+            if category is not None and self.category_ids[docno] != category:
+                continue
+            if min_price is not None and self.prices[docno] < min_price:
+                continue
+            if max_price is not None and self.prices[docno] > max_price:
+                continue
+            matched.append(docno)
+
+        field = (ordering or '').lstrip('-')
+        if field in self.ORDERING_FIELDS:
+            column = {
+                'price': self.prices,
+                'sales': self.sales,
+                'created_at': self.created,
+            }[field]
+            reverse = ordering.startswith('-')
+            matched.sort(key=lambda docno: (column[docno], self.goods_ids[docno]), reverse=reverse)
+        else:
+            now = time.time()
+            scores = {}
+            for docno in matched:
+                text_score = 0
+                for name_docs, desc_docs in hits:
+                    if docno in name_docs:
+                        text_score += self.NAME_WEIGHT
+                    if docno in desc_docs:
+                        text_score += self.DESCRIPTION_WEIGHT
+                scores[docno] = self._score(docno, text_score / len(hits), now)
+            matched.sort(key=lambda docno: (-scores[docno], -self.goods_ids[docno]))
+
+        page = matched[offset:offset + limit]
+        return len(matched), [self.goods_ids[docno] for docno in page]
+
+
+class GoodsSearchEngine:
+    """进程内商品搜索引擎
+
+    索引只包含在售商品。首次使用时优先加载索引快照，没有快照则从数据库构建；
+    之后按 updated_at 增量同步其他进程修改过的商品（下架的移出索引），
+    并按删除墓碑（Redis有序集合，分值为删除时间）移除其他进程删除的商品。
+    本进程内保存或删除商品时由信号直接更新索引。
+    已删除文档比例过高时由异步任务重建索引快照，各进程随后重新加载。
+    """
+    SYNC_INTERVAL = 5  # 增量同步间隔（秒）
+    REBUILD_RATIO = 0.2  # 已删除文档超过20%时重建
+    REBUILD_DEBOUNCE = 300  # 重建任务的最小间隔（秒）
+    GENERATION_KEY = 'goods:search:generation'
+    REBUILD_LOCK_KEY = 'goods:search:rebuild_scheduled'
+    TOMBSTONE_KEY = 'goods:search:tombstones'
+    TOMBSTONE_TTL = 60 * 60 * 24  # 墓碑保留时间，需长于快照的重建周期
+    SNAPSHOT_VERSION = 2
+    BUILD_CHUNK_SIZE = 2000
+    INDEX_FIELDS = ('id', 'name', 'description', 'category_id', 'price', 'sales', 'created_at', 'is_on_sale')
+
+    _index = None
+    _generation = None
+    _synced_at = None
+    _checked_at = 0
+    _lock = threading.RLock()
+
+    @staticmethod
+    def snapshot_path():
+        return getattr(
+            settings,
+            'GOODS_SEARCH_INDEX_PATH',
+            os.path.join(settings.BASE_DIR, 'data', 'goods_search.idx')
+        )
+
+    @staticmethod
+    def _index_rows(index, rows):
+        for row in rows:
+            if not row['is_on_sale']:
+                index.remove(row['id'])
+                continue
+            index.add(
+                row['id'], row['name'], row['description'], row['category_id'],
+                row['price'], row['sales'], row['created_at']
+            )
+
+    @classmethod
+    def build(cls, queryset=None):
+        """从数据库构建完整索引"""
+        from .models import Goods
+
+        if queryset is None:
+            queryset = Goods.objects.all()
+        index = GoodsSearchIndex()
+        rows = queryset.filter(is_on_sale=True).order_by('id').values(
+            *cls.INDEX_FIELDS
+        ).iterator(chunk_size=cls.BUILD_CHUNK_SIZE)
+        cls._index_rows(index, rows)
+        return index
+
+    @classmethod
+    def rebuild(cls):
+        """重建索引并写入快照，通知其他进程重新加载"""
+        started_at = timezone.now()
+        index = cls.build()
+
+        path = cls.snapshot_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(
+                {'version': cls.SNAPSHOT_VERSION, 'index': index, 'synced_at': started_at},
+                f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, path)
+
+        if not cache.add(cls.GENERATION_KEY, 1, timeout=None):
+            cache.incr(cls.GENERATION_KEY)
+        generation = cache.get(cls.GENERATION_KEY)
+        with cls._lock:
+            cls._index = index
+            cls._synced_at = started_at
+            cls._generation = generation
+        logger.info(f"Goods search index rebuilt: {len(index)} goods")
+        return index
+
+    @classmethod
+    def _load(cls):
+        """加载快照，不存在时从数据库构建"""
+        path = cls.snapshot_path()
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    snapshot = pickle.load(f)
+                if snapshot.get('version') == cls.SNAPSHOT_VERSION:
+                    return snapshot['index'], snapshot['synced_at']
+                logger.warning("Goods search snapshot format is outdated, building from database")
+            except Exception as e:
+                logger.error(f"Failed to load goods search snapshot: {str(e)}")
+        synced_at = timezone.now()
+        return cls.build(), synced_at
+
+    @classmethod
+    def _sync(cls):
+        """增量同步最近修改和删除的商品"""
+        from .models import Goods
+
+        synced_at = timezone.now()
+        rows = Goods.objects.filter(updated_at__gte=cls._synced_at).values(*cls.INDEX_FIELDS)
+        cls._index_rows(cls._index, rows)
+        try:
+            deleted_ids = get_redis().zrangebyscore(cls.TOMBSTONE_KEY, cls._synced_at.timestamp(), '+inf')
+            for goods_id in deleted_ids:
+                cls._index.remove(int(goods_id))
+        except Exception as e:
+            logger.error(f"Failed to read goods search tombstones: {str(e)}")
+        cls._synced_at = synced_at
+
+    @classmethod
+    def schedule_rebuild(cls):
+        """异步重建索引，REBUILD_DEBOUNCE 内只触发一次"""
+        from .tasks import rebuild_goods_search_index
+
+        if cache.add(cls.REBUILD_LOCK_KEY, 1, timeout=cls.REBUILD_DEBOUNCE):
+            rebuild_goods_search_index.delay()
+
+    @classmethod
+    def get_index(cls):
+        with cls._lock:
+            now = time.monotonic()
+            if cls._index is not None and now - cls._checked_at < cls.SYNC_INTERVAL:
+                return cls._index
+            cls._checked_at = now
+
+            generation = cache.get(cls.GENERATION_KEY)
+            if cls._index is None or generation != cls._generation:
+                cls._index, cls._synced_at = cls._load()
+                cls._generation = generation
+
+            cls._sync()
+            if cls._index.deleted_ratio > cls.REBUILD_RATIO:
+                cls.schedule_rebuild()
+            return cls._index
+
+    @classmethod
+    def index_goods(cls, goods):
+        """商品保存后更新索引（仅在本进程已加载索引时），下架的商品移出索引"""
+        with cls._lock:
+            if cls._index is None:
+                return
+            if not goods.is_on_sale:
+                cls._index.remove(goods.pk)
+                return
+            cls._index.add(
+                goods.pk, goods.name, goods.description, goods.category_id,
+                goods.price, goods.sales, goods.created_at
+            )
+
+    @classmethod
+    def remove_goods(cls, goods_id):
+        with cls._lock:
+            if cls._index is not None:
+                cls._index.remove(goods_id)
+
+    @classmethod
+    def record_deletion(cls, goods_ids):
+        """记录删除墓碑，其他进程同步时据此移出索引"""
+        goods_ids = list(goods_ids)
+        if not goods_ids:
+            return
+        now = time.time()
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zadd(cls.TOMBSTONE_KEY, {goods_id: now for goods_id in goods_ids})
+        pipe.zremrangebyscore(cls.TOMBSTONE_KEY, '-inf', now - cls.TOMBSTONE_TTL)
+        pipe.execute()
+
+    @classmethod
+    def search(cls, query, **kwargs):
+        return cls.get_index().search(query, **kwargs)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .models import Category, Goods, GoodsImage, GoodsSpecification
+from .commission import compute_commissions, round_money
+from .images import GoodsImageService
+from .counters import GoodsSalesCounter
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,9 +19,24 @@ class GoodsSpecificationSerializer(serializers.ModelSerializer):
         model = GoodsSpecification
         fields = ['id', 'name', 'value', 'sort_order']
 
+class GoodsPageSerializer(serializers.ListSerializer):
+    """商品列表页序列化器：整页商品的佣金一次批量计算，销量合并未落库的增量"""
+
+    def to_representation(self, data):
+        goods_list = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            self.context['commissions'] = compute_commissions(goods_list, request.user.role)
+        rows = super().to_representation(goods_list)
+        pending = GoodsSalesCounter.get_pending(goods.pk for goods in goods_list)
+        for row in rows:
+            row['sales'] += pending.get(row['id'], 0)
+        return rows
+
 class GoodsListSerializer(serializers.ModelSerializer):
     """商品列表序列化器"""
     category_name = serializers.CharField(source='category.name', read_only=True)
+    cover = serializers.SerializerMethodField()
     commission = serializers.SerializerMethodField()
 
     class Meta:
@@ -27,9 +45,19 @@ class GoodsListSerializer(serializers.ModelSerializer):
             'id', 'name', 'cover', 'price', 'original_price',
             'sales', 'category_name', 'is_on_sale', 'commission'
         ]
+        list_serializer_class = GoodsPageSerializer
+
+    def get_cover(self, obj):
+        """列表尺寸的封面图"""
+        return GoodsImageService.get_url(obj, 'list', self.context.get('request'))
 
     def get_commission(self, obj):
         """根据用户角色返回佣金信息"""
+        # 列表页已批量计算
+        commissions = self.context.get('commissions')
+        if commissions and obj.pk in commissions:
+            return commissions[obj.pk]
+
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return None
@@ -38,14 +66,14 @@ class GoodsListSerializer(serializers.ModelSerializer):
         if user.role == 2:  # 普通分销商
             return {
                 'rate': obj.commission_rate_1,
-                'amount': (obj.price * obj.commission_rate_1 / 100).quantize(Decimal('0.01'))
+                'amount': round_money(obj.price * obj.commission_rate_1 / 100)
             }
         elif user.role == 3:  # 高级分销商
             return {
                 'rate': obj.commission_rate_1,
-                'amount': (obj.price * obj.commission_rate_1 / 100).quantize(Decimal('0.01')),
+                'amount': round_money(obj.price * obj.commission_rate_1 / 100),
                 'second_rate': obj.commission_rate_2,
-                'second_amount': (obj.price * obj.commission_rate_2 / 100).quantize(Decimal('0.01'))
+                'second_amount': round_money(obj.price * obj.commission_rate_2 / 100)
             }
         return None
 
@@ -54,6 +82,7 @@ class GoodsDetailSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     images = GoodsImageSerializer(many=True, read_only=True)
     specifications = GoodsSpecificationSerializer(many=True, read_only=True)
+    cover = serializers.SerializerMethodField()
     commission = serializers.SerializerMethodField()
 
     class Meta:
@@ -65,6 +94,10 @@ class GoodsDetailSerializer(serializers.ModelSerializer):
             'created_at'
         ]
 
+    def get_cover(self, obj):
+        """详情尺寸的主图"""
+        return GoodsImageService.get_url(obj, 'detail', self.context.get('request'))
+
     def get_commission(self, obj):
         """与GoodsListSerializer中相同的佣金计算逻辑"""
         # 复用上面的佣金计算逻辑
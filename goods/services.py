@@ -0,0 +1,110 @@
+from decimal import Decimal
+from django.db.models import Case, Count, IntegerField, Value, When
+from .models import Category, Goods
+
+
+class CategoryTreeService:
+    @staticmethod
+    def get_subtree_goods_counts(paths=None):
+        """各分类（含子分类）的在售商品数，只执行一次分组查询
+
+        paths 为 (分类ID, 路径) 序列，未提供时从数据库读取。
+        """
+        direct_counts = dict(
+            Goods.objects.filter(is_on_sale=True).order_by().values(
+                'category_id'
+            ).annotate(total=Count('id')).values_list('category_id', 'total')
+        )
+        if paths is None:
+            paths = Category.objects.values_list('id', 'path')
+
+        counts = {}
+        for category_id, path in paths:
+            count = direct_counts.get(category_id, 0)
+            if not count:
+                continue
+            # 计入自身及所有祖先
+            for segment in path.split('/')[:-1]:
+                ancestor_id = int(segment)
+                counts[ancestor_id] = counts.get(ancestor_id, 0) + count
+        return counts
+
+    @classmethod
+    def get_tree(cls):
+        """启用分类的完整树结构"""
+        categories = list(Category.objects.filter(is_active=True).order_by('depth', 'order', 'id'))
+        counts = cls.get_subtree_goods_counts(
+            [(category.id, category.path) for category in categories]
+        )
+
+        nodes = {}
+        roots = []
+        for category in categories:
+            node = {
+                'id': category.id,
+                'name': category.name,
+                'depth': category.depth,
+                'goods_count': counts.get(category.id, 0),
+                'children': [],
+            }
+            nodes[category.id] = node
+            if category.parent_id is None:
+                roots.append(node)
+            elif category.parent_id in nodes:
+                nodes[category.parent_id]['children'].append(node)
+        return roots
+
+
+class GoodsFacetService:
+    # 默认价格区间分界点（元）
+    DEFAULT_PRICE_BOUNDARIES = [50, 100, 200, 500, 1000]
+    MAX_PRICE_BOUNDARIES = 20
+
+    @classmethod
+    def parse_boundaries(cls, value):
+        """解析价格分界点参数，如 "50,100,500"，无效时抛出ValueError"""
+        if not value:
+            return [Decimal(boundary) for boundary in cls.DEFAULT_PRICE_BOUNDARIES]
+        boundaries = sorted({Decimal(item.strip()) for item in value.split(',') if item.strip()})
+        if not boundaries or len(boundaries) > cls.MAX_PRICE_BOUNDARIES:
+            raise ValueError('price_buckets')
+        if any(not boundary.is_finite() or boundary < 0 for boundary in boundaries):
+            raise ValueError('price_buckets')
+        return boundaries
+
+    @staticmethod
+    def get_facets(queryset, boundaries):
+        """在一次分组查询中统计分类数量和价格区间分布
+
+        按 (分类, 价格区间) 分组计数，再在内存中分别按分类、按区间汇总。
+        """
+        bucket = Case(
+            *[When(price__lt=boundary, then=Value(i)) for i, boundary in enumerate(boundaries)],
+            default=Value(len(boundaries)),
+            output_field=IntegerField()
+        )
+        rows = queryset.order_by().annotate(bucket=bucket).values(
+            'category_id', 'category__name', 'bucket'
+        ).annotate(total=Count('id'))
+
+        categories = {}
+        bucket_counts = [0] * (len(boundaries) + 1)
+        for row in rows:
+            category = categories.setdefault(row['category_id'], {
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'count': 0,
+            })
+            category['count'] += row['total']
+            bucket_counts[row['bucket']] += row['total']
+
+        edges = [None] + list(boundaries) + [None]
+        price_buckets = [
+            {'min': edges[i], 'max': edges[i + 1], 'count': count}
+            for i, count in enumerate(bucket_counts)
+        ]
+        return {
+            'total': sum(bucket_counts),
+            'categories': sorted(categories.values(), key=lambda item: -item['count']),
+            'price_buckets': price_buckets,
+        }
@@ -0,0 +1,114 @@
+import logging
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, Goods
+from .cache import CatalogCache
+from .search import GoodsSearchEngine
+from .recommend import GoodsRecommender
+from .documents import GoodsDocumentService
+from .tasks import (
+    rebuild_goods_document,
+    rebuild_category_goods_documents,
+    generate_goods_image_derivatives
+)
+
+logger = logging.getLogger('goods')
+
+
+@receiver(pre_save, sender=Goods)
+def remember_goods_state(sender, instance, **kwargs):
+    """记录商品修改前的分类和主图
+
+    分类变更时新旧分类缓存都需清除，主图变更时需重新生成衍生图。
+    """
+    instance._previous_category_id = None
+    instance._previous_image = None
+    if instance.pk:
+        previous = Goods.objects.filter(pk=instance.pk).values_list('category_id', 'image').first()
+        if previous:
+            instance._previous_category_id, instance._previous_image = previous
+
+
+@receiver(post_save, sender=Goods)
+@receiver(post_delete, sender=Goods)
+def purge_goods_cache(sender, instance, **kwargs):
+    """商品保存或删除后清除目录缓存
+
+    事务提交后再清除，否则并发请求可能按提交前的数据重建缓存并写入新版本标签下。
+    """
+    goods_id = instance.pk
+    category_id = instance.category_id
+    previous_category_id = getattr(instance, '_previous_category_id', None)
+    transaction.on_commit(lambda: CatalogCache.purge_goods(goods_id, category_id, previous_category_id))
+
+
+@receiver(post_save, sender=Goods)
+def index_goods(sender, instance, **kwargs):
+    """商品保存后更新搜索索引"""
+    GoodsSearchEngine.index_goods(instance)
+
+
+@receiver(post_delete, sender=Goods)
+def unindex_goods(sender, instance, **kwargs):
+    """商品删除后移出搜索索引，并记录墓碑通知其他进程"""
+    goods_id = instance.pk
+    GoodsSearchEngine.remove_goods(goods_id)
+
+    def record():
+        try:
+            GoodsSearchEngine.record_deletion([goods_id])
+        except Exception as e:
+            logger.error(f"Failed to record goods search tombstone for {goods_id}: {str(e)}")
+    transaction.on_commit(record)
+
+
+@receiver(post_save, sender=Goods)
+@receiver(post_delete, sender=Goods)
+def refresh_recommend_sampler(sender, instance, **kwargs):
+    """商品变更后刷新推荐抽样器"""
+    GoodsRecommender.invalidate()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category_cache(sender, instance, **kwargs):
+    """分类保存或删除后（事务提交后）清除目录缓存和分类名称缓存"""
+    category_id = instance.pk
+
+    def purge():
+        CatalogCache.purge_category(category_id)
+        cache.delete(Category.NAMES_CACHE_KEY)
+    transaction.on_commit(purge)
+
+
+@receiver(post_save, sender=Goods)
+def schedule_goods_document(sender, instance, **kwargs):
+    """商品保存后异步重建详情文档"""
+    goods_id = instance.pk
+    transaction.on_commit(lambda: rebuild_goods_document.delay(goods_id))
+
+
+@receiver(post_delete, sender=Goods)
+def drop_goods_document(sender, instance, **kwargs):
+    """商品删除后清除文档缓存（文档记录随商品级联删除）"""
+    cache.delete(GoodsDocumentService.CACHE_KEY.format(instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def schedule_category_goods_documents(sender, instance, created, **kwargs):
+    """分类修改后异步重建该分类下商品的详情文档"""
+    if created:
+        return
+    category_id = instance.pk
+    transaction.on_commit(lambda: rebuild_category_goods_documents.delay(category_id))
+
+
+@receiver(post_save, sender=Goods)
+def schedule_image_derivatives(sender, instance, **kwargs):
+    """上传新主图后异步生成衍生图"""
+    if not instance.image or instance.image.name == getattr(instance, '_previous_image', None):
+        return
+    goods_id = instance.pk
+    transaction.on_commit(lambda: generate_goods_image_derivatives.delay([goods_id]))
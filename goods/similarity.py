@@ -0,0 +1,137 @@
+import time
+import logging
+from array import array
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger('goods')
+
+
+def top_k_cosine(order_ids, goods_ids, top_k=20, max_basket_size=50):
+    """根据订单-商品对计算每个商品的共同购买相似商品
+
+    order_ids 与 goods_ids 为等长的整数数组，每对表示一个订单包含一个商品。
+    构建 订单 x 商品 的稀疏0/1矩阵 B，共现矩阵 C = B^T B，
+    余弦相似度 C_ij / sqrt(C_ii * C_jj)。商品数过多的订单产生大量
+    低价值的共现对，计算前剔除。
+
+    返回 {商品ID: [相似商品ID, ...]}，按相似度降序。
+    """
+    import numpy as np
+    from scipy import sparse
+
+    order_ids = np.asarray(order_ids, dtype=np.int64)
+    goods_ids = np.asarray(goods_ids, dtype=np.int64)
+    if not len(goods_ids):
+        return {}
+
+    orders, order_index = np.unique(order_ids, return_inverse=True)
+    goods, goods_index = np.unique(goods_ids, return_inverse=True)
+
+    basket = sparse.csr_matrix(
+        (np.ones(len(goods_index), dtype=np.float32), (order_index, goods_index)),
+        shape=(len(orders), len(goods))
+    )
+    # 同一订单中重复的商品只计一次
+    basket.sum_duplicates()
+    basket.data[:] = 1
+
+    basket_sizes = np.diff(basket.indptr)
+    if max_basket_size:
+        basket = basket[basket_sizes <= max_basket_size]
+
+    co_occurrence = (basket.T @ basket).tocsr()
+    counts = co_occurrence.diagonal()
+    co_occurrence.setdiag(0)
+    co_occurrence.eliminate_zeros()
+
+    # 逐元素除以 sqrt(n_i * n_j)
+    norms = np.sqrt(np.maximum(counts, 1))
+    rows = np.repeat(np.arange(co_occurrence.shape[0]), np.diff(co_occurrence.indptr))
+    co_occurrence.data = co_occurrence.data / (norms[rows] * norms[co_occurrence.indices])
+
+    neighbours = {}
+    indptr, indices, data = co_occurrence.indptr, co_occurrence.indices, co_occurrence.data
+    for row in range(co_occurrence.shape[0]):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        row_data = data[start:end]
+        row_indices = indices[start:end]
+        if end - start > top_k:
+            keep = np.argpartition(-row_data, top_k)[:top_k]
+            row_data = row_data[keep]
+            row_indices = row_indices[keep]
+        # 相似度相同时按商品ID排序，保证结果稳定
+        order = np.lexsort((goods[row_indices], -row_data))
+        neighbours[int(goods[row])] = goods[row_indices[order]].tolist()
+    return neighbours
+
+
+class SimilarGoodsService:
+    """共同购买相似商品"""
+    CACHE_KEY = 'goods:similar:{}'
+    CACHE_TIMEOUT = 60 * 60 * 26  # 比每日重建周期略长
+    TOP_K = 20
+    MAX_BASKET_SIZE = 50
+    CHUNK_SIZE = 50000
+    BATCH_SIZE = 1000
+
+    # 计入共同购买的订单状态
+    PAID_STATUSES = ['paid', 'shipped', 'delivered', 'completed']
+
+    @classmethod
+    def get_neighbours(cls, goods_id):
+        """获取相似商品ID列表（先查缓存，未命中查库）"""
+        from .models import SimilarGoods
+
+        key = cls.CACHE_KEY.format(goods_id)
+        neighbours = cache.get(key)
+        if neighbours is None:
+            neighbours = SimilarGoods.objects.filter(
+                goods_id=goods_id
+            ).values_list('neighbours', flat=True).first() or []
+            cache.set(key, neighbours, timeout=cls.CACHE_TIMEOUT)
+        return neighbours
+
+    @classmethod
+    def rebuild(cls):
+        """根据历史订单重新计算并保存所有商品的相似商品"""
+        from trade.models import OrderItem
+        from .models import SimilarGoods
+
+        started = time.perf_counter()
+        order_ids = array('q')
+        goods_ids = array('q')
+        rows = OrderItem.objects.filter(
+            order__status__in=cls.PAID_STATUSES,
+            goods__isnull=False
+        ).values_list('order_id', 'goods_id').iterator(chunk_size=cls.CHUNK_SIZE)
+        for order_id, goods_id in rows:
+            order_ids.append(order_id)
+            goods_ids.append(goods_id)
+        loaded = time.perf_counter()
+
+        neighbours = top_k_cosine(order_ids, goods_ids, cls.TOP_K, cls.MAX_BASKET_SIZE)
+        computed = time.perf_counter()
+
+        with transaction.atomic():
+            SimilarGoods.objects.all().delete()
+            SimilarGoods.objects.bulk_create(
+                (SimilarGoods(goods_id=goods_id, neighbours=ids) for goods_id, ids in neighbours.items()),
+                batch_size=cls.BATCH_SIZE
+            )
+
+        items = list(neighbours.items())
+        for i in range(0, len(items), cls.BATCH_SIZE):
+            cache.set_many(
+                {cls.CACHE_KEY.format(goods_id): ids for goods_id, ids in items[i:i + cls.BATCH_SIZE]},
+                timeout=cls.CACHE_TIMEOUT
+            )
+
+        logger.info(
+            f"Similar goods rebuilt: {len(goods_ids)} order items, {len(neighbours)} goods, "
+            f"load {loaded - started:.1f}s, compute {computed - loaded:.1f}s, "
+            f"save {time.perf_counter() - computed:.1f}s"
+        )
+        return len(neighbours)
@@ -0,0 +1,81 @@
+import logging
+from celery import shared_task
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from .similarity import SimilarGoodsService
+from .documents import GoodsDocumentService
+from .images import GoodsImageService
+from .counters import GoodsSalesCounter
+from .search import GoodsSearchEngine
+from .recommend import GoodsRecommender
+from .catalog_io import GoodsImporter
+
+logger = logging.getLogger('goods')
+
+
+@shared_task
+def rebuild_similar_goods():
+    """重新计算共同购买相似商品"""
+    return SimilarGoodsService.rebuild()
+
+
+@shared_task
+def rebuild_goods_document(goods_id):
+    """重建商品详情文档"""
+    GoodsDocumentService.rebuild(goods_id)
+
+
+@shared_task
+def rebuild_category_goods_documents(category_id):
+    """分类变化后重建该分类下所有商品的详情文档"""
+    from .models import Goods
+    return GoodsDocumentService.rebuild_all(Goods.objects.filter(category_id=category_id))
+
+
+@shared_task
+def generate_goods_image_derivatives(goods_ids):
+    """生成商品主图的各尺寸衍生图"""
+    from .models import Goods
+    return GoodsImageService.generate(list(Goods.objects.filter(pk__in=goods_ids)))
+
+
+@shared_task
+def rebuild_goods_documents(goods_ids):
+    """批量重建商品详情文档（批量导入后使用）"""
+    from .models import Goods
+    return GoodsDocumentService.rebuild_all(Goods.objects.filter(pk__in=goods_ids))
+
+
+@shared_task
+def flush_goods_sales():
+    """把缓冲的商品销量增量写入数据库"""
+    return GoodsSalesCounter.flush()
+
+
+@shared_task
+def rebuild_goods_search_index():
+    """重建商品搜索索引快照（已删除文档过多时触发）"""
+    index = GoodsSearchEngine.rebuild()
+    return len(index)
+
+
+@shared_task
+def rebuild_recommend_sampler():
+    """重建推荐抽样器的在售商品快照"""
+    return GoodsRecommender.rebuild()
+
+
+@shared_task
+def import_goods_catalog(path, fmt='csv'):
+    """后台导入上传的商品目录文件，结果保存在缓存中供后台页面显示，完成后删除文件"""
+    try:
+        with default_storage.open(path, 'rb') as f:
+            importer = GoodsImporter().run(f, fmt)
+    finally:
+        default_storage.delete(path)
+
+    result = importer.get_result()
+    cache.set(GoodsImporter.RESULT_KEY, result, timeout=GoodsImporter.RESULT_TIMEOUT)
+    for line_no, error in importer.errors:
+        logger.warning(f"Goods import line {line_no}: {error}")
+    return {'created': importer.created, 'updated': importer.updated, 'errors': len(importer.errors)}
@@ -3,28 +3,76 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.utils.urls import replace_query_param, remove_query_param
 from django.db.models import Q
+from django.http import Http404
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
 from .models import Category, Goods
+from .cache import CatalogCache
+from .search import GoodsSearchEngine
+from .pagination import GoodsCursorPagination
+from .ranking import HotGoodsRanking
+from .recommend import GoodsRecommender
+from .similarity import SimilarGoodsService
+from .services import CategoryTreeService, GoodsFacetService
+from .documents import GoodsDocumentService
 from .serializers import (
     CategorySerializer,
     GoodsListSerializer,
     GoodsDetailSerializer
 )
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogCacheMixin:
+    """目录响应缓存"""
+
+    def get_cache_tags(self, data):
+        return [CatalogCache.TAG_CATALOG]
+
+    def cached_response(self, scope, build):
+        """命中缓存直接返回，否则执行build生成响应数据并写入缓存"""
+        key = CatalogCache.make_key(scope, self.request)
+        data = CatalogCache.get(key)
+        if data is None:
+            data = build()
+            CatalogCache.set(key, data, self.get_cache_tags(data))
+        return Response(data)
+
+class CategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """商品分类视图集"""
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
-class GoodsViewSet(viewsets.ReadOnlyModelViewSet):
+    def get_cache_tags(self, data):
+        tags = [CatalogCache.TAG_CATEGORY_LIST]
+        if self.action == 'tree':
+            # 树中的商品数随商品变化
+            tags.append(CatalogCache.TAG_CATALOG)
+        return tags
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            'categories',
+            lambda: super(CategoryViewSet, self).list(request, *args, **kwargs).data
+        )
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """完整分类树（含各节点商品数）"""
+        return self.cached_response('tree', CategoryTreeService.get_tree)
+
+class GoodsViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """商品视图集"""
     serializer_class = GoodsListSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['price', 'sales', 'created_at']
     filterset_fields = ['category', 'is_on_sale']
+    pagination_class = GoodsCursorPagination
+    # 搜索结果按相关度排序，不适用游标分页，仍按页码分页
+    search_page_query_param = 'page'
 
     def get_queryset(self):
         queryset = Goods.objects.filter(is_on_sale=True)
@@ -35,6 +83,18 @@ class GoodsViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(price__gte=min_price)
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
+
+        # 按分类子树过滤：分类路径前缀匹配，包含所有子分类的商品
+        category_subtree = self.request.query_params.get('category_subtree')
+        if category_subtree:
+            path = None
+            if category_subtree.isdigit():
+                path = Category.objects.filter(
+                    pk=category_subtree
+                ).values_list('path', flat=True).first()
+            if not path:
+                return queryset.none()
+            queryset = queryset.filter(category__path__startswith=path)
             
         return queryset
 
@@ -43,34 +103,164 @@ class GoodsViewSet(viewsets.ReadOnlyModelViewSet):
             return GoodsDetailSerializer
         return GoodsListSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """商品详情：读取预先生成的详情文档，请求时合并实时库存销量和佣金信息"""
+        pk = str(self.kwargs.get('pk', ''))
+        data = GoodsDocumentService.get(int(pk)) if pk.isdigit() else None
+        # 上架状态以数据库为准，不等待文档异步重建
+        state = GoodsDocumentService.get_state(int(pk)) if data is not None else None
+        if state is None or not state['is_on_sale']:
+            raise Http404
+        return Response(GoodsDocumentService.render(data, request, state))
+
+    def get_cache_tags(self, data):
+        """按分类过滤的结果只依赖该分类，否则依赖整个目录"""
+        category = self.request.query_params.get('category')
+        if category and self.action == 'list':
+            tags = [CatalogCache.category_tag(category)]
+        else:
+            tags = [CatalogCache.TAG_CATALOG]
+
+        items = data.get('results', []) if isinstance(data, dict) else data
+        tags.extend(CatalogCache.goods_tag(item['id']) for item in items)
+        return tags
+
+    def list(self, request, *args, **kwargs):
+        def build():
+            data = self.search_list(request)
+            if data is None:
+                data = super(GoodsViewSet, self).list(request, *args, **kwargs).data
+            return data
+        return self.cached_response('list', build)
+
+    def search_list(self, request):
+        """使用倒排索引搜索，无法使用索引时返回None，由SearchFilter兜底"""
+        params = request.query_params
+        keyword = params.get('search', '').strip()
+        if not keyword or params.get('category_subtree'):
+            return None
+
+        try:
+            category = int(params['category']) if params.get('category') else None
+            min_price = Decimal(params['min_price']) if params.get('min_price') else None
+            max_price = Decimal(params['max_price']) if params.get('max_price') else None
+            page = int(params.get(self.search_page_query_param, 1))
+        except (ValueError, InvalidOperation):
+            return None
+        if any(price is not None and not price.is_finite() for price in (min_price, max_price)):
+            return None
+        page = max(page, 1)
+        page_size = self.paginator.get_page_size(request)
+
+        result = GoodsSearchEngine.search(
+            keyword,
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            ordering=params.get('ordering'),
+            offset=(page - 1) * page_size,
+            limit=page_size
+        )
+        if result is None:
+            return None
+
+        count, ids = result
+        goods_map = self.get_queryset().select_related('category').in_bulk(ids)
+        goods = [goods_map[goods_id] for goods_id in ids if goods_id in goods_map]
+        serializer = self.get_serializer(goods, many=True)
+
+        url = request.build_absolute_uri()
+        page_param = self.search_page_query_param
+        next_url = None
+        if page * page_size < count:
+            next_url = replace_query_param(url, page_param, page + 1)
+        previous_url = None
+        if page == 2:
+            previous_url = remove_query_param(url, page_param)
+        elif page > 2:
+            previous_url = replace_query_param(url, page_param, page - 1)
+
+        return OrderedDict([
+            ('count', count),
+            ('next', next_url),
+            ('previous', previous_url),
+            ('results', serializer.data),
+        ])
+
     @action(detail=False, methods=['get'])
     def hot(self, request):
-        """热销商品"""
-        queryset = self.get_queryset().order_by('-sales')[:10]
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """热销商品（按24h/7d/30d窗口内销量排行）"""
+        window = request.query_params.get('window', HotGoodsRanking.DEFAULT_WINDOW)
+        if window not in HotGoodsRanking.WINDOWS:
+            return Response(
+                {'error': f"window参数只支持: {', '.join(HotGoodsRanking.WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def build():
+            # 多取一些，排除已下架或被价格条件过滤掉的商品
+            ids = HotGoodsRanking.top(window, limit=30)
+            goods_map = self.get_queryset().select_related('category').in_bulk(ids)
+            goods = [goods_map[goods_id] for goods_id in ids if goods_id in goods_map][:10]
+            if not goods:
+                # 窗口内没有销量数据时按累计销量兜底
+                goods = self.get_queryset().order_by('-sales')[:10]
+            return self.get_serializer(goods, many=True).data
+        return self.cached_response('hot', build)
 
     @action(detail=False, methods=['get'])
     def new(self, request):
         """新品上架"""
-        queryset = self.get_queryset().order_by('-created_at')[:10]
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        def build():
+            queryset = self.get_queryset().order_by('-created_at')[:10]
+            return self.get_serializer(queryset, many=True).data
+        return self.cached_response('new', build)
 
     @action(detail=False, methods=['get'])
     def recommend(self, request):
         """推荐商品"""
-        # 这里可以根据用户的浏览历史、购买记录等进行个性化推荐
-        queryset = self.get_queryset().order_by('?')[:10]
-        serializer = self.get_serializer(queryset, many=True)
+        # 购物车中商品所属分类加权，并跳过最近展示过的商品
+        preferred_categories = ()
+        if request.user.is_authenticated:
+            from trade.cart_store import get_cart_store
+            preferred_categories = get_cart_store().get_category_ids(request.user)
+
+        ids = GoodsRecommender.recommend(10, request.user, preferred_categories)
+        goods_map = self.get_queryset().select_related('category').in_bulk(ids)
+        goods = [goods_map[goods_id] for goods_id in ids if goods_id in goods_map]
+        serializer = self.get_serializer(goods, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """筛选面板：当前筛选条件下的分类数量和价格区间分布"""
+        try:
+            boundaries = GoodsFacetService.parse_boundaries(request.query_params.get('price_buckets'))
+        except (ValueError, InvalidOperation):
+            return Response(
+                {'error': 'price_buckets参数格式错误，应为逗号分隔的非负价格'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def build():
+            queryset = self.filter_queryset(self.get_queryset())
+            return GoodsFacetService.get_facets(queryset, boundaries)
+        return self.cached_response('facets', build)
+
     @action(detail=True, methods=['get'])
     def similar(self, request, pk=None):
         """相似商品"""
         goods = self.get_object()
-        queryset = self.get_queryset().filter(
-            Q(category=goods.category) & ~Q(id=goods.id)
-        )[:5]
-        serializer = self.get_serializer(queryset, many=True)
+        ids = SimilarGoodsService.get_neighbours(goods.id)[:10]
+        goods_map = self.get_queryset().select_related('category').in_bulk(ids)
+        similar = [goods_map[goods_id] for goods_id in ids if goods_id in goods_map][:5]
+
+        # 没有共同购买数据的商品用同分类商品补足
+        if len(similar) < 5:
+            exclude_ids = [goods.id] + [item.id for item in similar]
+            similar += list(self.get_queryset().select_related('category').filter(
+                Q(category=goods.category_id) & ~Q(id__in=exclude_ids)
+            )[:5 - len(similar)])
+
+        serializer = self.get_serializer(similar, many=True)
         return Response(serializer.data)
\ No newline at end of file
@@ -2,9 +2,10 @@ from django.contrib import admin
 from django.utils.html import format_html
 from .models import CommissionRecord
 from trade.models import Order
+from core.admin_mixins import LargeTableAdminMixin
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['order_number', 'user', 'total_amount', 'status', 
                    'payment_status', 'created_at']
     list_filter = ['status', 'created_at']
@@ -23,7 +24,7 @@ class OrderAdmin(admin.ModelAdmin):
         return obj.get_status_display()
 
 @admin.register(CommissionRecord)
-class CommissionRecordAdmin(admin.ModelAdmin):
+class CommissionRecordAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['distributor', 'order', 'amount', 'status', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['distributor__username', 'order__order_number']
@@ -13,6 +13,9 @@ logger = logging.getLogger('payment')
 
 
 class WeChatPay:
+    # 订单查询的 (连接, 读取) 超时秒数
+    QUERY_TIMEOUT = (3, 10)
+
     @staticmethod
     def generate_nonce_str(length=32):
         """生成随机字符串"""
@@ -121,7 +124,7 @@ class WeChatPay:
         return None
 
     @classmethod
-    def query_order(cls, order_number):
+    def query_order(cls, order_number, timeout=None):
         """查询订单状态"""
         data = {
             'appid': WECHAT_PAY_CONFIG['APP_ID'],
@@ -133,8 +136,18 @@ class WeChatPay:
         data['sign'] = cls.generate_sign(data, WECHAT_PAY_CONFIG['API_KEY'])
         xml_data = cls.dict_to_xml(data)
         
-        response = requests.post(WECHAT_PAY_URLS['ORDER_QUERY'], data=xml_data)
-        result = cls.xml_to_dict(response.text)
+        try:
+            response = requests.post(
+                WECHAT_PAY_URLS['ORDER_QUERY'],
+                data=xml_data,
+                timeout=timeout or cls.QUERY_TIMEOUT
+            )
+            result = cls.xml_to_dict(response.text)
+        except (requests.RequestException, ET.ParseError) as e:
+            return {
+                'success': False,
+                'error_msg': str(e)
+            }
         
         if result.get('return_code') == 'SUCCESS' and result.get('result_code') == 'SUCCESS':
             trade_state = result.get('trade_state')
@@ -1,7 +1,12 @@
 from django.contrib import admin
+from django.urls import path
 from django.utils.translation import gettext_lazy as _
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.html import format_html
-from .models import Order, OrderItem
+from core.admin_mixins import LargeTableAdminMixin
+from .admin_views import order_statistics_view
+from .models import Order, OrderItem, StockReservation
+from .partitions import created_range_q
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -12,8 +17,17 @@ class OrderItemInline(admin.TabularInline):
     def has_add_permission(self, request, obj=None):
         return False
 
+class StockReservationInline(admin.TabularInline):
+    model = StockReservation
+    extra = 0
+    readonly_fields = ['goods', 'quantity', 'status', 'created_at', 'released_at']
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'order_number', 
         'user', 
@@ -72,9 +86,32 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     ]
     
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, StockReservationInline]
     
+    def get_urls(self):
+        urls = [
+            path('statistics/', self.admin_site.admin_view(order_statistics_view), name='trade_order_statistics'),
+        ]
+        return urls + super().get_urls()
+
     def has_add_permission(self, request):
         return False  # 禁止在管理界面手动创建订单
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # 按创建时间筛选时附加对应的主键范围，只扫描相关月份的分区
+        since = self.parse_date_param(request, 'created_at__gte')
+        before = self.parse_date_param(request, 'created_at__lt')
+        if since or before:
+            queryset = queryset.filter(created_range_q(since, before))
+        return queryset
+
+    @staticmethod
+    def parse_date_param(request, name):
+        value = request.GET.get(name, '')
+        try:
+            return parse_datetime(value) or parse_date(value)
+        except ValueError:
+            return None
+
 # Register your models here.
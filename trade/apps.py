@@ -4,4 +4,7 @@ from django.utils.translation import gettext_lazy as _
 class TradeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trade'
-    verbose_name = _('订单管理')
\ No newline at end of file
+    verbose_name = _('订单管理')
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,499 @@
+import logging
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, F, IntegerField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from redis.exceptions import WatchError
+from core.redis_client import get_redis
+from goods.commission import round_money
+from goods.models import Goods
+from .models import Cart
+
+logger = logging.getLogger('order')
+
+SUMMARY_CACHE_KEY = 'cart:summary:{}'
+SUMMARY_CACHE_TIMEOUT = 60
+
+
+def invalidate_summary(user_id):
+    cache.delete(SUMMARY_CACHE_KEY.format(user_id))
+
+
+def summarize(rows):
+    """按 (数量, 单价, 佣金比例...) 行汇总数量、金额和佣金
+
+    佣金与 Cart.commission_amount 一致，逐行舍入到分后求和（SQL 的 ROUND 舍入方式不同，不在数据库中计算）。
+    """
+    summary = {
+        'total_quantity': 0,
+        'total_amount': Decimal('0.00'),
+        'total_commission': Decimal('0.00'),
+    }
+    for quantity, price, *rates in rows:
+        amount = price * quantity
+        summary['total_quantity'] += quantity
+        summary['total_amount'] += amount
+        if rates:
+            summary['total_commission'] += round_money(amount * sum(rates) / 100)
+    return summary
+
+
+def get_cached_summary(store, user):
+    """购物车汇总，按用户短时缓存，购物车修改时失效"""
+    key = SUMMARY_CACHE_KEY.format(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = store.get_summary(user)
+        cache.set(key, summary, timeout=SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+class CartStockError(ValueError):
+    """加入后购物车中的数量超过商品库存"""
+
+    def __init__(self, goods_id):
+        super().__init__(f'商品 {goods_id} 库存不足')
+        self.goods_id = goods_id
+
+
+def reserve_cart_ids(count):
+    """从 Cart 表的主键序列预留ID，Redis中新加入的条目写回数据库时使用同一ID"""
+    if count <= 0:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [Cart._meta.db_table, 'id', count]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_commission_rate_fields(role):
+    """用户角色对应的佣金比例字段，普通用户没有佣金"""
+    if role == 2:
+        return ['commission_rate_1']
+    if role == 3:
+        return ['commission_rate_1', 'commission_rate_2']
+    return []
+
+
+class DatabaseCartStore:
+    """购物车直接存储在 Cart 表
+
+    对外的条目ID为购物车记录ID（get_items、get_item），
+    修改接口（remove、apply_batch）以商品ID标识条目（每个用户每个商品只有一条记录）。
+    """
+
+    @staticmethod
+    def get_items(user, ids=None):
+        """购物车条目，ids 为购物车记录ID"""
+        queryset = Cart.objects.filter(user=user).select_related('goods', 'user')
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        return list(queryset)
+
+    @staticmethod
+    def get_item(user, item_id):
+        return Cart.objects.filter(user=user, id=item_id).select_related('goods', 'user').first()
+
+    @staticmethod
+    def get_category_ids(user):
+        """购物车中商品所属的分类ID"""
+        return set(Cart.objects.filter(user=user).values_list('goods__category_id', flat=True))
+
+    @staticmethod
+    def get_summary(user):
+        """一次查询取出选中商品的数量、价格和佣金比例，逐行计算汇总"""
+        rate_fields = get_commission_rate_fields(user.role)
+        rows = Cart.objects.filter(user=user, selected=True).values_list(
+            'quantity', 'goods__price', *[f'goods__{field}' for field in rate_fields]
+        )
+        return summarize(rows)
+
+    @staticmethod
+    def add(user, goods, quantity):
+        """加入购物车，已存在时原子累加数量"""
+        cart_item, created = Cart.objects.get_or_create(
+            user=user,
+            goods=goods,
+            defaults={'quantity': quantity}
+        )
+        if not created:
+            Cart.objects.filter(pk=cart_item.pk).update(
+                quantity=F('quantity') + quantity,
+                updated_at=timezone.now()
+            )
+            cart_item.refresh_from_db()
+        invalidate_summary(user.pk)
+        return cart_item
+
+    @staticmethod
+    def update(user, item, quantity=None, selected=None):
+        fields = {}
+        if quantity is not None:
+            fields['quantity'] = quantity
+        if selected is not None:
+            fields['selected'] = selected
+        if fields:
+            Cart.objects.filter(user=user, pk=item.pk).update(updated_at=timezone.now(), **fields)
+            for name, value in fields.items():
+                setattr(item, name, value)
+            invalidate_summary(user.pk)
+        return item
+
+    @staticmethod
+    def remove(user, ids):
+        """移除购物车条目，ids 为商品ID"""
+        Cart.objects.filter(user=user, goods_id__in=ids).delete()
+        invalidate_summary(user.pk)
+
+    @staticmethod
+    def apply_batch(user, adds, updates, removes):
+        """在一个事务中批量修改购物车（均以商品ID标识）
+
+        adds 为 {商品ID: 数量}，已在购物车中的累加数量（INSERT ... ON CONFLICT DO UPDATE），
+        累加后超过库存时该行不更新，抛出 CartStockError 并回滚整批修改；
+        updates 为 {商品ID: {'quantity': 数量, 'selected': 是否选中}}，只修改已有条目；
+        removes 为商品ID列表。
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if removes:
+                Cart.objects.filter(user=user, goods_id__in=removes).delete()
+
+            if adds:
+                table = connection.ops.quote_name(Cart._meta.db_table)
+                rows = ', '.join(['(%s, %s, %s, TRUE, %s, %s)'] * len(adds))
+                params = []
+                for goods_id, quantity in adds.items():
+                    params += [user.pk, goods_id, quantity, now, now]
+                goods_table = connection.ops.quote_name(Goods._meta.db_table)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'INSERT INTO {table} (user_id, goods_id, quantity, selected, created_at, updated_at) '
+                        f'VALUES {rows} '
+                        f'ON CONFLICT (user_id, goods_id) DO UPDATE SET '
+                        f'quantity = {table}.quantity + EXCLUDED.quantity, updated_at = EXCLUDED.updated_at '
+                        f'WHERE {table}.quantity + EXCLUDED.quantity <= '
+                        f'(SELECT stock FROM {goods_table} WHERE id = EXCLUDED.goods_id) '
+                        f'RETURNING goods_id',
+                        params
+                    )
+                    written = {row[0] for row in cursor.fetchall()}
+                rejected = set(adds) - written
+                if rejected:
+                    raise CartStockError(min(rejected))
+
+            for field, output_field in (('quantity', IntegerField()), ('selected', BooleanField())):
+                values = {goods_id: change[field] for goods_id, change in updates.items() if change.get(field) is not None}
+                if not values:
+                    continue
+                Cart.objects.filter(user=user, goods_id__in=list(values)).update(
+                    updated_at=now,
+                    **{field: Case(
+                        *[When(goods_id=goods_id, then=Value(value)) for goods_id, value in values.items()],
+                        output_field=output_field
+                    )}
+                )
+        invalidate_summary(user.pk)
+
+    @staticmethod
+    def clear(user):
+        Cart.objects.filter(user=user).delete()
+        invalidate_summary(user.pk)
+
+
+class RedisCartStore:
+    """购物车存储在Redis哈希中，定时批量写回 Cart 表
+
+    每个用户一个哈希，字段为 ``{商品ID}`` -> 数量（HINCRBY 原子累加）、
+    ``{商品ID}:sel`` -> 是否选中、``{商品ID}:at`` -> 加入时间、``{商品ID}:id`` -> 购物车记录ID。
+    记录ID与 DatabaseCartStore 一致：从数据库加载的条目沿用原记录ID，新加入的条目从
+    Cart 表的主键序列预留，写回数据库时使用该ID，对外的条目ID不随存储方式变化。
+    修改后把用户加入待持久化集合，由 persist_carts 任务同步到 Cart 表；
+    Redis中没有该用户的购物车时（过期或被淘汰）从 Cart 表加载。
+    """
+    KEY = 'cart:{}'
+    LOADED_FIELD = '_loaded'
+    DIRTY_KEY = 'cart:dirty'
+    TIMEOUT = 60 * 60 * 24 * 30
+    PERSIST_BATCH = 500
+
+    @classmethod
+    def ensure_loaded(cls, client, user_id):
+        """保证Redis中已有该用户的购物车，没有时从数据库加载
+
+        数据库查询在 WATCH 之前完成，重试循环内只有Redis操作；
+        WATCH 期间其他请求已写入时（WatchError）下一轮直接返回。
+        """
+        key = cls.KEY.format(user_id)
+        if client.exists(key):
+            return key
+
+        mapping = {cls.LOADED_FIELD: 1}
+        for item_id, goods_id, quantity, selected, created_at in Cart.objects.filter(
+            user_id=user_id
+        ).values_list('id', 'goods_id', 'quantity', 'selected', 'created_at'):
+            mapping[goods_id] = quantity
+            mapping[f'{goods_id}:sel'] = int(selected)
+            mapping[f'{goods_id}:at'] = created_at.isoformat()
+            mapping[f'{goods_id}:id'] = item_id
+
+        with client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    if pipe.exists(key):
+                        return key
+                    pipe.multi()
+                    pipe.hset(key, mapping=mapping)
+                    pipe.expire(key, cls.TIMEOUT)
+                    pipe.execute()
+                    return key
+                except WatchError:
+                    continue
+
+    @classmethod
+    def mark_dirty(cls, pipe, key, user_id):
+        pipe.expire(key, cls.TIMEOUT)
+        pipe.sadd(cls.DIRTY_KEY, user_id)
+
+    @classmethod
+    def read(cls, user):
+        """读取购物车原始数据，返回 {商品ID: (数量, 是否选中, 加入时间, 记录ID)}"""
+        client = get_redis()
+        key = cls.ensure_loaded(client, user.pk)
+        fields = client.hgetall(key)
+        items = {}
+        for field, value in fields.items():
+            if field.isdigit():
+                goods_id = int(field)
+                items[goods_id] = (
+                    int(value),
+                    fields.get(f'{field}:sel', '1') == '1',
+                    parse_datetime(fields[f'{field}:at']) if fields.get(f'{field}:at') else None,
+                    int(fields[f'{field}:id']) if fields.get(f'{field}:id') else None,
+                )
+
+        # 没有记录ID的条目（启用记录ID之前写入的）补上ID，已被其他请求补上的以Redis为准
+        missing = [goods_id for goods_id, item in items.items() if item[3] is None]
+        if missing:
+            pipe = client.pipeline()
+            for goods_id, item_id in zip(missing, reserve_cart_ids(len(missing))):
+                pipe.hsetnx(key, f'{goods_id}:id', item_id)
+            pipe.execute()
+            return cls.read(user)
+        return items
+
+    @classmethod
+    def build_items(cls, user, items):
+        """构造不落库的 Cart 实例，id 为购物车记录ID，供序列化和结算使用"""
+        goods_map = Goods.objects.in_bulk(list(items))
+        result = []
+        for goods_id, (quantity, selected, created_at, item_id) in items.items():
+            goods = goods_map.get(goods_id)
+            if goods is None:
+                continue
+            result.append(Cart(
+                id=item_id, user=user, goods=goods, quantity=quantity,
+                selected=selected, created_at=created_at
+            ))
+        result.sort(key=lambda item: item.created_at or timezone.now(), reverse=True)
+        return result
+
+    @classmethod
+    def get_items(cls, user, ids=None):
+        """购物车条目，ids 为购物车记录ID"""
+        items = cls.read(user)
+        if ids is not None:
+            ids = set(ids)
+            items = {goods_id: item for goods_id, item in items.items() if item[3] in ids}
+        return cls.build_items(user, items)
+
+    @classmethod
+    def get_item(cls, user, item_id):
+        items = cls.get_items(user, [int(item_id)])
+        return items[0] if items else None
+
+    @classmethod
+    def get_category_ids(cls, user):
+        """购物车中商品所属的分类ID"""
+        goods_ids = list(cls.read(user))
+        if not goods_ids:
+            return set()
+        return set(Goods.objects.filter(pk__in=goods_ids).values_list('category_id', flat=True))
+
+    @classmethod
+    def get_summary(cls, user):
+        """选中商品的数量、金额和佣金，商品价格与佣金比例一次查询"""
+        selected = {goods_id: item[0] for goods_id, item in cls.read(user).items() if item[1]}
+        rate_fields = get_commission_rate_fields(user.role)
+
+        rows = (
+            (selected[row[0]], *row[1:])
+            for row in Goods.objects.filter(pk__in=list(selected)).values_list('id', 'price', *rate_fields)
+        )
+        return summarize(rows)
+
+    @classmethod
+    def add(cls, user, goods, quantity):
+        client = get_redis()
+        key = cls.ensure_loaded(client, user.pk)
+        item_ids = [] if client.hexists(key, f'{goods.pk}:id') else reserve_cart_ids(1)
+        pipe = client.pipeline()
+        pipe.hincrby(key, goods.pk, quantity)
+        pipe.hsetnx(key, f'{goods.pk}:sel', 1)
+        pipe.hsetnx(key, f'{goods.pk}:at', timezone.now().isoformat())
+        if item_ids:
+            pipe.hsetnx(key, f'{goods.pk}:id', item_ids[0])
+        cls.mark_dirty(pipe, key, user.pk)
+        pipe.execute()
+        invalidate_summary(user.pk)
+        items = cls.read(user)
+        return cls.build_items(user, {goods.pk: items[goods.pk]})[0]
+
+    @classmethod
+    def update(cls, user, item, quantity=None, selected=None):
+        client = get_redis()
+        key = cls.ensure_loaded(client, user.pk)
+        pipe = client.pipeline()
+        if quantity is not None:
+            pipe.hset(key, item.goods_id, quantity)
+            item.quantity = quantity
+        if selected is not None:
+            pipe.hset(key, f'{item.goods_id}:sel', int(selected))
+            item.selected = selected
+        cls.mark_dirty(pipe, key, user.pk)
+        pipe.execute()
+        invalidate_summary(user.pk)
+        return item
+
+    @classmethod
+    def remove(cls, user, ids):
+        if not ids:
+            return
+        client = get_redis()
+        key = cls.ensure_loaded(client, user.pk)
+        fields = []
+        for goods_id in ids:
+            fields += [goods_id, f'{goods_id}:sel', f'{goods_id}:at', f'{goods_id}:id']
+        pipe = client.pipeline()
+        pipe.hdel(key, *fields)
+        cls.mark_dirty(pipe, key, user.pk)
+        pipe.execute()
+        invalidate_summary(user.pk)
+
+    @classmethod
+    def apply_batch(cls, user, adds, updates, removes):
+        """批量修改购物车，参数同 DatabaseCartStore.apply_batch，在一个 MULTI 中执行
+
+        WATCH 购物车后检查累加后的数量不超过库存，期间购物车被其他请求修改时重试。
+        """
+        client = get_redis()
+        key = cls.ensure_loaded(client, user.pk)
+        now = timezone.now().isoformat()
+        stocks = dict(Goods.objects.filter(pk__in=list(adds)).values_list('id', 'stock')) if adds else {}
+        # 新加入条目的记录ID在 WATCH 之前预留，已在购物车中的条目保留原ID（HSETNX）
+        item_ids = dict(zip(adds, reserve_cart_ids(len(adds))))
+
+        with client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    existing = set(pipe.hkeys(key))
+                    if adds:
+                        current = pipe.hmget(key, list(adds))
+                        for (goods_id, quantity), value in zip(adds.items(), current):
+                            if int(value or 0) + quantity > stocks.get(goods_id, 0):
+                                raise CartStockError(goods_id)
+                    pipe.multi()
+                    cls.queue_batch(pipe, key, existing, adds, updates, removes, now, item_ids)
+                    cls.mark_dirty(pipe, key, user.pk)
+                    pipe.execute()
+                    break
+                except WatchError:
+                    continue
+        invalidate_summary(user.pk)
+
+    @classmethod
+    def queue_batch(cls, pipe, key, existing, adds, updates, removes, now, item_ids):
+        """在 MULTI 中加入批量修改命令"""
+        for goods_id in removes:
+            pipe.hdel(key, goods_id, f'{goods_id}:sel', f'{goods_id}:at', f'{goods_id}:id')
+        for goods_id, quantity in adds.items():
+            pipe.hincrby(key, goods_id, quantity)
+            pipe.hsetnx(key, f'{goods_id}:sel', 1)
+            pipe.hsetnx(key, f'{goods_id}:at', now)
+            pipe.hsetnx(key, f'{goods_id}:id', item_ids[goods_id])
+        for goods_id, change in updates.items():
+            if str(goods_id) not in existing:
+                continue
+            if change.get('quantity') is not None:
+                pipe.hset(key, goods_id, change['quantity'])
+            if change.get('selected') is not None:
+                pipe.hset(key, f'{goods_id}:sel', int(change['selected']))
+
+    @classmethod
+    def clear(cls, user):
+        client = get_redis()
+        key = cls.KEY.format(user.pk)
+        pipe = client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, cls.LOADED_FIELD, 1)
+        cls.mark_dirty(pipe, key, user.pk)
+        pipe.execute()
+        invalidate_summary(user.pk)
+
+    @classmethod
+    def persist_user(cls, user_id, items):
+        """把一个用户的购物车同步到 Cart 表，记录ID与Redis中的一致"""
+        now = timezone.now()
+        with transaction.atomic():
+            existing_goods_ids = set(Goods.objects.filter(pk__in=list(items)).values_list('pk', flat=True))
+            keep_ids = [items[goods_id][3] for goods_id in existing_goods_ids]
+            # 记录ID不同的（移出后重新加入的）先删除，再按Redis中的ID写入
+            Cart.objects.filter(user_id=user_id).exclude(id__in=keep_ids).delete()
+            Cart.objects.bulk_create(
+                [
+                    Cart(id=item_id, user_id=user_id, goods_id=goods_id, quantity=quantity, selected=selected,
+                         created_at=created_at or now, updated_at=now)
+                    for goods_id, (quantity, selected, created_at, item_id) in items.items()
+                    if goods_id in existing_goods_ids
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'goods'],
+                update_fields=['quantity', 'selected', 'updated_at']
+            )
+
+    @classmethod
+    def persist(cls):
+        """把有修改的购物车写回数据库，返回处理的用户数"""
+        from users.models import User
+
+        client = get_redis()
+        persisted = 0
+        while True:
+            user_ids = client.spop(cls.DIRTY_KEY, cls.PERSIST_BATCH)
+            if not user_ids:
+                break
+            for user in User.objects.filter(pk__in=[int(user_id) for user_id in user_ids]):
+                try:
+                    cls.persist_user(user.pk, cls.read(user))
+                    persisted += 1
+                except Exception as e:
+                    # 失败时放回集合，下次重试
+                    client.sadd(cls.DIRTY_KEY, user.pk)
+                    logger.error(f"Failed to persist cart for user {user.pk}: {str(e)}")
+            if len(user_ids) < cls.PERSIST_BATCH:
+                break
+        return persisted
+
+
+def get_cart_store():
+    """根据配置选择购物车存储：database（默认）或 redis"""
+    if getattr(settings, 'CART_STORE', 'database') == 'redis':
+        return RedisCartStore
+    return DatabaseCartStore
@@ -0,0 +1,89 @@
+from decimal import Decimal
+from django.db import transaction
+from goods.commission import round_money
+from goods.images import GoodsImageService
+from goods.models import Goods
+from .inventory import InsufficientStock, StockReservationService
+from .models import Order, OrderItem
+
+
+class CheckoutError(Exception):
+    """结算失败（商品下架、库存不足等），消息可直接返回给用户"""
+
+
+class CheckoutService:
+    """购物车结算
+
+    购物车条目（已带商品）只加载一次；事务内按商品ID顺序 SELECT ... FOR UPDATE
+    锁定涉及的商品，以锁定后的价格和状态一次遍历算出订单金额、佣金和订单项，
+    最后用一条条件UPDATE扣减全部库存并批量写入订单项和预占记录。
+    """
+
+    @staticmethod
+    def get_commission_rate(goods, role):
+        if role == 2:
+            return goods.commission_rate_1
+        if role == 3:
+            return goods.commission_rate_1 + goods.commission_rate_2
+        return None
+
+    @classmethod
+    def checkout(cls, user, cart_items, remark=''):
+        """根据购物车条目创建订单，返回订单；失败时抛出 CheckoutError"""
+        quantities = {}
+        for item in cart_items:
+            quantities[item.goods_id] = quantities.get(item.goods_id, 0) + item.quantity
+
+        try:
+            with transaction.atomic():
+                # 按ID顺序加锁，并发结算相同商品时不会互相死锁
+                goods_map = {
+                    goods.pk: goods
+                    for goods in Goods.objects.select_for_update().filter(pk__in=quantities).order_by('pk')
+                }
+
+                total_amount = Decimal('0.00')
+                commission_amount = Decimal('0.00')
+                order_items = []
+                for goods_id, quantity in quantities.items():
+                    goods = goods_map.get(goods_id)
+                    if goods is None or not goods.is_on_sale:
+                        name = goods.name if goods else next(
+                            item.goods.name for item in cart_items if item.goods_id == goods_id
+                        )
+                        raise CheckoutError(f"商品 {name} 已下架")
+                    if goods.stock < quantity:
+                        raise CheckoutError(f"商品 {goods.name} 库存不足")
+
+                    amount = goods.price * quantity
+                    total_amount += amount
+                    rate = cls.get_commission_rate(goods, user.role)
+                    if rate is not None:
+                        commission_amount += round_money(amount * rate / 100)
+                    order_items.append(OrderItem(
+                        goods=goods,
+                        goods_name=goods.name,
+                        goods_image=GoodsImageService.get_url(goods, 'list') or '',
+                        price=goods.price,
+                        quantity=quantity,
+                        total_amount=amount
+                    ))
+
+                order = Order.objects.create(
+                    user=user,
+                    total_amount=total_amount,
+                    actual_amount=total_amount,  # 这里可以加入优惠逻辑
+                    commission_amount=commission_amount,
+                    distributor=user if user.role in [2, 3] else None,
+                    remark=remark
+                    # 需要添加收货地址信息
+                )
+                for order_item in order_items:
+                    order_item.order = order
+                OrderItem.objects.bulk_create(order_items)
+
+                StockReservationService.reserve(order, quantities)
+        except InsufficientStock as e:
+            raise CheckoutError(f"商品 {goods_map[e.goods_id].name} 库存不足")
+
+        return order
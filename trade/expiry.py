@@ -0,0 +1,135 @@
+import logging
+import time
+from datetime import timedelta
+from redis.exceptions import LockError
+from core.redis_client import get_redis
+from payments.utils import WeChatPay
+from .models import Order
+from .reconciliation import PaymentReconciliationService
+
+logger = logging.getLogger('order')
+
+
+class OrderExpiryScheduler:
+    """订单超时取消定时器
+
+    下单时把订单ID加入Redis有序集合，分值为超时时刻的时间戳；定时任务每隔几秒
+    取出已到期的订单交给 PaymentReconciliationService 对账（已支付的补记支付，
+    未支付的取消），开销只与当前到期的订单数有关，不再扫描全部待支付订单。
+
+    - 幂等：到期订单只处理仍为待支付的，已通过支付回调变为已支付的直接移出；
+    - 可恢复：处理完成后才从有序集合移除，进程中途退出时下次会重新处理；
+      查询支付状态失败的订单延后重试；
+    - Redis数据丢失或下单时写入失败，可用 rearm 根据数据库中的待支付订单重新登记；
+    - 处理期间持有分布式锁，每批开始前续期；批大小按支付查询超时计算，
+      一批最慢也能在锁有效期内完成，续期失败（锁已过期）时停止处理，不与其他进程并发。
+    """
+    KEY = 'order:expiry'
+    LOCK_KEY = 'order:expiry:drain_lock'
+    LOCK_TIMEOUT = 120
+    BATCH_SIZE = 500
+    RETRY_DELAY = 60
+
+    @staticmethod
+    def expire_at(created_at):
+        return (created_at + timedelta(minutes=PaymentReconciliationService.TIMEOUT_MINUTES)).timestamp()
+
+    @classmethod
+    def schedule(cls, order):
+        """登记订单的超时时刻"""
+        get_redis().zadd(cls.KEY, {order.pk: cls.expire_at(order.created_at)})
+
+    @classmethod
+    def unschedule(cls, order_ids):
+        order_ids = list(order_ids)
+        if order_ids:
+            get_redis().zrem(cls.KEY, *order_ids)
+
+    @classmethod
+    def get_batch_size(cls):
+        """每批订单数：所有支付查询都超时时，一批的耗时也不超过锁有效期的一半"""
+        workers = PaymentReconciliationService.get_max_workers()
+        query_timeout = WeChatPay.QUERY_TIMEOUT
+        if isinstance(query_timeout, (tuple, list)):
+            query_timeout = sum(query_timeout)
+        rounds = max(1, int(cls.LOCK_TIMEOUT / 2 // query_timeout))
+        return min(cls.BATCH_SIZE, workers * rounds)
+
+    @classmethod
+    def drain(cls, now=None):
+        """处理所有已到期的订单，返回 {'paid': n, 'cancelled': n, 'failed': n}"""
+        client = get_redis()
+        lock = client.lock(cls.LOCK_KEY, timeout=cls.LOCK_TIMEOUT, blocking=False)
+        if not lock.acquire():
+            return None
+
+        totals = {'paid': 0, 'cancelled': 0, 'failed': 0}
+        batch_size = cls.get_batch_size()
+        try:
+            now = now or time.time()
+            while True:
+                due_ids = [int(order_id) for order_id in client.zrangebyscore(cls.KEY, '-inf', now, 0, batch_size)]
+                if not due_ids:
+                    break
+                # 每批开始前把锁的有效期重置为 LOCK_TIMEOUT，锁已失效时其他进程可能正在处理
+                try:
+                    lock.extend(cls.LOCK_TIMEOUT, replace_ttl=True)
+                except LockError:
+                    logger.warning("Order expiry drain lock lost, stopping")
+                    break
+                for key, value in cls.expire(due_ids).items():
+                    totals[key] += value
+                if len(due_ids) < batch_size:
+                    break
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                logger.warning("Order expiry drain lock expired before release")
+
+        if any(totals.values()):
+            logger.info(f"Expired orders processed: {totals}")
+        return totals
+
+    @classmethod
+    def expire(cls, order_ids):
+        """对账一批到期订单，处理完成的移出定时器，查询失败的延后重试"""
+        orders = list(
+            Order.objects.filter(pk__in=order_ids, status='pending').values_list('id', 'order_number', 'user_id')
+        )
+        totals = PaymentReconciliationService.reconcile(orders) if orders else {'paid': 0, 'cancelled': 0, 'failed': 0}
+
+        retry_ids = set()
+        if totals['failed']:
+            retry_ids = set(Order.objects.filter(
+                pk__in=[order[0] for order in orders], status='pending'
+            ).values_list('id', flat=True))
+
+        pipe = get_redis().pipeline()
+        done_ids = [order_id for order_id in order_ids if order_id not in retry_ids]
+        if done_ids:
+            pipe.zrem(cls.KEY, *done_ids)
+        if retry_ids:
+            pipe.zadd(cls.KEY, {order_id: time.time() + cls.RETRY_DELAY for order_id in retry_ids})
+        pipe.execute()
+        return totals
+
+    @classmethod
+    def rearm(cls, chunk_size=5000):
+        """根据数据库重新登记所有待支付订单（已登记的保持原有时刻），返回登记的订单数"""
+        client = get_redis()
+        queryset = Order.objects.filter(status='pending').order_by().values_list('id', 'created_at')
+
+        armed = 0
+        mapping = {}
+        for order_id, created_at in queryset.iterator(chunk_size=chunk_size):
+            mapping[order_id] = cls.expire_at(created_at)
+            if len(mapping) >= chunk_size:
+                armed += client.zadd(cls.KEY, mapping, nx=True)
+                mapping = {}
+        if mapping:
+            armed += client.zadd(cls.KEY, mapping, nx=True)
+
+        if armed:
+            logger.info(f"Order expiry timers re-armed: {armed}")
+        return armed
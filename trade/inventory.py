@@ -0,0 +1,104 @@
+import logging
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from goods.models import Goods
+from .models import StockReservation
+
+logger = logging.getLogger('order')
+
+
+class InsufficientStock(Exception):
+    """库存不足"""
+
+    def __init__(self, goods_id):
+        super().__init__(goods_id)
+        self.goods_id = goods_id
+
+
+class StockReservationService:
+    """库存预占
+
+    下单时用一条带条件的UPDATE扣减订单涉及的全部商品库存：
+    ``UPDATE ... SET stock = stock - CASE id ... END WHERE (id = a AND stock >= x) OR ...``，
+    影响行数少于商品数即有商品库存不足。调用方应先按ID顺序锁定这些商品行
+    （见 CheckoutService），避免并发下单互相死锁。
+    """
+
+    @staticmethod
+    def reserve(order, quantities):
+        """为订单预占库存，quantities 为 {商品ID: 数量}
+
+        必须在调用方的事务中执行，库存不足时抛出 InsufficientStock，
+        由事务回滚已扣减的库存。
+        """
+        condition = Q()
+        for goods_id, quantity in quantities.items():
+            condition |= Q(pk=goods_id, stock__gte=quantity)
+        updated = Goods.objects.filter(condition).update(
+            stock=F('stock') - Case(
+                *[When(pk=goods_id, then=Value(quantity)) for goods_id, quantity in quantities.items()],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        )
+        if updated != len(quantities):
+            stocks = dict(Goods.objects.filter(pk__in=list(quantities)).values_list('pk', 'stock'))
+            goods_id = next(
+                (goods_id for goods_id in sorted(quantities) if stocks.get(goods_id, 0) < quantities[goods_id]),
+                min(quantities)
+            )
+            raise InsufficientStock(goods_id)
+
+        StockReservation.objects.bulk_create([
+            StockReservation(order=order, goods_id=goods_id, quantity=quantity)
+            for goods_id, quantity in quantities.items()
+        ])
+
+    @staticmethod
+    def release(order_ids):
+        """批量释放订单的预占库存，重复调用不会重复归还"""
+        if not order_ids:
+            return 0
+
+        with transaction.atomic():
+            reservations = list(
+                StockReservation.objects.select_for_update().filter(
+                    order_id__in=order_ids,
+                    status='reserved'
+                ).order_by('id').values_list('id', 'goods_id', 'quantity')
+            )
+            if not reservations:
+                return 0
+
+            quantities = defaultdict(int)
+            for _id, goods_id, quantity in reservations:
+                quantities[goods_id] += quantity
+
+            StockReservation.objects.filter(
+                id__in=[reservation[0] for reservation in reservations]
+            ).update(status='released', released_at=timezone.now())
+
+            # 一条UPDATE归还所有商品的库存
+            Goods.objects.filter(pk__in=sorted(quantities)).update(
+                stock=F('stock') + Case(
+                    *[When(pk=goods_id, then=Value(quantity)) for goods_id, quantity in quantities.items()],
+                    default=Value(0),
+                    output_field=IntegerField()
+                )
+            )
+
+        logger.info(f"Stock released for {len(set(order_ids))} orders, {len(quantities)} goods")
+        return len(reservations)
+
+    @classmethod
+    def release_cancelled(cls):
+        """释放所有已取消订单中仍处于预占状态的库存（兜底补偿）"""
+        order_ids = list(
+            StockReservation.objects.filter(
+                status='reserved',
+                order__status='cancelled'
+            ).values_list('order_id', flat=True).distinct()
+        )
+        return cls.release(order_ids)
@@ -0,0 +1,110 @@
+import multiprocessing
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connections
+from goods.models import Category, Goods
+from trade.cart_store import DatabaseCartStore
+from trade.checkout import CheckoutError, CheckoutService
+from trade.models import Cart, Order
+from users.models import User
+
+PREFIX = 'bench_checkout_'
+
+
+def run_worker(user_ids, queue):
+    """子进程：依次为分配到的用户结算购物车，回传每次耗时"""
+    connections.close_all()
+    latencies = []
+    failures = 0
+    for user in User.objects.filter(pk__in=user_ids):
+        cart_items = DatabaseCartStore.get_items(user)
+        started = time.perf_counter()
+        try:
+            CheckoutService.checkout(user, cart_items, remark='benchmark')
+            latencies.append(time.perf_counter() - started)
+        except CheckoutError:
+            failures += 1
+    connections.close_all()
+    queue.put((latencies, failures))
+
+
+class Command(BaseCommand):
+    help = '多进程并发结算压测，统计每秒订单数和延迟分位数（热点商品争用场景）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='并发进程数')
+        parser.add_argument('--orders', type=int, default=2000, help='订单总数')
+        parser.add_argument('--goods', type=int, default=200, help='商品数')
+        parser.add_argument('--items', type=int, default=3, help='每单商品数（其中一个为热点商品）')
+        parser.add_argument('--keep', action='store_true', help='保留压测数据')
+
+    def setup_data(self, orders, goods_count, items):
+        rng = random.Random(42)
+        category = Category.objects.create(name=f'{PREFIX}category')
+        Goods.objects.bulk_create([
+            Goods(
+                name=f'{PREFIX}{i}', category=category, price=Decimal(rng.randint(100, 100000)) / 100,
+                original_price=Decimal('1000.00'), stock=orders * items, image='goods/benchmark.jpg',
+                description='benchmark'
+            )
+            for i in range(goods_count)
+        ])
+        goods_ids = list(Goods.objects.filter(category=category).values_list('id', flat=True))
+        hot_goods_id = goods_ids[0]
+
+        User.objects.bulk_create([
+            User(username=f'{PREFIX}{i}', role=rng.choice([1, 2, 3])) for i in range(orders)
+        ])
+        user_ids = list(User.objects.filter(username__startswith=PREFIX).values_list('id', flat=True))
+
+        carts = []
+        for user_id in user_ids:
+            chosen = {hot_goods_id} | set(rng.sample(goods_ids[1:], items - 1))
+            carts += [Cart(user_id=user_id, goods_id=goods_id, quantity=1) for goods_id in chosen]
+        Cart.objects.bulk_create(carts)
+        return category, user_ids, hot_goods_id
+
+    def cleanup(self, category):
+        Order.objects.filter(user__username__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+        Goods.objects.filter(category=category).delete()
+        category.delete()
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        category, user_ids, hot_goods_id = self.setup_data(options['orders'], options['goods'], options['items'])
+        hot_stock = Goods.objects.get(pk=hot_goods_id).stock
+
+        try:
+            connections.close_all()
+            queue = multiprocessing.Queue()
+            chunks = [user_ids[i::processes] for i in range(processes)]
+            workers = [multiprocessing.Process(target=run_worker, args=(chunk, queue)) for chunk in chunks]
+
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            results = [queue.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+            failures = sum(worker_failures for _, worker_failures in results)
+            if not latencies:
+                self.stdout.write(self.style.ERROR('没有成功的订单'))
+                return
+
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+            sold = hot_stock - Goods.objects.get(pk=hot_goods_id).stock
+            self.stdout.write(f'进程数: {processes}  成功订单: {len(latencies)}  失败: {failures}')
+            self.stdout.write(f'吞吐: {len(latencies) / elapsed:.1f} 单/秒')
+            self.stdout.write(f'延迟: p50 {percentile(0.5):.1f}ms  p99 {percentile(0.99):.1f}ms  max {latencies[-1] * 1000:.1f}ms')
+            self.stdout.write(f'热点商品扣减: {sold}（应等于成功订单数 {len(latencies)}）')
+        finally:
+            if not options['keep']:
+                self.cleanup(category)
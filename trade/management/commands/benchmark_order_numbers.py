@@ -0,0 +1,44 @@
+import multiprocessing
+import time
+from django.core.management.base import BaseCommand
+from trade.utils import OrderNumberGenerator
+
+
+def run_worker(worker_id, count, queue):
+    """子进程：用固定机器号连续生成订单号，回传耗时"""
+    generator = OrderNumberGenerator(worker_id=worker_id)
+    started = time.perf_counter()
+    for _ in range(count):
+        generator.generate()
+    queue.put((worker_id, time.perf_counter() - started))
+
+
+class Command(BaseCommand):
+    help = '多进程生成雪花订单号，统计每个进程每秒生成的数量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='进程数')
+        parser.add_argument('--count', type=int, default=200000, help='每个进程生成的数量')
+        parser.add_argument('--min-rate', type=int, default=100000, help='每个进程每秒的最低生成数量')
+
+    def handle(self, *args, **options):
+        queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(worker_id, options['count'], queue))
+            for worker_id in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        results = sorted(queue.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+
+        slow = 0
+        for worker_id, elapsed in results:
+            rate = options['count'] / elapsed
+            slow += rate < options['min_rate']
+            self.stdout.write(f'机器号 {worker_id}: {rate:,.0f} 个/秒')
+        if slow:
+            self.stdout.write(self.style.WARNING(f"{slow} 个进程低于 {options['min_rate']:,} 个/秒"))
+        else:
+            self.stdout.write(self.style.SUCCESS('全部进程达到目标吞吐量'))
@@ -0,0 +1,140 @@
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from trade.partitions import month_start
+from trade.utils import OrderNumberGenerator
+
+SCHEMA = 'bench_order_partitions'
+
+
+def hot_queries(now, user_id):
+    """热点查询，直接取自应用代码（我的订单、超时对账、统计重算）
+
+    主键范围条件与线上一致，由各查询根据创建时间自行推出，压测中不再手工添加。
+    """
+    from trade.models import Order
+    from trade.pagination import OrderCursorPagination
+    from trade.reconciliation import PaymentReconciliationService
+    from trade.services import OrderStatisticsService
+
+    user_orders = Order.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+    cursor_at = now - timedelta(days=60)
+    next_page = OrderCursorPagination().filter_after_cursor(
+        user_orders, 'created_at', True, cursor_at, OrderNumberGenerator.min_id_at(cursor_at)
+    )
+    timeout_time = now - timedelta(minutes=PaymentReconciliationService.TIMEOUT_MINUTES)
+    return [
+        ('我的订单首页', user_orders.values('id', 'status', 'actual_amount')[:20]),
+        ('我的订单翻页', next_page.values('id', 'status', 'actual_amount')[:20]),
+        ('超时未支付扫描', PaymentReconciliationService.get_timeout_queryset(timeout_time).values_list(
+            'id', 'order_number', 'user_id'
+        )[:500]),
+        ('当月统计重算', OrderStatisticsService.bucket_rows(month_start(now).date())),
+    ]
+
+
+def to_sql(queryset, table):
+    """把 ORM 查询中的订单表换成压测表"""
+    sql, params = queryset.query.sql_with_params()
+    return sql.replace(connection.ops.quote_name('trade_order'), table), params
+
+
+class Command(BaseCommand):
+    help = '在临时schema中生成合成订单数据，对比普通表和按月分区表上热点查询的耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50_000_000, help='合成订单行数')
+        parser.add_argument('--months', type=int, default=36, help='订单时间跨度（月）')
+        parser.add_argument('--users', type=int, default=1_000_000, help='用户数')
+        parser.add_argument('--repeat', type=int, default=20, help='每个查询重复次数')
+        parser.add_argument('--keep', action='store_true', help='保留临时schema')
+
+    def create_tables(self, cursor, rows, months, users, now):
+        start = month_start(now, -months + 1)
+        span = int((now - start).total_seconds())
+        columns = (
+            "id bigint NOT NULL, order_number varchar(32) NOT NULL, user_id bigint NOT NULL, "
+            "status varchar(20) NOT NULL, total_amount numeric(10, 2) NOT NULL, "
+            "actual_amount numeric(10, 2) NOT NULL, commission_amount numeric(10, 2) NOT NULL, "
+            "created_at timestamp NOT NULL"
+        )
+        cursor.execute(f'CREATE TABLE {SCHEMA}.orders_plain ({columns}, PRIMARY KEY (id))')
+        cursor.execute(f'CREATE TABLE {SCHEMA}.orders_partitioned ({columns}, PRIMARY KEY (id)) PARTITION BY RANGE (id)')
+        for offset in range(months + 1):
+            lower = month_start(start, offset)
+            cursor.execute(
+                f'CREATE TABLE {SCHEMA}.orders_p{lower:%Y%m} PARTITION OF {SCHEMA}.orders_partitioned '
+                f'FOR VALUES FROM ({OrderNumberGenerator.min_id_at(lower)}) '
+                f'TO ({OrderNumberGenerator.min_id_at(month_start(lower, 1))})'
+            )
+
+        # 时间均匀分布，近 1% 为待支付，其余按比例分布在其他状态；id 与雪花ID同样由时间左移得到
+        shift = OrderNumberGenerator.WORKER_BITS + OrderNumberGenerator.SEQUENCE_BITS
+        cursor.execute(
+            f"""
+            INSERT INTO {SCHEMA}.orders_plain
+            SELECT ((extract(epoch FROM ts) * 1000)::bigint - %(epoch)s) << {shift} | (n & 4194303),
+                   n::text, 1 + (hashint %% %(users)s), status, (hashint %% 100000) / 100.0,
+                   (hashint %% 100000) / 100.0, (hashint %% 1000) / 100.0, ts
+            FROM (
+                SELECT n, abs(hashtext(n::text)) AS hashint,
+                       %(start)s::timestamp + (n::float8 / %(rows)s * %(span)s) * interval '1 second' AS ts,
+                       (ARRAY['completed', 'completed', 'completed', 'paid', 'shipped',
+                              'cancelled', 'refunded', 'completed', 'completed', 'completed'])[1 + n %% 10] AS status
+                FROM generate_series(1, %(rows)s) AS n
+            ) AS s
+            """,
+            {'epoch': OrderNumberGenerator.EPOCH_MS, 'users': users, 'start': start, 'rows': rows, 'span': span}
+        )
+        cursor.execute(
+            f"UPDATE {SCHEMA}.orders_plain SET status = 'pending' WHERE created_at >= %s AND id %% 100 = 0",
+            [now - timedelta(days=1)]
+        )
+        cursor.execute(f'INSERT INTO {SCHEMA}.orders_partitioned SELECT * FROM {SCHEMA}.orders_plain')
+
+        for table in ('orders_plain', 'orders_partitioned'):
+            # 与 trade_order 上的索引一致
+            cursor.execute(f'CREATE INDEX ON {SCHEMA}.{table} (user_id)')
+            cursor.execute(f'CREATE INDEX ON {SCHEMA}.{table} (user_id, created_at DESC, id DESC)')
+            cursor.execute(f'CREATE INDEX ON {SCHEMA}.{table} (status)')
+            cursor.execute(f'CREATE INDEX ON {SCHEMA}.{table} (created_at)')
+            cursor.execute(f'ANALYZE {SCHEMA}.{table}')
+
+    def time_query(self, cursor, sql, params, repeat):
+        cursor.execute(sql, params)
+        cursor.fetchall()  # 预热
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            durations.append(time.perf_counter() - started)
+        durations.sort()
+        return durations[len(durations) // 2] * 1000
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('分区压测需要PostgreSQL')
+
+        now = datetime.now()
+        queries = hot_queries(now, 1 + options['users'] // 2)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+            cursor.execute(f'CREATE SCHEMA {SCHEMA}')
+            try:
+                started = time.perf_counter()
+                self.create_tables(cursor, options['rows'], options['months'], options['users'], now)
+                self.stdout.write(f"生成 {options['rows']} 行用时 {time.perf_counter() - started:.1f}s")
+
+                self.stdout.write(f"{'查询':<12}{'普通表(ms)':>14}{'分区表(ms)':>14}{'加速比':>10}")
+                for name, queryset in queries:
+                    plain = self.time_query(cursor, *to_sql(queryset, f'{SCHEMA}.orders_plain'), options['repeat'])
+                    partitioned = self.time_query(
+                        cursor, *to_sql(queryset, f'{SCHEMA}.orders_partitioned'), options['repeat']
+                    )
+                    self.stdout.write(f'{name:<12}{plain:>14.2f}{partitioned:>14.2f}{plain / partitioned:>10.1f}x')
+            finally:
+                if not options['keep']:
+                    cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from trade.partitions import OrderPartitionService
+
+
+class Command(BaseCommand):
+    help = '预先创建订单和订单项的月份分区，并归档超过保留期限的已关闭订单分区'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=None, help='提前创建的月份数')
+        parser.add_argument('--archive', action='store_true', help='同时归档订单全部关闭的过期分区（需配置 ORDER_ARCHIVE_TABLESPACE）')
+        parser.add_argument('--archive-days', type=int, default=None, help='归档期限（天）')
+
+    def handle(self, *args, **options):
+        if not OrderPartitionService.is_supported():
+            self.stdout.write(self.style.WARNING('当前数据库不支持分区（需要PostgreSQL）'))
+            return
+
+        created = OrderPartitionService.ensure_partitions(options['months'])
+        self.stdout.write(self.style.SUCCESS(f"新建分区 {len(created)} 个：{', '.join(created) or '-'}"))
+
+        if options['archive']:
+            archived = OrderPartitionService.archive(options['archive_days'])
+            self.stdout.write(self.style.SUCCESS(f"归档分区 {len(archived)} 个：{', '.join(archived) or '-'}"))
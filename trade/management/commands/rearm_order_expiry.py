@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from trade.expiry import OrderExpiryScheduler
+
+
+class Command(BaseCommand):
+    help = '根据数据库中的待支付订单重新登记超时定时器（Redis故障恢复后执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drain', action='store_true', help='登记后立即处理已到期的订单')
+
+    def handle(self, *args, **options):
+        armed = OrderExpiryScheduler.rearm()
+        self.stdout.write(self.style.SUCCESS(f'重新登记 {armed} 个订单'))
+
+        if options['drain']:
+            totals = OrderExpiryScheduler.drain()
+            if totals is None:
+                self.stdout.write(self.style.WARNING('其他进程正在处理到期订单'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"已支付 {totals['paid']}，已取消 {totals['cancelled']}，查询失败 {totals['failed']}"
+                ))
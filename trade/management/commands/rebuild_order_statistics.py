@@ -0,0 +1,37 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from trade.services import OrderStatisticsService
+
+
+class Command(BaseCommand):
+    help = '根据订单表重建订单统计汇总表，或检查汇总表与订单表是否一致'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='只处理最近若干天（默认全部）')
+        parser.add_argument('--check', action='store_true', help='只检查，不修改')
+        parser.add_argument('--repair', action='store_true', help='检查发现不一致时重建对应范围')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days']:
+            since = timezone.now().date() - timedelta(days=options['days'] - 1)
+
+        if not options['check']:
+            buckets = OrderStatisticsService.rebuild(since)
+            self.stdout.write(self.style.SUCCESS(f'已重建 {buckets} 个统计桶'))
+            return
+
+        mismatches = OrderStatisticsService.check(since)
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('统计汇总与订单表一致'))
+            return
+
+        for (day, hour, status), actual, expected in mismatches:
+            self.stdout.write(f'{day} {hour:02d}时 {status}: 汇总表 {actual}，订单表 {expected}')
+
+        if options['repair']:
+            buckets = OrderStatisticsService.rebuild(since)
+            self.stdout.write(self.style.SUCCESS(f'发现 {len(mismatches)} 处不一致，已重建 {buckets} 个统计桶'))
+        else:
+            raise CommandError(f'发现 {len(mismatches)} 处不一致')
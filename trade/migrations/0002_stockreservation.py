@@ -0,0 +1,73 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0006_goods_image_derivatives"),
+        ("trade", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField(verbose_name="预占数量")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("reserved", "已预占"), ("released", "已释放")],
+                        default="reserved",
+                        max_length=20,
+                        verbose_name="状态",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="创建时间"),
+                ),
+                (
+                    "released_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="释放时间"),
+                ),
+                (
+                    "goods",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_reservations",
+                        to="goods.goods",
+                        verbose_name="商品",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="trade.order",
+                        verbose_name="订单",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "库存预占",
+                "verbose_name_plural": "库存预占",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "order"], name="trade_reservation_status_idx"
+                    )
+                ],
+            },
+        ),
+    ]
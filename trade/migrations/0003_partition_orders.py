@@ -0,0 +1,97 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:20
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+import trade.utils
+
+TABLES = ["trade_order", "trade_orderitem"]
+MONTHS_AHEAD = 3
+
+
+def month_start(dt, offset=0):
+    month = dt.month - 1 + offset
+    return datetime(dt.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_tables(apps, schema_editor):
+    """把订单表和订单项表改为按主键范围逐月分区的表（仅PostgreSQL）"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    min_id_at = trade.utils.OrderNumberGenerator.min_id_at
+    now = datetime.now()
+    with schema_editor.connection.cursor() as cursor:
+        # 重建表之前先记下并删除所有相关外键（引用这两张表的和这两张表引用别人的）
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND (confrelid = ANY(%s::regclass[]) OR conrelid = ANY(%s::regclass[]))
+            """,
+            [TABLES, TABLES],
+        )
+        foreign_keys = cursor.fetchall()
+        for table, name, _definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+
+        for table in TABLES:
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+            cursor.execute(
+                f"CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING ALL) "
+                f"PARTITION BY RANGE (id)"
+            )
+            # 启用分区前的历史数据（自增ID）
+            cursor.execute(
+                f"CREATE TABLE {table}_legacy PARTITION OF {table} "
+                f"FOR VALUES FROM (MINVALUE) TO ({min_id_at(month_start(now))})"
+            )
+            for offset in range(MONTHS_AHEAD + 1):
+                start = month_start(now, offset)
+                cursor.execute(
+                    f"CREATE TABLE {table}_p{start:%Y%m} PARTITION OF {table} "
+                    f"FOR VALUES FROM ({min_id_at(start)}) TO ({min_id_at(month_start(start, 1))})"
+                )
+            cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+            cursor.execute(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")
+            cursor.execute(f"DROP TABLE {table}_unpartitioned")
+
+        for table, name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trade", "0002_stockreservation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="order_number",
+            field=models.CharField(db_index=True, max_length=32, verbose_name="订单编号"),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="id",
+            field=models.BigIntegerField(
+                default=trade.utils.next_order_id,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="id",
+            field=models.BigIntegerField(
+                default=trade.utils.next_order_id,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trade", "0003_partition_orders"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="trade_order_user_created_idx"
+            ),
+        ),
+    ]
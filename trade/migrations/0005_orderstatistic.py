@@ -0,0 +1,63 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trade", "0004_order_user_created_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderStatistic",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="日期")),
+                ("hour", models.PositiveSmallIntegerField(verbose_name="小时")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "待支付"),
+                            ("paid", "已支付"),
+                            ("shipped", "已发货"),
+                            ("delivered", "已送达"),
+                            ("completed", "已完成"),
+                            ("cancelled", "已取消"),
+                            ("refunding", "退款中"),
+                            ("refunded", "已退款"),
+                        ],
+                        max_length=20,
+                        verbose_name="订单状态",
+                    ),
+                ),
+                ("order_count", models.IntegerField(default=0, verbose_name="订单数")),
+                (
+                    "total_amount",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=14, verbose_name="订单金额"
+                    ),
+                ),
+                (
+                    "commission_amount",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=14, verbose_name="佣金金额"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "订单统计",
+                "verbose_name_plural": "订单统计",
+                "unique_together": {("day", "hour", "status")},
+            },
+        ),
+    ]
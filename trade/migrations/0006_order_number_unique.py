@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trade", "0005_orderstatistic"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="order_number",
+            field=models.CharField(max_length=32, verbose_name="订单编号"),
+        ),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                fields=("order_number", "id"), name="trade_order_number_id_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:10
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+LEGACY_INDEX = "trade_order_legacy_number_uniq"
+
+
+def add_legacy_unique_index(apps, schema_editor):
+    """历史订单的订单编号唯一（分区上的唯一索引不需要包含分区键）"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('trade_order_legacy')")
+        if cursor.fetchone()[0] is None:
+            return
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {LEGACY_INDEX} ON trade_order_legacy (order_number)")
+
+
+def remove_legacy_unique_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {LEGACY_INDEX}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trade", "0006_order_number_unique"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="order",
+            name="trade_order_number_id_uniq",
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="order_number",
+            field=models.CharField(editable=False, max_length=32, verbose_name="订单编号"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["order_number"], name="trade_order_number_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    ("order_number", django.db.models.functions.comparison.Cast("id", models.CharField())),
+                    ("id__lt", 241591910400000),
+                    _connector="OR",
+                ),
+                name="trade_order_number_is_id",
+            ),
+        ),
+        migrations.RunPython(add_legacy_unique_index, remove_legacy_unique_index),
+    ]
@@ -1,10 +1,22 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models.functions import Cast
 from django.utils.translation import gettext_lazy as _
 from users.models import User
 from goods.models import Goods
+from goods.commission import round_money
+from .partitions import LEGACY_ID_LIMIT
+from .utils import next_order_id
 
 class Order(models.Model):
-    """订单模型"""
+    """订单模型
+
+    主键由雪花算法生成、包含创建时间（毫秒），订单表按主键范围逐月分区
+    （见 trade.partitions）。分区表的唯一约束必须包含分区键，订单编号不能单独建
+    唯一约束：订单编号固定为主键的十进制字符串（检查约束保证），由主键保证唯一。
+    启用分区前的历史订单保留原有订单编号（20位，与雪花编号不会重复），
+    由 legacy 分区上的唯一索引保证唯一。
+    """
     ORDER_STATUS = (
         ('pending', _('待支付')),
         ('paid', _('已支付')),
@@ -16,7 +28,8 @@ class Order(models.Model):
         ('refunded', _('已退款')),
     )
 
-    order_number = models.CharField(_('订单编号'), max_length=32, unique=True)
+    id = models.BigIntegerField(primary_key=True, default=next_order_id, editable=False)
+    order_number = models.CharField(_('订单编号'), max_length=32, editable=False)
     user = models.ForeignKey(User, verbose_name=_('用户'), on_delete=models.CASCADE)
     total_amount = models.DecimalField(_('订单总额'), max_digits=10, decimal_places=2)
     actual_amount = models.DecimalField(_('实付金额'), max_digits=10, decimal_places=2)
@@ -56,12 +69,31 @@ class Order(models.Model):
         verbose_name = _('订单')
         verbose_name_plural = _('订单管理')
         ordering = ['-created_at']
+        indexes = [
+            # 我的订单：按用户和创建时间倒序的键集分页
+            models.Index(fields=['user', '-created_at', '-id'], name='trade_order_user_created_idx'),
+            # 支付回调、后台等按订单编号查询
+            models.Index(fields=['order_number'], name='trade_order_number_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(order_number=Cast('id', models.CharField())) | models.Q(id__lt=LEGACY_ID_LIMIT),
+                name='trade_order_number_is_id',
+            ),
+        ]
 
     def __str__(self):
         return self.order_number
 
+    def save(self, *args, **kwargs):
+        # 订单编号由主键决定，不接受调用方指定（历史订单保留原编号）
+        if self.id >= LEGACY_ID_LIMIT:
+            self.order_number = str(self.id)
+        super().save(*args, **kwargs)
+
 class OrderItem(models.Model):
-    """订单项模型"""
+    """订单项模型（与订单一样按雪花主键逐月分区）"""
+    id = models.BigIntegerField(primary_key=True, default=next_order_id, editable=False)
     order = models.ForeignKey(
         Order, 
         verbose_name=_('订单'), 
@@ -140,7 +172,67 @@ class Cart(models.Model):
         
         total = self.total_amount
         if self.user.role == 2:  # 普通分销商
-            return (total * self.goods.commission_rate_1 / 100).quantize(Decimal('0.01'))
+            return round_money(total * self.goods.commission_rate_1 / 100)
         elif self.user.role == 3:  # 高级分销商
-            return (total * (self.goods.commission_rate_1 + self.goods.commission_rate_2) / 100).quantize(Decimal('0.01'))
+            return round_money(total * (self.goods.commission_rate_1 + self.goods.commission_rate_2) / 100)
         return Decimal('0.00')
+
+
+class StockReservation(models.Model):
+    """库存预占记录
+
+    下单时扣减商品库存并记录预占数量，订单超时取消后按记录归还库存。
+    """
+    STATUS_CHOICES = (
+        ('reserved', _('已预占')),
+        ('released', _('已释放')),
+    )
+
+    order = models.ForeignKey(
+        Order,
+        verbose_name=_('订单'),
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    goods = models.ForeignKey(
+        Goods,
+        verbose_name=_('商品'),
+        on_delete=models.CASCADE,
+        related_name='stock_reservations'
+    )
+    quantity = models.PositiveIntegerField(_('预占数量'))
+    status = models.CharField(_('状态'), max_length=20, choices=STATUS_CHOICES, default='reserved')
+    created_at = models.DateTimeField(_('创建时间'), auto_now_add=True)
+    released_at = models.DateTimeField(_('释放时间'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('库存预占')
+        verbose_name_plural = _('库存预占')
+        indexes = [
+            models.Index(fields=['status', 'order'], name='trade_reservation_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} - {self.goods_id} x {self.quantity}"
+
+
+class OrderStatistic(models.Model):
+    """订单统计汇总
+
+    按订单创建时间的 (日期, 小时) 和当前订单状态汇总订单数、订单金额和佣金，
+    订单创建、状态变化和删除时增量更新（见 trade.services.OrderStatisticsService）。
+    """
+    day = models.DateField(_('日期'))
+    hour = models.PositiveSmallIntegerField(_('小时'))
+    status = models.CharField(_('订单状态'), max_length=20, choices=Order.ORDER_STATUS)
+    order_count = models.IntegerField(_('订单数'), default=0)
+    total_amount = models.DecimalField(_('订单金额'), max_digits=14, decimal_places=2, default=0)
+    commission_amount = models.DecimalField(_('佣金金额'), max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _('订单统计')
+        verbose_name_plural = _('订单统计')
+        unique_together = ['day', 'hour', 'status']
+
+    def __str__(self):
+        return f"{self.day} {self.hour:02d}:00 {self.status}"
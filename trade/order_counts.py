@@ -0,0 +1,23 @@
+from django.core.cache import cache
+from django.db.models import Count
+from .models import Order
+
+ORDER_COUNTS_CACHE_KEY = 'order:counts:{}'
+ORDER_COUNTS_CACHE_TIMEOUT = 300
+
+
+def invalidate_order_counts(user_id):
+    cache.delete(ORDER_COUNTS_CACHE_KEY.format(user_id))
+
+
+def get_order_counts(user):
+    """用户各状态订单数（订单列表标签角标），一次分组查询，按用户缓存，订单状态变化时失效"""
+    key = ORDER_COUNTS_CACHE_KEY.format(user.pk)
+    counts = cache.get(key)
+    if counts is None:
+        rows = Order.objects.filter(user=user).order_by().values('status').annotate(count=Count('id'))
+        grouped = {row['status']: row['count'] for row in rows}
+        counts = {status: grouped.get(status, 0) for status, _label in Order.ORDER_STATUS}
+        counts['all'] = sum(grouped.values())
+        cache.set(key, counts, timeout=ORDER_COUNTS_CACHE_TIMEOUT)
+    return counts
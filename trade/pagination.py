@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+from goods.pagination import GoodsCursorPagination
+from .partitions import created_range_q
+
+
+class OrderCursorPagination(GoodsCursorPagination):
+    """订单游标分页
+
+    固定按 (-created_at, -id) 做键集分页，配合 (user, -created_at, -id) 复合索引，
+    每页都是一次索引范围扫描，不需要 OFFSET 和 COUNT(*)。
+    翻页时附加由游标创建时间推出的主键上界，不扫描更新月份的分区。
+    """
+    ordering_fields = {
+        'created_at': datetime.fromisoformat,
+    }
+
+    def get_ordering(self, request):
+        return self.default_ordering
+
+    def filter_after_cursor(self, queryset, field, descending, value, pk):
+        queryset = super().filter_after_cursor(queryset, field, descending, value, pk)
+        # 游标之后的订单创建时间都不晚于游标
+        return queryset.filter(created_range_q(before=value + timedelta(microseconds=1)))
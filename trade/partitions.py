@@ -0,0 +1,209 @@
+import logging
+import re
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .utils import OrderNumberGenerator
+
+logger = logging.getLogger('order')
+
+# 按月分区的表（订单和订单项的主键均为包含时间的雪花ID）
+PARTITIONED_TABLES = ('trade_order', 'trade_orderitem')
+CLOSED_STATUSES = ('completed', 'cancelled', 'refunded')
+
+
+def month_start(dt, offset=0):
+    """dt 所在月份往后 offset 个月的月初"""
+    month = dt.month - 1 + offset
+    return datetime(dt.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, start):
+    return f'{table}_p{start:%Y%m}'
+
+
+# 主键中的时间与 created_at 之间允许的偏差（主键在保存前生成，各机器时钟也不完全一致）
+ID_TIME_MARGIN = timedelta(hours=1)
+# 启用分区前的自增主键都远小于该值，它们在 legacy 分区中
+LEGACY_ID_LIMIT = OrderNumberGenerator.min_id_at(datetime(2024, 1, 2))
+
+
+def created_range_q(since=None, before=None):
+    """created_at 在 [since, before) 内的订单对应的主键范围条件
+
+    与 created_at 条件一起使用，查询只扫描相关月份的分区（下界条件同时保留 legacy 分区）。
+    """
+    q = Q()
+    if since is not None:
+        if not isinstance(since, datetime):
+            since = datetime.combine(since, time.min)
+        q &= Q(id__gte=OrderNumberGenerator.min_id_at(since - ID_TIME_MARGIN)) | Q(id__lt=LEGACY_ID_LIMIT)
+    if before is not None:
+        if not isinstance(before, datetime):
+            before = datetime.combine(before, time.min)
+        q &= Q(id__lt=OrderNumberGenerator.min_id_at(before + ID_TIME_MARGIN))
+    return q
+
+
+def related_id_range_q(order_ids):
+    """与一批订单同时创建的行（如订单项）的主键范围条件，订单项主键与订单主键时间相近"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return Q()
+    earliest = OrderNumberGenerator.parse(min(order_ids))
+    latest = OrderNumberGenerator.parse(max(order_ids))
+    if earliest is None or latest is None:
+        return Q()
+    return created_range_q(earliest[0], latest[0])
+
+
+class OrderPartitionService:
+    """订单按月分区维护
+
+    分区键是主键（雪花ID），每月一个分区，范围为 [月初ID下界, 下月初ID下界)。
+    启用分区前的历史订单（自增ID）都在 legacy 分区，另有 default 分区兜底。
+
+    归档：整个分区的主键范围早于保留期限、且其中的订单全部已完成、取消或退款时，
+    分区移入归档分区集，即归档schema（ORDER_ARCHIVE_SCHEMA）和归档表空间
+    （ORDER_ARCHIVE_TABLESPACE，如廉价存储），热数据所在的存储和缓存只留给近期分区。
+    分区仍挂在原表下，ORM、后台和外键都不受影响。
+
+    订单不能单独移出原表：分区由主键决定，主键被佣金记录、库存预占等外键引用，
+    删除行或卸载分区都会违反外键。因此超过期限但仍有未关闭订单（待支付、已支付、
+    已发货、已送达、退款中）的分区整个留在热存储，等其中的订单全部关闭后的下一次归档再移动。
+    未配置归档表空间时只移动schema不能减轻热数据的负担，不做归档。
+    """
+
+    @staticmethod
+    def is_supported():
+        return connection.vendor == 'postgresql'
+
+    @staticmethod
+    def month_bounds(start):
+        return OrderNumberGenerator.min_id_at(start), OrderNumberGenerator.min_id_at(month_start(start, 1))
+
+    @classmethod
+    def create_partition(cls, cursor, table, start):
+        """创建月份分区；default 分区中已有该范围的行时，先把行移入新表再挂载"""
+        lower, upper = cls.month_bounds(start)
+        name = partition_name(table, start)
+        default = f'{table}_default'
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE id >= %s AND id < %s)', [lower, upper])
+        if not cursor.fetchone()[0]:
+            cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ({lower}) TO ({upper})')
+            return
+
+        # 直接 CREATE ... PARTITION OF 会因 default 分区中已有该范围的行而失败。
+        # 外键为 DEFERRABLE INITIALLY DEFERRED，提交时行已回到父表，引用检查可以通过。
+        cursor.execute(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE id >= %s AND id < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            [lower, upper]
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})')
+        logger.warning(f"Moved {moved} rows from {default} into new partition {name}")
+
+    @classmethod
+    def ensure_partitions(cls, months_ahead=None, now=None):
+        """创建当月及之后若干个月的分区，返回新建的分区名"""
+        if not cls.is_supported():
+            return []
+        if months_ahead is None:
+            months_ahead = getattr(settings, 'ORDER_PARTITION_MONTHS_AHEAD', 3)
+        now = now or timezone.now()
+
+        created = []
+        with connection.cursor() as cursor:
+            existing = cls.list_partitions(cursor)
+            for offset in range(months_ahead + 1):
+                start = month_start(now, offset)
+                # 订单和订单项在同一事务中创建，移动 default 分区中的行时外键检查才能通过
+                with transaction.atomic():
+                    for table in PARTITIONED_TABLES:
+                        name = partition_name(table, start)
+                        if name in existing:
+                            continue
+                        cls.create_partition(cursor, table, start)
+                        created.append(name)
+        if created:
+            logger.info(f"Order partitions created: {', '.join(created)}")
+        return created
+
+    @staticmethod
+    def list_partitions(cursor):
+        """现有分区名 -> (schema, 表空间, 主键上界)，default 分区的上界为 None"""
+        cursor.execute(
+            """
+            SELECT child.relname, ns.nspname, COALESCE(ts.spcname, ''),
+                   pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            JOIN pg_namespace ns ON child.relnamespace = ns.oid
+            LEFT JOIN pg_tablespace ts ON child.reltablespace = ts.oid
+            WHERE parent.relname = ANY(%s)
+            """,
+            [list(PARTITIONED_TABLES)]
+        )
+        partitions = {}
+        for name, schema, tablespace, bound in cursor.fetchall():
+            match = re.search(r'TO \((-?\d+)\)', bound or '')
+            partitions[name] = (schema, tablespace, int(match.group(1)) if match else None)
+        return partitions
+
+    @classmethod
+    def archive(cls, days=None, now=None):
+        """把超过保留期限且订单全部关闭的分区移入归档分区集，返回归档的订单分区名"""
+        if not cls.is_supported():
+            return []
+        schema = getattr(settings, 'ORDER_ARCHIVE_SCHEMA', 'order_archive')
+        tablespace = getattr(settings, 'ORDER_ARCHIVE_TABLESPACE', None)
+        if not tablespace:
+            logger.info("ORDER_ARCHIVE_TABLESPACE is not configured, order partitions are not archived")
+            return []
+        if days is None:
+            days = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 90)
+        horizon_id = OrderNumberGenerator.min_id_at((now or timezone.now()) - timedelta(days=days))
+
+        archived = []
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {schema}')
+            partitions = cls.list_partitions(cursor)
+            for name, (current_schema, _tablespace, upper) in sorted(partitions.items()):
+                if not name.startswith('trade_order_') or current_schema == schema:
+                    continue
+                if upper is None or upper > horizon_id:
+                    continue
+                suffix = name[len('trade_order_'):]
+                with transaction.atomic():
+                    # 锁住分区，统计与移动之间订单状态不会变化
+                    cursor.execute(f'LOCK TABLE {current_schema}.{name} IN SHARE MODE')
+                    cursor.execute(
+                        f'SELECT count(*) FROM {current_schema}.{name} WHERE NOT status = ANY(%s)',
+                        [list(CLOSED_STATUSES)]
+                    )
+                    open_count = cursor.fetchone()[0]
+                    if open_count:
+                        logger.warning(f"Partition {name} stays hot: {open_count} orders are not closed yet")
+                        continue
+                    for table in PARTITIONED_TABLES:
+                        partition = f'{table}_{suffix}'
+                        if partition not in partitions:
+                            continue
+                        cls.move_to_archive(cursor, partitions[partition][0], partition, schema, tablespace)
+                archived.append(name)
+        if archived:
+            logger.info(f"Order partitions archived to {schema}/{tablespace}: {', '.join(archived)}")
+        return archived
+
+    @staticmethod
+    def move_to_archive(cursor, current_schema, table, schema, tablespace):
+        cursor.execute(f'ALTER TABLE {current_schema}.{table} SET SCHEMA {schema}')
+        cursor.execute(f'ALTER TABLE {schema}.{table} SET TABLESPACE {tablespace}')
+        cursor.execute('SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s', [schema, table])
+        for (index,) in cursor.fetchall():
+            cursor.execute(f'ALTER INDEX {schema}.{index} SET TABLESPACE {tablespace}')
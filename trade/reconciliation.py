@@ -0,0 +1,161 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from goods.counters import GoodsSalesCounter
+from goods.ranking import HotGoodsRanking
+from payments.utils import WeChatPay
+from .inventory import StockReservationService
+from .models import Order, OrderItem
+from .order_counts import invalidate_order_counts
+from .partitions import created_range_q, related_id_range_q
+from .services import OrderStatisticsService
+
+logger = logging.getLogger('order')
+
+
+class PaymentReconciliationService:
+    """超时未支付订单对账
+
+    分三个阶段，网络请求期间不持有数据库事务和行锁：
+    1. 分批读取超时的待支付订单（只取ID、订单号和用户）；
+    2. 用有界线程池并发向微信支付查询支付状态；
+    3. 用两条以 status='pending' 为条件的UPDATE分别把订单改为已支付和已取消，
+       期间被支付回调或用户操作改变状态的订单不会被覆盖。
+
+    批量UPDATE不会触发 post_save 信号，销量、热销排行、预占库存、订单统计和
+    订单计数缓存在这里按批处理。
+    """
+    TIMEOUT_MINUTES = 30
+    BATCH_SIZE = 500
+    MAX_WORKERS = 16
+
+    @classmethod
+    def get_max_workers(cls):
+        return getattr(settings, 'PAYMENT_QUERY_WORKERS', cls.MAX_WORKERS)
+
+    @classmethod
+    def reconcile_timeout_orders(cls, timeout_minutes=None):
+        """对账所有超时未支付的订单，返回 {'paid': n, 'cancelled': n, 'failed': n}"""
+        timeout_time = timezone.now() - timedelta(minutes=timeout_minutes or cls.TIMEOUT_MINUTES)
+        queryset = cls.get_timeout_queryset(timeout_time)
+
+        totals = {'paid': 0, 'cancelled': 0, 'failed': 0}
+        last_id = None
+        while True:
+            batch = queryset if last_id is None else queryset.filter(id__gt=last_id)
+            orders = list(batch.values_list('id', 'order_number', 'user_id')[:cls.BATCH_SIZE])
+            if not orders:
+                break
+            last_id = orders[-1][0]
+            for key, value in cls.reconcile(orders).items():
+                totals[key] += value
+            if len(orders) < cls.BATCH_SIZE:
+                break
+
+        if any(totals.values()):
+            logger.info(f"Timeout orders reconciled: {totals}")
+        return totals
+
+    @staticmethod
+    def get_timeout_queryset(timeout_time):
+        """创建时间早于 timeout_time 的待支付订单，附加由创建时间推出的主键上界以裁剪分区"""
+        return Order.objects.filter(
+            created_range_q(before=timeout_time), status='pending', created_at__lt=timeout_time
+        ).order_by('id')
+
+    @classmethod
+    def reconcile(cls, orders):
+        """对账一批订单，orders 为 (订单ID, 订单号, 用户ID) 序列"""
+        states = cls.query_payment_states([order_number for _id, order_number, _user_id in orders])
+
+        paid_ids, unpaid_ids = [], []
+        failed = 0
+        for order_id, order_number, _user_id in orders:
+            result = states[order_number]
+            if not result['success']:
+                failed += 1
+                logger.error(f"Failed to query order {order_number} status: {result['error_msg']}")
+            elif result['paid']:
+                paid_ids.append(order_id)
+            else:
+                unpaid_ids.append(order_id)
+
+        paid_ids, cancelled_ids = cls.apply_transitions(paid_ids, unpaid_ids)
+        cls.after_transitions(orders, paid_ids, cancelled_ids)
+        return {'paid': len(paid_ids), 'cancelled': len(cancelled_ids), 'failed': failed}
+
+    @classmethod
+    def query_payment_states(cls, order_numbers):
+        """并发查询支付状态，返回 {订单号: 查询结果}"""
+        def query(order_number):
+            try:
+                return WeChatPay.query_order(order_number)
+            except Exception as e:
+                return {'success': False, 'error_msg': str(e)}
+
+        if not order_numbers:
+            return {}
+        workers = max(1, min(cls.get_max_workers(), len(order_numbers)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payment-query') as executor:
+            return dict(zip(order_numbers, executor.map(query, order_numbers)))
+
+    @staticmethod
+    def apply_transitions(paid_ids, unpaid_ids):
+        """把仍处于待支付状态的订单批量改为已支付/已取消，返回实际变更的 (已支付ID, 已取消ID)"""
+        now = timezone.now()
+        with transaction.atomic():
+            paid_ids = list(
+                Order.objects.select_for_update().filter(pk__in=paid_ids, status='pending')
+                .order_by('pk').values_list('pk', flat=True)
+            ) if paid_ids else []
+            if paid_ids:
+                Order.objects.filter(pk__in=paid_ids, status='pending').update(
+                    status='paid', paid_at=now, updated_at=now
+                )
+
+            cancelled_ids = list(
+                Order.objects.select_for_update().filter(pk__in=unpaid_ids, status='pending')
+                .order_by('pk').values_list('pk', flat=True)
+            ) if unpaid_ids else []
+            if cancelled_ids:
+                Order.objects.filter(pk__in=cancelled_ids, status='pending').update(
+                    status='cancelled', updated_at=now
+                )
+
+        for order_id in paid_ids:
+            logger.info(f"Order {order_id} status updated to paid")
+        for order_id in cancelled_ids:
+            logger.info(f"Order {order_id} cancelled due to timeout")
+        return paid_ids, cancelled_ids
+
+    @staticmethod
+    def after_transitions(orders, paid_ids, cancelled_ids):
+        """批量UPDATE不触发信号，在这里补上销量、排行、库存、统计和计数缓存的处理"""
+        if paid_ids:
+            items = list(OrderItem.objects.filter(
+                related_id_range_q(paid_ids), order_id__in=paid_ids
+            ).values_list('goods_id', 'quantity'))
+            try:
+                GoodsSalesCounter.incr(items)
+            except Exception as e:
+                logger.error(f"Failed to record goods sales for reconciled orders: {str(e)}")
+            try:
+                HotGoodsRanking.record(items)
+            except Exception as e:
+                logger.error(f"Failed to record sales ranking for reconciled orders: {str(e)}")
+
+        if cancelled_ids:
+            StockReservationService.release(cancelled_ids)
+
+        try:
+            OrderStatisticsService.record_status_change(paid_ids, 'pending', 'paid')
+            OrderStatisticsService.record_status_change(cancelled_ids, 'pending', 'cancelled')
+        except Exception as e:
+            logger.error(f"Failed to record statistics for reconciled orders: {str(e)}")
+
+        changed = set(paid_ids) | set(cancelled_ids)
+        for user_id in {user_id for order_id, _number, user_id in orders if order_id in changed}:
+            invalidate_order_counts(user_id)
@@ -31,8 +31,8 @@ class CartSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, attrs):
-        goods = attrs.get('goods')
-        quantity = attrs.get('quantity', 1)
+        goods = attrs.get('goods') or getattr(self.instance, 'goods', None)
+        quantity = attrs.get('quantity', getattr(self.instance, 'quantity', 1))
         
         if not goods.is_on_sale:
             raise serializers.ValidationError("该商品已下架")
@@ -42,6 +42,64 @@ class CartSerializer(serializers.ModelSerializer):
             
         return attrs
 
+class OrderItemSerializer(serializers.ModelSerializer):
+    """订单项序列化器"""
+
+    class Meta:
+        model = OrderItem
+        fields = ['goods', 'goods_name', 'goods_image', 'price', 'quantity', 'total_amount']
+
+class OrderSerializer(serializers.ModelSerializer):
+    """订单序列化器"""
+    # 雪花ID超出 JavaScript 安全整数范围，以字符串输出
+    id = serializers.CharField(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'status', 'status_display',
+            'total_amount', 'actual_amount', 'commission_amount',
+            'receiver_name', 'receiver_phone', 'receiver_address', 'remark',
+            'items', 'created_at', 'paid_at', 'shipped_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+class CartOperationSerializer(serializers.Serializer):
+    """购物车批量操作中的单个操作"""
+    OPERATIONS = (
+        ('add', '加入购物车'),
+        ('update', '修改数量或选中状态'),
+        ('remove', '移出购物车'),
+    )
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    goods = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False, min_value=1)
+    selected = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'update' and 'quantity' not in attrs and 'selected' not in attrs:
+            raise serializers.ValidationError("修改操作需要提供数量或选中状态")
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    """购物车批量操作序列化器"""
+    MAX_OPERATIONS = 200
+
+    operations = serializers.ListField(
+        child=CartOperationSerializer(),
+        min_length=1,
+        max_length=MAX_OPERATIONS
+    )
+
+    def validate_operations(self, value):
+        goods_ids = [operation['goods'] for operation in value]
+        if len(goods_ids) != len(set(goods_ids)):
+            raise serializers.ValidationError("同一商品在一次请求中只能出现一次")
+        return value
+
 class CartSettlementSerializer(serializers.Serializer):
     """购物车结算序列化器"""
     cart_ids = serializers.ListField(
@@ -0,0 +1,212 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+from django.utils import timezone
+from .models import Order, OrderStatistic
+from .partitions import created_range_q
+
+logger = logging.getLogger('order')
+
+
+class OrderStatisticsService:
+    """订单统计
+
+    统计数据来自按 (日期, 小时, 状态) 汇总的 OrderStatistic，后台统计页只读取
+    几百行汇总数据，不再聚合整张订单表。
+
+    订单创建、状态变化和删除时，在事务提交后把变化合并为一条
+    ``INSERT ... ON CONFLICT DO UPDATE`` 增量写入汇总表；批量UPDATE订单状态
+    （如超时对账）不会触发信号，需要调用方自行调用 record_status_change。
+    增量写入失败会造成偏差，可用 rebuild_order_statistics 命令检查和修复。
+    """
+    # 计入销售额和佣金的订单状态
+    SALES_STATUSES = ['paid', 'shipped', 'delivered', 'completed']
+    DAILY_DAYS = 30
+
+    @staticmethod
+    def record_transitions(transitions):
+        """增量更新汇总表
+
+        transitions 为 (创建时间, 原状态, 新状态, 订单金额, 佣金) 序列，
+        新建订单的原状态为 None，删除订单的新状态为 None。
+        """
+        deltas = defaultdict(lambda: [0, Decimal('0.00'), Decimal('0.00')])
+        for created_at, old_status, new_status, total_amount, commission_amount in transitions:
+            if old_status == new_status:
+                continue
+            for status, sign in ((old_status, -1), (new_status, 1)):
+                if status is None:
+                    continue
+                delta = deltas[(created_at.date(), created_at.hour, status)]
+                delta[0] += sign
+                delta[1] += sign * total_amount
+                delta[2] += sign * commission_amount
+
+        deltas = {key: value for key, value in deltas.items() if value[0] or value[1] or value[2]}
+        if not deltas:
+            return
+
+        table = connection.ops.quote_name(OrderStatistic._meta.db_table)
+        rows = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(deltas))
+        params = []
+        for (day, hour, status), (count, amount, commission) in sorted(deltas.items()):
+            params += [day, hour, status, count, amount, commission]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (day, hour, status, order_count, total_amount, commission_amount) '
+                f'VALUES {rows} '
+                f'ON CONFLICT (day, hour, status) DO UPDATE SET '
+                f'order_count = {table}.order_count + EXCLUDED.order_count, '
+                f'total_amount = {table}.total_amount + EXCLUDED.total_amount, '
+                f'commission_amount = {table}.commission_amount + EXCLUDED.commission_amount',
+                params
+            )
+
+    @classmethod
+    def record_status_change(cls, order_ids, old_status, new_status):
+        """批量状态变更后更新汇总表（一次查询取出订单的创建时间和金额）"""
+        if not order_ids:
+            return
+        orders = Order.objects.filter(pk__in=order_ids).values_list('created_at', 'total_amount', 'commission_amount')
+        cls.record_transitions(
+            (created_at, old_status, new_status, total_amount, commission_amount)
+            for created_at, total_amount, commission_amount in orders
+        )
+
+    @classmethod
+    def get_order_summary(cls):
+        """今日订单、待处理订单和累计数据"""
+        money = DecimalField(max_digits=14, decimal_places=2)
+        sales = Q(status__in=cls.SALES_STATUSES)
+        today = Q(day=timezone.now().date())
+        zero = Value(Decimal('0.00'))
+        summary = OrderStatistic.objects.aggregate(
+            today_count=Coalesce(Sum('order_count', filter=today), 0),
+            today_sales=Coalesce(Sum('total_amount', filter=today & sales), zero, output_field=money),
+            pending_count=Coalesce(Sum('order_count', filter=Q(status='pending')), 0),
+            refunding_count=Coalesce(Sum('order_count', filter=Q(status='refunding')), 0),
+            total_count=Coalesce(Sum('order_count'), 0),
+            total_sales=Coalesce(Sum('total_amount', filter=sales), zero, output_field=money),
+            total_commission=Coalesce(Sum('commission_amount', filter=sales), zero, output_field=money),
+        )
+        return {
+            'today': {
+                'count': summary['today_count'],
+                'sales': summary['today_sales'],
+            },
+            'pending_count': summary['pending_count'],
+            'refunding_count': summary['refunding_count'],
+            'total': {
+                'count': summary['total_count'],
+                'sales': summary['total_sales'],
+                'commission': summary['total_commission'],
+            },
+        }
+
+    @classmethod
+    def get_daily_statistics(cls, days=None):
+        """最近若干天每天的订单数、销售额和佣金（按日期倒序）"""
+        money = DecimalField(max_digits=14, decimal_places=2)
+        sales = Q(status__in=cls.SALES_STATUSES)
+        zero = Value(Decimal('0.00'))
+        since = timezone.now().date() - timedelta(days=(days or cls.DAILY_DAYS) - 1)
+        rows = (
+            OrderStatistic.objects.filter(day__gte=since)
+            .values('day')
+            .annotate(
+                order_count=Coalesce(Sum('order_count'), 0),
+                total_sales=Coalesce(Sum('total_amount', filter=sales), zero, output_field=money),
+                total_commission=Coalesce(Sum('commission_amount', filter=sales), zero, output_field=money),
+            )
+            .order_by('-day')
+        )
+        return [
+            {
+                'date': row['day'],
+                'order_count': row['order_count'],
+                'total_sales': row['total_sales'],
+                'total_commission': row['total_commission'],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def bucket_rows(since=None):
+        """按 (日期, 小时, 状态) 聚合订单表的查询，since 同时换算为主键下界以裁剪分区"""
+        queryset = Order.objects.all()
+        if since:
+            queryset = queryset.filter(created_range_q(since=since), created_at__date__gte=since)
+        return (
+            queryset.order_by()
+            .annotate(day=TruncDate('created_at'), hour=ExtractHour('created_at'))
+            .values('day', 'hour', 'status')
+            .annotate(
+                order_count=Count('id'),
+                amount=Sum('total_amount'),
+                commission=Sum('commission_amount'),
+            )
+        )
+
+    @classmethod
+    def compute_buckets(cls, since=None):
+        """从订单表直接聚合，返回 {(日期, 小时, 状态): (订单数, 订单金额, 佣金)}"""
+        rows = cls.bucket_rows(since)
+        return {
+            (row['day'], row['hour'], row['status']): (row['order_count'], row['amount'], row['commission'])
+            for row in rows
+        }
+
+    @staticmethod
+    def get_buckets(since=None):
+        """汇总表中的数据，格式同 compute_buckets（全为0的桶不计入）"""
+        queryset = OrderStatistic.objects.all()
+        if since:
+            queryset = queryset.filter(day__gte=since)
+        return {
+            (day, hour, status): (count, amount, commission)
+            for day, hour, status, count, amount, commission in queryset.values_list(
+                'day', 'hour', 'status', 'order_count', 'total_amount', 'commission_amount'
+            )
+            if count or amount or commission
+        }
+
+    @classmethod
+    def check(cls, since=None):
+        """对比汇总表和订单表，返回不一致的桶 [(键, 汇总表数据, 订单表数据)]"""
+        expected = cls.compute_buckets(since)
+        actual = cls.get_buckets(since)
+        return [
+            (key, actual.get(key), expected.get(key))
+            for key in sorted(set(expected) | set(actual))
+            if actual.get(key) != expected.get(key)
+        ]
+
+    @classmethod
+    def rebuild(cls, since=None):
+        """根据订单表重建汇总表（since 为空时全部重建），返回写入的桶数"""
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # 重建期间阻塞增量写入，避免增量被覆盖
+                table = connection.ops.quote_name(OrderStatistic._meta.db_table)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+
+            buckets = cls.compute_buckets(since)
+            stale = OrderStatistic.objects.all()
+            if since:
+                stale = stale.filter(day__gte=since)
+            stale.delete()
+            OrderStatistic.objects.bulk_create([
+                OrderStatistic(
+                    day=day, hour=hour, status=status,
+                    order_count=count, total_amount=amount, commission_amount=commission
+                )
+                for (day, hour, status), (count, amount, commission) in buckets.items()
+            ], batch_size=1000)
+
+        logger.info(f"Order statistics rebuilt: {len(buckets)} buckets")
+        return len(buckets)
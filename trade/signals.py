@@ -0,0 +1,108 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_save, post_save
+from django.dispatch import receiver
+from goods.counters import GoodsSalesCounter
+from goods.ranking import HotGoodsRanking
+from .expiry import OrderExpiryScheduler
+from .models import Order
+from .order_counts import invalidate_order_counts
+from .services import OrderStatisticsService
+
+logger = logging.getLogger('order')
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    """记录订单修改前的状态，用于判断状态变化"""
+    instance._previous_status = None
+    if instance.pk:
+        instance._previous_status = Order.objects.filter(
+            pk=instance.pk
+        ).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Order)
+def record_paid_order_sales(sender, instance, created, **kwargs):
+    """订单变为已支付时计入商品销量，进出计入销量的状态时增减热销排行"""
+    previous_status = getattr(instance, '_previous_status', None)
+    counted = instance.status in HotGoodsRanking.PAID_STATUSES
+    was_counted = previous_status in HotGoodsRanking.PAID_STATUSES
+    became_paid = instance.status == 'paid' and previous_status != 'paid'
+    if not became_paid and counted == was_counted:
+        return
+
+    def record():
+        if became_paid:
+            try:
+                GoodsSalesCounter.record_order(instance)
+            except Exception as e:
+                logger.error(f"Failed to record goods sales for order {instance.order_number}: {str(e)}")
+        try:
+            if counted and not was_counted:
+                HotGoodsRanking.record_order(instance)
+            elif was_counted and not counted:
+                # 退款（退款中、已退款）等离开计入销量状态的订单从排行中扣除
+                HotGoodsRanking.remove_order(instance)
+        except Exception as e:
+            logger.error(f"Failed to update sales ranking for order {instance.order_number}: {str(e)}")
+
+    transaction.on_commit(record)
+
+
+@receiver(post_save, sender=Order)
+def invalidate_counts_on_status_change(sender, instance, created, **kwargs):
+    """新订单或订单状态变化时清除用户的订单状态计数缓存"""
+    if created or instance.status != getattr(instance, '_previous_status', None):
+        transaction.on_commit(lambda: invalidate_order_counts(instance.user_id))
+
+
+@receiver(post_delete, sender=Order)
+def invalidate_counts_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_order_counts(instance.user_id))
+
+
+@receiver(post_save, sender=Order)
+def schedule_order_expiry(sender, instance, created, **kwargs):
+    """新的待支付订单登记超时定时器，离开待支付状态的订单移出定时器"""
+    if created and instance.status == 'pending':
+        action = lambda: OrderExpiryScheduler.schedule(instance)
+    elif getattr(instance, '_previous_status', None) == 'pending' and instance.status != 'pending':
+        action = lambda: OrderExpiryScheduler.unschedule([instance.pk])
+    else:
+        return
+
+    def run():
+        try:
+            action()
+        except Exception as e:
+            # 定期的 rearm 任务会根据数据库补登记
+            logger.error(f"Failed to update expiry timer for order {instance.order_number}: {str(e)}")
+
+    transaction.on_commit(run)
+
+
+def record_statistics(order, old_status, new_status):
+    """事务提交后增量更新订单统计汇总"""
+    transition = (order.created_at, old_status, new_status, order.total_amount, order.commission_amount)
+
+    def record():
+        try:
+            OrderStatisticsService.record_transitions([transition])
+        except Exception as e:
+            # 偏差可用 rebuild_order_statistics --check 发现并修复
+            logger.error(f"Failed to record statistics for order {order.order_number}: {str(e)}")
+
+    transaction.on_commit(record)
+
+
+@receiver(post_save, sender=Order)
+def record_order_statistics(sender, instance, created, **kwargs):
+    previous_status = None if created else getattr(instance, '_previous_status', None)
+    if created or (previous_status is not None and previous_status != instance.status):
+        record_statistics(instance, previous_status, instance.status)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_statistics(sender, instance, **kwargs):
+    record_statistics(instance, instance.status, None)
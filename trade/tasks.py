@@ -1,49 +1,42 @@
 from celery import shared_task
-from django.utils import timezone
-from django.db import transaction
-from datetime import timedelta
 import logging
-from .models import Order
-from payment.utils import WeChatPay
+from .inventory import StockReservationService
+from .cart_store import RedisCartStore
+from .partitions import OrderPartitionService
+from .expiry import OrderExpiryScheduler
 
 logger = logging.getLogger('order')
 
 @shared_task
 def check_order_timeout():
-    """检查订单超时"""
-    timeout_minutes = 30  # 设置超时时间为30分钟
-    timeout_time = timezone.now() - timedelta(minutes=timeout_minutes)
-    
+    """处理到期的待支付订单：已支付的补记支付，未支付的取消并归还库存"""
     try:
-        # 获取超时未支付的订单
-        timeout_orders = Order.objects.filter(
-            status='pending',
-            created_at__lt=timeout_time
-        )
-        
-        for order in timeout_orders:
-            try:
-                with transaction.atomic():
-                    # 查询订单支付状态
-                    payment_status = WeChatPay.query_order(order.order_number)
-                    
-                    if payment_status['success']:
-                        if payment_status['paid']:
-                            # 订单已支付但状态未更新
-                            order.status = 'paid'
-                            order.paid_at = timezone.now()
-                            order.save()
-                            logger.info(f"Order {order.order_number} status updated to paid")
-                        else:
-                            # 订单确实未支付，执行取消操作
-                            order.status = 'cancelled'
-                            order.save()
-                            logger.info(f"Order {order.order_number} cancelled due to timeout")
-                    else:
-                        logger.error(f"Failed to query order {order.order_number} status: {payment_status['error_msg']}")
-                        
-            except Exception as e:
-                logger.error(f"Error processing timeout order {order.order_number}: {str(e)}")
-                
+        OrderExpiryScheduler.drain()
     except Exception as e:
-        logger.error(f"Error in check_order_timeout task: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error in check_order_timeout task: {str(e)}")
+
+
+@shared_task
+def release_cancelled_reservations():
+    """补偿之前释放失败的已取消订单的库存预留"""
+    return StockReservationService.release_cancelled()
+
+
+@shared_task
+def rearm_order_expiry():
+    """根据数据库重新登记待支付订单的超时定时器（Redis数据丢失或登记失败时兜底）"""
+    return OrderExpiryScheduler.rearm()
+
+
+@shared_task
+def persist_carts():
+    """把Redis中修改过的购物车写回数据库"""
+    return RedisCartStore.persist()
+
+
+@shared_task
+def maintain_order_partitions():
+    """预先创建订单月份分区，并归档过期的已关闭订单分区"""
+    created = OrderPartitionService.ensure_partitions()
+    archived = OrderPartitionService.archive()
+    return {'created': created, 'archived': archived}
@@ -1,3 +1,394 @@
-from django.test import TestCase
+import multiprocessing
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from payments.config import WECHAT_PAY_URLS
+from goods.models import Category, Goods
+from .models import Cart, Order, OrderItem, OrderStatistic, StockReservation
+from .reconciliation import PaymentReconciliationService
+from .services import OrderStatisticsService
+from .utils import OrderNumberGenerator, WorkerIdUnavailable
+from .views import CartViewSet, OrderViewSet
 
-# Create your tests here.
+User = get_user_model()
+
+
+@override_settings(
+    CART_STORE='database',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class CartSummaryTests(TestCase):
+    """购物车汇总"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='distributor', password='test', phone='13900000001', role=3)
+        category = Category.objects.create(name='测试分类')
+        cls.goods_list = [
+            Goods.objects.create(
+                name=f'商品{i}', category=category, price=Decimal('19.99') + i, original_price=Decimal('29.99'),
+                stock=100, image='goods/test.jpg', description='-',
+                commission_rate_1=Decimal('10.00'), commission_rate_2=Decimal('2.50')
+            )
+            for i in range(5)
+        ]
+        for i, goods in enumerate(cls.goods_list):
+            Cart.objects.create(user=cls.user, goods=goods, quantity=i + 1, selected=i != 0)
+
+    def get_summary(self):
+        request = APIRequestFactory().get('/cart/summary/')
+        force_authenticate(request, user=self.user)
+        response = CartViewSet.as_view({'get': 'summary'})(request)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def expected_summary(self):
+        """与逐行计算 Cart.total_amount / commission_amount 的结果一致"""
+        items = list(Cart.objects.filter(user=self.user, selected=True).select_related('goods', 'user'))
+        return {
+            'total_quantity': sum(item.quantity for item in items),
+            'total_amount': sum(item.total_amount for item in items),
+            'total_commission': sum(item.commission_amount for item in items),
+        }
+
+    def test_summary_is_single_query(self):
+        with self.assertNumQueries(1):
+            data = self.get_summary()
+        self.assertEqual(data, self.expected_summary())
+
+    def test_summary_is_cached_until_cart_changes(self):
+        self.get_summary()
+        with self.assertNumQueries(0):
+            self.get_summary()
+
+        cart_item = Cart.objects.get(user=self.user, goods=self.goods_list[0])
+        CartViewSet().get_store().update(self.user, cart_item, selected=True)
+        with self.assertNumQueries(1):
+            data = self.get_summary()
+        self.assertEqual(data, self.expected_summary())
+
+
+
+@override_settings(
+    ORDER_WORKER_ID=1,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class OrderViewSetTests(TestCase):
+    """我的订单"""
+    PAGE_SIZE = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer', password='test', phone='13900000002')
+        other = User.objects.create_user(username='other', password='test', phone='13900000003')
+        statuses = ['pending', 'paid', 'completed']
+        for i in range(25):
+            order = Order.objects.create(
+                user=cls.user, total_amount=Decimal('10.00'), actual_amount=Decimal('10.00'),
+                status=statuses[i % len(statuses)]
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, goods_name=f'商品{j}', goods_image='', price=Decimal('5.00'),
+                          quantity=1, total_amount=Decimal('5.00'))
+                for j in range(2)
+            ])
+        Order.objects.create(user=other, total_amount=Decimal('1.00'), actual_amount=Decimal('1.00'))
+
+    def get(self, action, params=None):
+        request = APIRequestFactory().get('/orders/', params or {})
+        force_authenticate(request, user=self.user)
+        response = OrderViewSet.as_view({'get': action})(request)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_list_pages_through_all_orders_with_prefetched_items(self):
+        seen = []
+        params = {}
+        while True:
+            # 每页一次订单查询加一次订单项查询
+            with self.assertNumQueries(2):
+                data = self.get('list', params)
+            seen += [order['id'] for order in data['results']]
+            self.assertTrue(all(len(order['items']) == 2 for order in data['results']))
+            if not data['next']:
+                break
+            params = {'cursor': data['next'].split('cursor=')[1]}
+
+        expected = Order.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_status_filter(self):
+        data = self.get('list', {'status': 'paid'})
+        self.assertEqual(len(data['results']), 8)
+        self.assertTrue(all(order['status'] == 'paid' for order in data['results']))
+
+    def test_counts_cached_until_status_changes(self):
+        with self.assertNumQueries(1):
+            counts = self.get('counts')
+        self.assertEqual(counts['all'], 25)
+        self.assertEqual(counts['pending'], 9)
+        with self.assertNumQueries(0):
+            self.get('counts')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.filter(user=self.user, status='pending').first()
+            order.status = 'cancelled'
+            order.save()
+        counts = self.get('counts')
+        self.assertEqual(counts['pending'], 8)
+        self.assertEqual(counts['cancelled'], 1)
+
+def generate_order_numbers(worker_id, count, queue):
+    generator = OrderNumberGenerator(worker_id=worker_id)
+    queue.put((worker_id, [generator.generate() for _ in range(count)]))
+
+
+class OrderNumberGeneratorTests(SimpleTestCase):
+    """雪花订单号"""
+    PROCESSES = 3
+    PER_PROCESS = 2000
+
+    def test_unique_and_monotonic_across_processes(self):
+        queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=generate_order_numbers, args=(worker_id, self.PER_PROCESS, queue))
+            for worker_id in range(self.PROCESSES)
+        ]
+        for worker in workers:
+            worker.start()
+        results = [queue.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        all_numbers = []
+        for worker_id, numbers in results:
+            # 同一机器号内严格递增
+            values = [int(number) for number in numbers]
+            self.assertEqual(values, sorted(set(values)))
+            self.assertTrue(all(number.isdigit() and len(number) <= 32 for number in numbers))
+            self.assertTrue(all(OrderNumberGenerator.parse(number)[1] == worker_id for number in numbers))
+            all_numbers += numbers
+        self.assertEqual(len(all_numbers), len(set(all_numbers)))
+
+    def test_parse_creation_time(self):
+        before = datetime.now() - timedelta(milliseconds=1)
+        created_at, worker_id, sequence = OrderNumberGenerator.parse(OrderNumberGenerator(worker_id=7).generate())
+        self.assertEqual(worker_id, 7)
+        self.assertEqual(sequence, 0)
+        self.assertLessEqual(before, created_at)
+        self.assertLessEqual(created_at, datetime.now())
+        self.assertIsNone(OrderNumberGenerator.parse('20250101120000ABCDEF'))
+
+    def test_parse_rejects_out_of_range_numbers(self):
+        # 旧格式的日期时间订单号超出63位
+        self.assertIsNone(OrderNumberGenerator.parse('20250101120000123456'))
+        self.assertIsNone(OrderNumberGenerator.parse(str(1 << 63)))
+        self.assertIsNone(OrderNumberGenerator.parse('0' + OrderNumberGenerator(worker_id=1).generate()))
+        future = OrderNumberGenerator.min_id_at(datetime.now() + timedelta(days=30))
+        self.assertIsNone(OrderNumberGenerator.parse(str(future)))
+
+    def test_fails_closed_without_worker_lease(self):
+        generator = OrderNumberGenerator()
+        with override_settings(ORDER_WORKER_ID=None), \
+                mock.patch('core.redis_client.get_redis', side_effect=ConnectionError('redis down')):
+            with self.assertRaises(WorkerIdUnavailable):
+                generator.generate()
+
+    @override_settings(ORDER_WORKER_ID=42)
+    def test_configured_worker_id(self):
+        self.assertEqual(OrderNumberGenerator.parse(OrderNumberGenerator().generate())[1], 42)
+
+    def test_sequence_overflow_borrows_next_millisecond(self):
+        generator = OrderNumberGenerator(worker_id=1)
+        generator.current_ms = lambda: 1000
+        values = [generator.next_id() for _ in range(OrderNumberGenerator.MAX_SEQUENCE + 2)]
+        self.assertEqual(values, sorted(set(values)))
+        self.assertEqual(OrderNumberGenerator.parse(str(values[-1]))[2], 0)
+
+
+class FakeWeChatPayHandler(BaseHTTPRequestHandler):
+    """模拟微信支付订单查询接口，每个请求固定延迟后返回"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        order_number = ET.fromstring(body).findtext('out_trade_no')
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.latency)
+        if order_number in server.failing:
+            xml = '<xml><return_code>FAIL</return_code><return_msg>系统繁忙</return_msg></xml>'
+        else:
+            state = 'SUCCESS' if order_number in server.paid else 'NOTPAY'
+            xml = (
+                '<xml><return_code>SUCCESS</return_code><result_code>SUCCESS</result_code>'
+                f'<trade_state>{state}</trade_state></xml>'
+            )
+        with server.lock:
+            server.active -= 1
+        data = xml.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(
+    ORDER_WORKER_ID=1,
+    PAYMENT_QUERY_WORKERS=8,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class PaymentReconciliationTests(TestCase):
+    """超时订单对账（本地模拟支付服务，注入网络延迟）"""
+    LATENCY = 0.2
+    ORDERS = 24
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeWeChatPayHandler)
+        cls.server.daemon_threads = True
+        cls.server.latency = cls.LATENCY
+        cls.server.lock = threading.Lock()
+        cls.server.paid = set()
+        cls.server.failing = set()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url_patch = mock.patch.dict(
+            WECHAT_PAY_URLS, {'ORDER_QUERY': f'http://127.0.0.1:{cls.server.server_port}/pay/orderquery'}
+        )
+        cls.url_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.url_patch.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='payer', password='test', phone='13900000004')
+        category = Category.objects.create(name='对账分类')
+        cls.goods = Goods.objects.create(
+            name='对账商品', category=category, price=Decimal('10.00'), original_price=Decimal('10.00'),
+            stock=100, image='goods/test.jpg', description='-'
+        )
+        for _ in range(cls.ORDERS):
+            order = Order.objects.create(user=cls.user, total_amount=Decimal('10.00'), actual_amount=Decimal('10.00'))
+            OrderItem.objects.create(
+                order=order, goods=cls.goods, goods_name=cls.goods.name, goods_image='',
+                price=Decimal('10.00'), quantity=1, total_amount=Decimal('10.00')
+            )
+            StockReservation.objects.create(order=order, goods=cls.goods, quantity=1)
+        Order.objects.update(created_at=datetime.now() - timedelta(hours=1))
+        # 未超时的订单不参与对账
+        Order.objects.create(user=cls.user, total_amount=Decimal('1.00'), actual_amount=Decimal('1.00'))
+
+    def setUp(self):
+        self.server.max_active = 0
+        self.server.active = 0
+        numbers = list(Order.objects.filter(user=self.user).order_by('id').values_list('order_number', flat=True))
+        self.server.paid = set(numbers[:8])
+        self.server.failing = set(numbers[8:10])
+
+    def test_reconcile_concurrently_with_guarded_transitions(self):
+        # 查询期间另一笔订单已被支付回调改为已支付，不能被取消
+        callback_paid = Order.objects.filter(user=self.user).order_by('id').values_list('id', flat=True)[10]
+        original_query = PaymentReconciliationService.query_payment_states
+
+        def query_then_callback(order_numbers):
+            states = original_query(order_numbers)
+            Order.objects.filter(pk=callback_paid).update(status='paid')
+            return states
+
+        started = time.perf_counter()
+        with mock.patch.object(PaymentReconciliationService, 'query_payment_states', side_effect=query_then_callback):
+            totals = PaymentReconciliationService.reconcile_timeout_orders()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(totals, {'paid': 8, 'cancelled': self.ORDERS - 11, 'failed': 2})
+        # 8 个线程并发：耗时远小于逐个查询的 24 * 0.2 秒
+        self.assertGreater(self.server.max_active, 1)
+        self.assertLessEqual(self.server.max_active, 8)
+        self.assertLess(elapsed, self.ORDERS * self.LATENCY / 2)
+
+        statuses = dict(Order.objects.values_list('order_number', 'status'))
+        self.assertTrue(all(statuses[number] == 'paid' for number in self.server.paid))
+        self.assertTrue(all(statuses[number] == 'pending' for number in self.server.failing))
+        self.assertEqual(Order.objects.get(pk=callback_paid).status, 'paid')
+        self.assertEqual(Order.objects.filter(status='cancelled').count(), self.ORDERS - 11)
+        self.assertEqual(Order.objects.filter(status='pending').count(), 3)
+
+        # 只归还已取消订单的预占库存
+        self.goods.refresh_from_db()
+        self.assertEqual(self.goods.stock, 100 + self.ORDERS - 11)
+        self.assertEqual(StockReservation.objects.filter(status='released').count(), self.ORDERS - 11)
+
+
+@override_settings(ORDER_WORKER_ID=1)
+class OrderStatisticsTests(TestCase):
+    """订单统计汇总"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='stats', password='test', phone='13900000005')
+
+    def create_order(self, amount, commission='0.00', status='pending'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.create(
+                user=self.user, total_amount=Decimal(amount), actual_amount=Decimal(amount),
+                commission_amount=Decimal(commission), status=status
+            )
+
+    def set_status(self, order, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = status
+            order.save()
+
+    def test_rollup_follows_order_events(self):
+        first = self.create_order('100.00', '10.00')
+        second = self.create_order('50.00', '5.00')
+        third = self.create_order('30.00')
+        self.create_order('20.00', status='refunding')
+        self.set_status(first, 'paid')
+        self.set_status(first, 'completed')
+        self.set_status(second, 'paid')
+        with self.captureOnCommitCallbacks(execute=True):
+            third.delete()
+
+        self.assertEqual(OrderStatisticsService.check(), [])
+        with self.assertNumQueries(1):
+            summary = OrderStatisticsService.get_order_summary()
+        self.assertEqual(summary['today'], {'count': 3, 'sales': Decimal('150.00')})
+        self.assertEqual(summary['pending_count'], 0)
+        self.assertEqual(summary['refunding_count'], 1)
+        self.assertEqual(summary['total'], {'count': 3, 'sales': Decimal('150.00'), 'commission': Decimal('15.00')})
+
+        daily = OrderStatisticsService.get_daily_statistics()
+        self.assertEqual(len(daily), 1)
+        self.assertEqual(daily[0]['order_count'], 3)
+        self.assertEqual(daily[0]['total_commission'], Decimal('15.00'))
+
+    def test_bulk_status_change_and_rebuild(self):
+        orders = [self.create_order('10.00') for _ in range(3)]
+        ids = [order.pk for order in orders]
+        Order.objects.filter(pk__in=ids).update(status='cancelled')
+        OrderStatisticsService.record_status_change(ids, 'pending', 'cancelled')
+        self.assertEqual(OrderStatisticsService.check(), [])
+
+        # 汇总表出现偏差时检查能发现，重建后恢复一致
+        OrderStatistic.objects.update(order_count=0)
+        self.assertEqual(len(OrderStatisticsService.check()), 1)
+        OrderStatisticsService.rebuild()
+        self.assertEqual(OrderStatisticsService.check(), [])
@@ -4,6 +4,7 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'orders', views.OrderViewSet, basename='order')
+router.register(r'cart', views.CartViewSet, basename='cart')
 
 urlpatterns = [
     path('', include(router.urls)),
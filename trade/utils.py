@@ -1,11 +1,200 @@
-import uuid
+import os
+import socket
+import threading
 import time
-from django.utils import timezone
+import uuid
+import logging
+import zlib
+from datetime import datetime
+
+logger = logging.getLogger('order')
+
+
+class WorkerIdUnavailable(RuntimeError):
+    """无法取得唯一的订单号机器号"""
+
+
+class OrderNumberGenerator:
+    """雪花算法订单号
+
+    64位整数 = 毫秒时间戳（自 EPOCH_MS 起，41位）| 机器号（10位）| 毫秒内序号（12位），
+    以十进制字符串输出（19位以内）。同一机器号内严格递增，不同机器号不会重复，
+    新订单号按时间顺序追加到唯一索引末尾。
+
+    机器号依次取构造参数、settings.ORDER_WORKER_ID，否则通过Redis租约分配
+    （SET NX EX，使用过程中续期）。哈希推导的机器号可能与其他进程冲突，
+    无法取得租约或租约过期未能续期时抛出 WorkerIdUnavailable，不生成可能重复的订单号。
+    时钟回拨时沿用上次的时间戳继续递增。
+    """
+    EPOCH_MS = 1704067200000  # 2024-01-01 00:00:00 UTC
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+    LEASE_KEY = 'order:number:worker:{}'
+    LEASE_TIMEOUT = 300
+    # 解析时允许的时钟偏差，超过当前时间太多的数字不是本系统生成的订单号
+    MAX_CLOCK_SKEW_MS = 24 * 60 * 60 * 1000
+
+    def __init__(self, worker_id=None):
+        self._fixed_worker_id = worker_id
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker_id = None
+        self._lease_token = None
+        self._lease_renewed_at = 0
+        self._last_ms = -1
+        self._sequence = 0
+
+    @staticmethod
+    def probe_start():
+        """租约探测的起始机器号，由主机名和进程号哈希得到，使各进程从不同位置开始探测"""
+        return zlib.crc32(f'{socket.gethostname()}:{os.getpid()}'.encode()) & OrderNumberGenerator.MAX_WORKER_ID
+
+    @staticmethod
+    def configured_worker_id():
+        from django.conf import settings
+
+        worker_id = getattr(settings, 'ORDER_WORKER_ID', None)
+        if worker_id is not None and not 0 <= int(worker_id) <= OrderNumberGenerator.MAX_WORKER_ID:
+            raise WorkerIdUnavailable(f'ORDER_WORKER_ID must be between 0 and {OrderNumberGenerator.MAX_WORKER_ID}')
+        return None if worker_id is None else int(worker_id)
+
+    def acquire_worker_id(self):
+        """通过Redis租约获取一个未被占用的机器号，失败时抛出 WorkerIdUnavailable"""
+        from core.redis_client import get_redis
+
+        self._lease_token = None
+        start = self.probe_start()
+        token = uuid.uuid4().hex
+        try:
+            client = get_redis()
+            for offset in range(self.MAX_WORKER_ID + 1):
+                worker_id = (start + offset) & self.MAX_WORKER_ID
+                if client.set(self.LEASE_KEY.format(worker_id), token, nx=True, ex=self.LEASE_TIMEOUT):
+                    self._lease_token = token
+                    self._lease_renewed_at = time.monotonic()
+                    return worker_id
+        except Exception as e:
+            logger.error(f"Failed to lease order number worker id: {str(e)}")
+            raise WorkerIdUnavailable('Failed to lease an order number worker id') from e
+        logger.error("No free order number worker id")
+        raise WorkerIdUnavailable('No free order number worker id')
+
+    def renew_lease(self):
+        """租约过去一半时续期；租约已被他人占用时重新获取机器号
+
+        续期失败时在租约有效期内继续使用原机器号，租约过期后机器号可能已被
+        其他进程取得，抛出 WorkerIdUnavailable。
+        """
+        if self._lease_token is None:
+            self._worker_id = self.acquire_worker_id()
+            return
+        elapsed = time.monotonic() - self._lease_renewed_at
+        if elapsed < self.LEASE_TIMEOUT / 2:
+            return
+        from core.redis_client import get_redis
+
+        key = self.LEASE_KEY.format(self._worker_id)
+        try:
+            client = get_redis()
+            renewed = client.get(key) == self._lease_token and client.expire(key, self.LEASE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to renew order number worker lease: {str(e)}")
+            if elapsed >= self.LEASE_TIMEOUT:
+                self._lease_token = None
+                raise WorkerIdUnavailable('Order number worker lease expired') from e
+            return
+
+        if renewed:
+            self._lease_renewed_at = time.monotonic()
+        else:
+            # 租约已过期或被他人占用，必须换用新的机器号
+            self._worker_id = self.acquire_worker_id()
+
+    def get_worker_id(self):
+        # fork 出的子进程不能沿用父进程的机器号
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._last_ms = -1
+            self._sequence = 0
+            self._lease_token = None
+            if self._fixed_worker_id is None:
+                self._fixed_worker_id = self.configured_worker_id()
+            if self._fixed_worker_id is not None:
+                self._worker_id = self._fixed_worker_id & self.MAX_WORKER_ID
+            else:
+                self._worker_id = self.acquire_worker_id()
+        elif self._fixed_worker_id is None:
+            self.renew_lease()
+        return self._worker_id
+
+    def current_ms(self):
+        return int(time.time() * 1000) - self.EPOCH_MS
+
+    def next_id(self):
+        with self._lock:
+            worker_id = self.get_worker_id()
+            now_ms = self.current_ms()
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                # 同一毫秒内或时钟回拨：序号递增，用尽后借用下一毫秒
+                self._sequence += 1
+                if self._sequence > self.MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (
+                (self._last_ms << (self.WORKER_BITS + self.SEQUENCE_BITS))
+                | (worker_id << self.SEQUENCE_BITS)
+                | self._sequence
+            )
+
+    def generate(self):
+        return str(self.next_id())
+
+    @classmethod
+    def parse(cls, order_number):
+        """解析订单号，返回 (创建时间, 机器号, 序号)
+
+        不是雪花订单号时返回 None：非纯数字、有前导零、超出63位，或时间戳晚于
+        当前时间（超过允许的时钟偏差），如旧格式的日期时间订单号。
+        """
+        order_number = str(order_number)
+        if not order_number.isdigit() or order_number != str(int(order_number)):
+            return None
+        value = int(order_number)
+        if value >= 1 << 63:
+            return None
+        sequence = value & cls.MAX_SEQUENCE
+        worker_id = (value >> cls.SEQUENCE_BITS) & cls.MAX_WORKER_ID
+        ms = value >> (cls.WORKER_BITS + cls.SEQUENCE_BITS)
+        if ms > int(time.time() * 1000) - cls.EPOCH_MS + cls.MAX_CLOCK_SKEW_MS:
+            return None
+        created_at = datetime.fromtimestamp((cls.EPOCH_MS + ms) / 1000)
+        return created_at, worker_id, sequence
+
+    @classmethod
+    def min_id_at(cls, dt):
+        """该时刻及之后生成的ID的下界，用于按时间做主键范围查询和分区"""
+        ms = max(int(dt.timestamp() * 1000) - cls.EPOCH_MS, 0)
+        return ms << (cls.WORKER_BITS + cls.SEQUENCE_BITS)
+
+
+_order_number_generator = OrderNumberGenerator()
+
+
+def next_order_id():
+    """订单和订单项主键（雪花算法，按时间递增，订单编号即订单主键）"""
+    return _order_number_generator.next_id()
+
+
+def parse_order_number(order_number):
+    """解析订单号的创建时间、机器号和序号"""
+    return OrderNumberGenerator.parse(order_number)
 
-def generate_order_number():
-    """生成订单号"""
-    # 格式：年月日时分秒+随机数
-    return f"{timezone.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4().hex)[:6].upper()}"
 
 def format_price(price):
     """将金额转换为分"""
@@ -13,4 +202,4 @@ def format_price(price):
 
 def deformat_price(price):
     """将分转换为元"""
-    return float(price) / 100
\ No newline at end of file
+    return float(price) / 100
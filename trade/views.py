@@ -1,59 +1,146 @@
+import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, F
 from django.db import transaction
+from django.http import Http404
 from django.utils import timezone
-from decimal import Decimal
-from .models import Cart, Order, OrderItem
-from .serializers import CartSerializer, CartSettlementSerializer
+from .models import Cart, Order
+from goods.models import Goods
+from .serializers import CartBatchSerializer, CartSerializer, CartSettlementSerializer, OrderSerializer
+from .checkout import CheckoutError, CheckoutService
+from .cart_store import CartStockError, get_cached_summary, get_cart_store
+from .order_counts import get_order_counts
+from .pagination import OrderCursorPagination
+
+logger = logging.getLogger('order')
+
+class OrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """我的订单
+
+    列表按创建时间倒序游标分页，可用 status 参数按订单状态筛选；
+    每页的订单项通过一次 prefetch 查询加载。
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        queryset = Order.objects.filter(user=self.request.user).prefetch_related('items')
+        if self.action == 'list':
+            order_status = self.request.query_params.get('status')
+            if order_status:
+                if order_status not in dict(Order.ORDER_STATUS):
+                    return queryset.none()
+                queryset = queryset.filter(status=order_status)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def counts(self, request):
+        """各状态订单数（标签角标）"""
+        return Response(get_order_counts(request.user))
 
 class CartViewSet(viewsets.ModelViewSet):
     """购物车视图集"""
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
+    lookup_value_regex = r'\d+'
 
     def get_queryset(self):
         return Cart.objects.filter(user=self.request.user)
 
+    def get_store(self):
+        """购物车存储（数据库或Redis，由 settings.CART_STORE 决定）"""
+        return get_cart_store()
+
+    def list(self, request, *args, **kwargs):
+        items = self.get_store().get_items(request.user)
+        page = self.paginate_queryset(items)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(items, many=True).data)
+
+    def get_object(self):
+        item = self.get_store().get_item(self.request.user, self.kwargs[self.lookup_field])
+        if item is None:
+            raise Http404
+        return item
+
     def perform_create(self, serializer):
-        """创建购物车记录"""
-        goods = serializer.validated_data['goods']
-        quantity = serializer.validated_data.get('quantity', 1)
-        
-        cart_item = Cart.objects.filter(
-            user=self.request.user,
-            goods=goods
-        ).first()
-        
-        if cart_item:
-            cart_item.quantity += quantity
-            cart_item.save()
-            serializer.instance = cart_item
-        else:
-            serializer.save(user=self.request.user)
+        """加入购物车，已有该商品时原子累加数量"""
+        serializer.instance = self.get_store().add(
+            self.request.user,
+            serializer.validated_data['goods'],
+            serializer.validated_data.get('quantity', 1)
+        )
+
+    def perform_update(self, serializer):
+        serializer.instance = self.get_store().update(
+            self.request.user,
+            serializer.instance,
+            quantity=serializer.validated_data.get('quantity'),
+            selected=serializer.validated_data.get('selected')
+        )
+
+    def perform_destroy(self, instance):
+        self.get_store().remove(self.request.user, [instance.goods_id])
 
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """购物车汇总信息"""
-        queryset = self.get_queryset().filter(selected=True)
-        total_quantity = queryset.aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
-        
-        total_amount = Decimal('0.00')
-        total_commission = Decimal('0.00')
-        
-        for item in queryset:
-            total_amount += item.total_amount
-            total_commission += item.commission_amount
-        
-        return Response({
-            'total_quantity': total_quantity,
-            'total_amount': total_amount,
-            'total_commission': total_commission
-        })
+        return Response(get_cached_summary(self.get_store(), request.user))
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """批量修改购物车（加入、修改数量/选中状态、移除），一个请求一个事务"""
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
+        # 一次查询校验所有涉及的商品
+        goods_ids = [operation['goods'] for operation in operations if operation['op'] != 'remove']
+        goods_map = Goods.objects.in_bulk(goods_ids)
+
+        adds = {}
+        updates = {}
+        removes = []
+        for operation in operations:
+            goods_id = operation['goods']
+            if operation['op'] == 'remove':
+                removes.append(goods_id)
+                continue
+
+            goods = goods_map.get(goods_id)
+            if goods is None:
+                return Response({"error": f"商品 {goods_id} 不存在"}, status=status.HTTP_400_BAD_REQUEST)
+            if not goods.is_on_sale:
+                return Response({"error": f"商品 {goods.name} 已下架"}, status=status.HTTP_400_BAD_REQUEST)
+            quantity = operation.get('quantity')
+            # 加入时与购物车已有数量合计的库存检查在 apply_batch 中原子完成
+            if quantity is not None and goods.stock < quantity:
+                return Response(
+                    {"error": f"商品 {goods.name} 库存不足，当前库存{goods.stock}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if operation['op'] == 'add':
+                adds[goods_id] = quantity or 1
+            else:
+                updates[goods_id] = {'quantity': quantity, 'selected': operation.get('selected')}
+
+        store = self.get_store()
+        try:
+            store.apply_batch(request.user, adds, updates, removes)
+        except CartStockError as e:
+            goods = goods_map[e.goods_id]
+            return Response(
+                {"error": f"商品 {goods.name} 库存不足，当前库存{goods.stock}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        items = store.get_items(request.user)
+        return Response(self.get_serializer(items, many=True).data)
 
     @action(detail=False, methods=['post'])
     def settle(self, request):
@@ -61,75 +148,51 @@ class CartViewSet(viewsets.ModelViewSet):
         serializer = CartSettlementSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        cart_items = Cart.objects.filter(
-            user=request.user,
-            id__in=serializer.validated_data['cart_ids']
-        )
+        store = self.get_store()
+        cart_ids = set(serializer.validated_data['cart_ids'])
+        cart_items = store.get_items(request.user, cart_ids)
         
-        if not cart_items.exists():
+        if not cart_items:
             return Response(
                 {"error": "未选择商品"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        # 不属于当前用户或已移出购物车的条目不能静默忽略
+        if {item.id for item in cart_items} != cart_ids:
+            return Response(
+                {"error": "购物车商品已变化，请刷新后重试"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
             
-        # 检查商品库存和状态
-        for item in cart_items:
-            if not item.goods.is_on_sale:
-                return Response(
-                    {"error": f"商品 {item.goods.name} 已下架"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            if item.goods.stock < item.quantity:
-                return Response(
-                    {"error": f"商品 {item.goods.name} 库存不足"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
         try:
             with transaction.atomic():
-                # 创建订单
-                order = Order.objects.create(
-                    user=request.user,
-                    order_number=generate_order_number(),  # 需要实现此函数
-                    total_amount=sum(item.total_amount for item in cart_items),
-                    actual_amount=sum(item.total_amount for item in cart_items),  # 这里可以加入优惠逻辑
-                    commission_amount=sum(item.commission_amount for item in cart_items),
-                    distributor=request.user if request.user.role in [2, 3] else None,
+                order = CheckoutService.checkout(
+                    request.user,
+                    cart_items,
                     remark=serializer.validated_data.get('remark', '')
-                    # 需要添加收货地址信息
                 )
-                
-                # 创建订单项
-                order_items = []
-                for cart_item in cart_items:
-                    order_items.append(OrderItem(
-                        order=order,
-                        goods=cart_item.goods,
-                        goods_name=cart_item.goods.name,
-                        goods_image=cart_item.goods.cover.url,
-                        price=cart_item.goods.price,
-                        quantity=cart_item.quantity,
-                        total_amount=cart_item.total_amount
-                    ))
-                
-                OrderItem.objects.bulk_create(order_items)
-                
                 # 删除已结算的购物车项
-                cart_items.delete()
-                
-                return Response({
-                    "order_id": order.id,
-                    "order_number": order.order_number
-                })
-                
-        except Exception as e:
+                store.remove(request.user, [item.goods_id for item in cart_items])
+
+            return Response({
+                "order_id": str(order.id),
+                "order_number": order.order_number
+            })
+
+        except CheckoutError as e:
             return Response(
                 {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.exception(f"Checkout failed for user {request.user.pk}: {str(e)}")
+            return Response(
+                {"error": "结算失败，请稍后重试"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
     @action(detail=False, methods=['post'])
     def clear(self, request):
         """清空购物车"""
-        self.get_queryset().delete()
+        self.get_store().clear(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file